@@ -0,0 +1,44 @@
+"""
+Сравнение времени записи одного и того же отчёта spending_by_category в разных форматах write_report.
+
+Запуск: python -m benchmarks.bench_reports [--rows 1000000] [--category Супермаркеты]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import generate_operations
+from src.reports import EXCEL_ENGINE, REPORT_EXTENSIONS, spending_by_category, write_report
+from src.store import TransactionStore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--category", default="Супермаркеты")
+    args = parser.parse_args()
+
+    store = TransactionStore(generate_operations(args.rows))
+    date = store.frame["Дата операции"].max().strftime("%Y-%m-%d")
+    # __wrapped__ — функция без декоратора save_report: отчёт только строится, но не сохраняется
+    report = spending_by_category.__wrapped__(store, args.category, date)
+    print(f"rows={args.rows} report_rows={len(report)} excel_engine={EXCEL_ENGINE}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for report_type, extension in REPORT_EXTENSIONS.items():
+            filename = os.path.join(directory, f"report{extension}")
+            start = time.perf_counter()
+            try:
+                write_report(filename, report)
+            except ImportError as e:
+                print(f"{report_type:<8} skipped: {e}")
+                continue
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(filename) / 2**20
+            print(f"{report_type:<8} write={elapsed:.3f}s size={size:.1f}MiB")
+
+
+if __name__ == "__main__":
+    main()
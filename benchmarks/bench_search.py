@@ -0,0 +1,77 @@
+"""
+Сравнение построчного поиска (исходная реализация search_transactions) с векторизованным find_transactions
+без индекса и с триграммным индексом.
+
+Запуск: python -m benchmarks.bench_search [--rows 1000000]
+"""
+
+import argparse
+import re
+import time
+
+from benchmarks.synthetic import generate_operations
+from src.search_index import build_index
+from src.services import find_transactions
+from src.store import TransactionStore
+
+PATTERNS = {
+    "через": r"\s(через)+\s",
+    "p2p": r"[А-Я]{1}[а-я]+\s[А-Я]{1}\.",
+    "phone": r"\+7\s\d{3}\s\d{2,3}-\d{2}-\d{2}",
+    "category": r"Переводы",
+}
+
+
+def legacy_search(data: list[dict], search: str, scope: tuple = ("Описание", "Категория")) -> list[dict]:
+    """Построчный поиск в том виде, в котором он был реализован до векторизации"""
+    pattern = re.compile(search)
+    result = []
+    for transaction in data:
+        for transaction_key in transaction.keys():
+            if transaction_key in scope:
+                value = transaction[transaction_key]
+                if isinstance(value, (int, bool, float)):
+                    value = str(value)
+                if isinstance(value, str) and pattern.search(value):
+                    result.append(transaction)
+                    break
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = generate_operations(args.rows)
+    records = df.to_dict("records")
+    store = TransactionStore(df)
+    indexed = TransactionStore(df)
+    start = time.perf_counter()
+    build_index(indexed)
+    index_time = time.perf_counter() - start
+
+    print(f"rows={args.rows} index_build={index_time:.3f}s")
+    for name, pattern in PATTERNS.items():
+        start = time.perf_counter()
+        expected = legacy_search(records, pattern)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rows = find_transactions(store, pattern)
+        vectorized_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        indexed_rows = find_transactions(indexed, pattern)
+        indexed_time = time.perf_counter() - start
+
+        assert len(rows) == len(expected) == len(indexed_rows)
+        print(
+            f"{name:<10} matches={len(rows):<8} legacy={legacy_time:.3f}s "
+            f"vectorized={vectorized_time:.3f}s speedup=x{legacy_time / vectorized_time:.1f} "
+            f"indexed={indexed_time:.3f}s speedup=x{legacy_time / indexed_time:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
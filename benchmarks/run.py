@@ -0,0 +1,192 @@
+"""
+Замеры времени и пиковой памяти публичных функций на синтетических выписках разного размера.
+Результаты сохраняются в JSON, чтобы сравнивать запуски и находить регрессии.
+
+Запуск: python -m benchmarks.run [--rows 10000 100000] [--repeat 3] [--output results.json]
+                                 [--compare baseline.json --threshold 1.25]
+Размеры можно задать пресетом: --preset small (10k, 100k), full (10k, 100k, 1M, 10M).
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Optional
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import generate_operations
+from src.logging_config import configure_logging
+from src.reports import spending_by_category
+from src.services import analyze_cashback, search_transactions, search_transactions_by_phone, search_transactions_p2p
+from src.store import TransactionStore
+from src.utils import get_card_statistics, read_excel, read_transactions
+from src.views import get_main_page
+
+PRESETS = {
+    "small": [10_000, 100_000],
+    "full": [10_000, 100_000, 1_000_000, 10_000_000],
+}
+# Лист Excel вмещает 1 048 576 строк вместе с заголовком: выписки больше не читаются из .xlsx
+EXCEL_MAX_ROWS = 1_048_575
+DEFAULT_THRESHOLD = 1.25
+
+# Ответы внешних API для get_main_page: замеряется только локальная часть
+STUB_STOCKS = [
+    {"symbol": symbol, "price_currency": "USD", "high": 100.0} for symbol in ("AAPL", "AMZN", "GOOGL", "MSFT", "TSLA")
+]
+STUB_RATES = ([{"currency_code": "USD", "rate": 90.0}, {"currency_code": "EUR", "rate": 100.0}], [])
+
+
+def build_cases(store: TransactionStore, excel_path: Optional[str]) -> dict[str, Callable[[], object]]:
+    """Сценарии замера для одной выписки; подготовка данных в замер не входит"""
+    last = store.frame["Дата операции"].max()
+    datetime_str = last.strftime("%Y-%m-%d %H:%M:%S")
+    date = last.strftime("%Y-%m-%d")
+
+    cases: dict[str, Callable[[], object]] = {}
+    if excel_path is not None:
+        cases["read_excel"] = lambda: read_excel(excel_path)
+        cases["read_transactions_cached"] = lambda: read_transactions(excel_path)
+    cases.update(
+        {
+            "get_main_page": lambda: get_main_page(store, datetime_str),
+            "search_transactions": lambda: search_transactions(store, r"\s(через)+\s", as_json=False),
+            "search_transactions_p2p": lambda: search_transactions_p2p(store, as_json=False),
+            "search_transactions_by_phone": lambda: search_transactions_by_phone(store, as_json=False),
+            "analyze_cashback": lambda: analyze_cashback(store, last.year, last.month, as_json=False),
+            "get_card_statistics": lambda: get_card_statistics(store),
+            # без декоратора save_report: запись файла отчёта замеряет benchmarks.bench_reports
+            "spending_by_category": lambda: spending_by_category.__wrapped__(store, "Супермаркеты", date),
+        }
+    )
+    return cases
+
+
+def measure(func: Callable[[], object], repeat: int) -> dict:
+    """Время (лучшее и среднее из repeat запусков) и пиковая память отдельного запуска под tracemalloc"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    # tracemalloc замедляет выполнение, поэтому память меряется отдельным запуском
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": min(timings), "mean_seconds": statistics.fmean(timings), "peak_mib": peak / 2**20}
+
+
+def write_excel(df: pd.DataFrame, directory: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "operations.xlsx")
+    df.to_excel(path, index=False)
+    # колоночный кэш строится заранее, чтобы read_transactions_cached мерил чтение из кэша
+    read_transactions(path)
+    return path
+
+
+def run_benchmarks(sizes: list[int], repeat: int = 3, cases: Optional[list[str]] = None, seed: int = 0) -> dict:
+    """Выполняет замеры для каждого размера выписки и возвращает результаты в виде словаря для JSON"""
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench-") as directory, patch(
+        "src.views.get_stock_prices", return_value=STUB_STOCKS
+    ), patch("src.views.get_currency_rates", return_value=STUB_RATES), patch(
+        "src.views.read_json", return_value={"user_stocks": ["AAPL", "MSFT"], "user_currencies": ["USD", "EUR"]}
+    ):
+        for rows in sizes:
+            df = generate_operations(rows, seed)
+            store = TransactionStore(df)
+            needs_excel = rows <= EXCEL_MAX_ROWS and (
+                cases is None or {"read_excel", "read_transactions_cached"} & set(cases)
+            )
+            excel_path = write_excel(df, os.path.join(directory, str(rows))) if needs_excel else None
+
+            for name, func in build_cases(store, excel_path).items():
+                if cases is not None and name not in cases:
+                    continue
+                result = {"case": name, "rows": rows, **measure(func, repeat)}
+                results.append(result)
+                print(
+                    f"{name:<30} rows={rows:<9} time={result['seconds']:.4f}s "
+                    f"mean={result['mean_seconds']:.4f}s peak={result['peak_mib']:.1f}MiB",
+                    flush=True,
+                )
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """
+    Сравнивает результаты с эталонным запуском по лучшему времени.
+    Возвращает сценарии, ставшие медленнее больше чем в threshold раз.
+    """
+    previous = {(item["case"], item["rows"]): item for item in baseline["results"]}
+    regressions = []
+    for item in current["results"]:
+        base = previous.get((item["case"], item["rows"]))
+        if base is None or not base["seconds"]:
+            continue
+        ratio = item["seconds"] / base["seconds"]
+        print(
+            f"{item['case']:<30} rows={item['rows']:<9} {base['seconds']:.4f}s -> {item['seconds']:.4f}s x{ratio:.2f}"
+        )
+        if ratio > threshold:
+            regressions.append({**item, "baseline_seconds": base["seconds"], "ratio": ratio})
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+")
+    parser.add_argument("--preset", choices=PRESETS, default="small")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--case", action="append", dest="cases", help="замерять только указанные сценарии")
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    parser.add_argument("--compare", help="JSON эталонного запуска для поиска регрессий")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    configure_logging("WARNING", sink=sys.stderr)
+    report = run_benchmarks(args.rows or PRESETS[args.preset], args.repeat, args.cases)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for item in regressions:
+            print(f"REGRESSION {item['case']} rows={item['rows']}: x{item['ratio']:.2f}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+CARDS = ["*7197", "*4556", "*5091", "*1112", "*5507", "*6002", "*0000", ""]
+CATEGORIES = [
+    "Супермаркеты",
+    "Переводы",
+    "Фастфуд",
+    "Каршеринг",
+    "Местный транспорт",
+    "Мобильная связь",
+    "Рестораны",
+    "Аптеки",
+    "Наличные",
+    "Пополнения",
+]
+MERCHANTS = ["Колхоз", "Магнит", "Пятёрочка", "ВкусВилл", "Яндекс Такси", "Ситидрайв", "Аптека Вита", "Шоколадница"]
+FIRST_NAMES = ["Иван", "Мария", "Сергей", "Анна", "Дмитрий", "Елена", "Павел", "Ольга", "Константин", "Светлана"]
+LAST_INITIALS = list("АБВГДЕЖЗИКЛМНОПРСТУФХЦЧШЭЮЯ")
+
+
+def _format_phone(number: int) -> str:
+    return f"+7 {number // 10**7 % 1000:03d} {number // 10**4 % 1000:03d}-{number // 100 % 100:02d}-{number % 100:02d}"
+
+
+def generate_operations(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Генерирует детерминированную синтетическую выписку в формате operations.xlsx"""
+    rng = np.random.default_rng(seed)
+
+    start = np.datetime64("2018-01-01T00:00:00")
+    seconds = rng.integers(0, 4 * 365 * 24 * 3600, n_rows)
+    dates = pd.Series(start + seconds.astype("timedelta64[s]"))
+
+    categories = rng.choice(CATEGORIES, n_rows, p=[0.3, 0.15, 0.1, 0.05, 0.1, 0.05, 0.1, 0.05, 0.05, 0.05])
+    descriptions = rng.choice(MERCHANTS, n_rows).astype(object)
+
+    p2p = categories == "Переводы"
+    names = rng.choice(FIRST_NAMES, n_rows).astype(object) + " " + rng.choice(LAST_INITIALS, n_rows) + "."
+    descriptions[p2p] = names[p2p]
+
+    phones = categories == "Мобильная связь"
+    numbers = rng.integers(0, 10**10, n_rows)
+    descriptions[phones] = [f"Я МТС {_format_phone(number)}" for number in numbers[phones]]
+
+    amounts = -np.round(rng.lognormal(6, 1.2, n_rows), 2)
+    amounts[categories == "Пополнения"] *= -1
+    cashback = np.where(rng.random(n_rows) < 0.2, np.round(np.abs(amounts) * 0.01), 0.0)
+
+    return pd.DataFrame(
+        {
+            "Дата операции": dates.dt.strftime("%d.%m.%Y %H:%M:%S"),
+            "Дата платежа": dates.dt.strftime("%d.%m.%Y"),
+            "Номер карты": rng.choice(CARDS, n_rows),
+            "Статус": np.where(rng.random(n_rows) < 0.98, "OK", "FAILED"),
+            "Сумма операции": amounts,
+            "Валюта операции": "RUB",
+            "Сумма платежа": amounts,
+            "Валюта платежа": "RUB",
+            "Кэшбэк": cashback,
+            "Категория": categories,
+            "MCC": rng.choice([5411.0, 5814.0, 4121.0, 4814.0, 5912.0, 0.0], n_rows),
+            "Описание": descriptions,
+            "Бонусы (включая кэшбэк)": (np.abs(amounts) // 100).astype("int64"),
+            "Округление на инвесткопилку": 0,
+            "Сумма операции с округлением": np.abs(amounts),
+        }
+    )
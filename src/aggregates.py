@@ -0,0 +1,361 @@
+import json
+import os
+from datetime import datetime
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from src.cache import file_signature, get_cache_dir
+from src.store import DATE_COLUMN, TransactionStore, as_store
+from src.utils import card_totals, format_card_statistics
+
+CARD_KEYS = ("Номер карты", "День")
+CARD_VALUES = ("Сумма операции", "Кэшбэк")
+CASHBACK_KEYS = ("Категория", "Месяц")
+CASHBACK_VALUE = "Бонусы (включая кэшбэк)"
+CUBE_KEYS = ("Категория", "Месяц", "Номер карты")
+CUBE_VALUES = ("Сумма платежа", "Количество операций", "Кэшбэк")
+# Колонки, из которых строятся предагрегаты: по ним считается хэш агрегированных строк
+SOURCE_COLUMNS = (DATE_COLUMN, "Номер карты", "Категория", "Сумма операции", "Сумма платежа", "Кэшбэк", CASHBACK_VALUE)
+
+
+def _card_days(frame: pd.DataFrame) -> pd.DataFrame:
+    """Суммы списаний и кэшбэка по карте и дню"""
+    spending = frame[frame["Сумма платежа"] < 0]
+    cards = _labels(spending["Номер карты"])
+    days = spending[DATE_COLUMN].dt.normalize().rename(CARD_KEYS[1])
+    return spending.groupby([cards, days])[list(CARD_VALUES)].sum()
+
+
+def _labels(series: pd.Series) -> pd.Series:
+    """
+    Значения ключа как строки, как astype(str); пропуски остаются пропусками.
+    Для category преобразуются только категории, а не каждая строка.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        labels = np.append(series.cat.categories.astype(str).to_numpy(dtype=object), np.nan)
+        # код пропуска -1 указывает на последний элемент — NaN
+        return pd.Series(labels[series.cat.codes.to_numpy()], index=series.index, name=series.name)
+    return series.astype(str)
+
+
+def _months(frame: pd.DataFrame) -> pd.Series:
+    """Первое число месяца каждой операции"""
+    return pd.Series(frame[DATE_COLUMN].to_numpy().astype("datetime64[M]"), index=frame.index, name="Месяц")
+
+
+def _category_months(frame: pd.DataFrame) -> pd.Series:
+    """Суммы бонусов по категории и месяцу"""
+    categories = _labels(frame["Категория"])
+    return frame.groupby([categories, _months(frame)])[CASHBACK_VALUE].sum()
+
+
+def _spending_cells(frame: pd.DataFrame) -> pd.DataFrame:
+    """Ячейки куба трат: сумма платежей, количество операций и кэшбэк по категории, месяцу и карте"""
+    # группировка по кодам category в один проход; в строки переводятся только ключи готовых ячеек
+    # операции без карты или категории тоже входят в траты: пропуск становится ключом ""
+    grouped = frame.groupby([frame["Категория"], _months(frame), frame["Номер карты"]], observed=True, dropna=False)
+    cells = pd.DataFrame(
+        {
+            CUBE_VALUES[0]: grouped["Сумма платежа"].sum().astype(float),
+            CUBE_VALUES[1]: grouped["Сумма платежа"].size(),
+            CUBE_VALUES[2]: grouped["Кэшбэк"].sum().astype(float),
+        }
+    )
+    keys = [cells.index.get_level_values(level) for level in range(len(CUBE_KEYS))]
+    cells.index = pd.MultiIndex.from_arrays(
+        [_fill_key(keys[0]), pd.DatetimeIndex(keys[1]), _fill_key(keys[2])], names=CUBE_KEYS
+    )
+    return cells
+
+
+def _fill_key(keys: pd.Index) -> pd.Index:
+    return keys.astype(object).fillna("").astype(str)
+
+
+def _row_hashes(frame: pd.DataFrame) -> np.ndarray:
+    """Хэши строк по SOURCE_COLUMNS (uint64); не зависят от типов колонок: category или строки, int или float"""
+    columns = {DATE_COLUMN: frame[DATE_COLUMN].to_numpy().astype("datetime64[s]").astype("int64")}
+    for name in SOURCE_COLUMNS[1:3]:
+        columns[name] = frame[name]
+    for name in SOURCE_COLUMNS[3:]:
+        columns[name] = frame[name].astype(float)
+    hashes: np.ndarray = pd.util.hash_pandas_object(pd.DataFrame(columns, index=frame.index), index=False).to_numpy()
+    return hashes
+
+
+def _rows_digest(frame: pd.DataFrame) -> int:
+    """
+    Хэш набора строк: сумма хэшей строк по модулю 2**64. Не зависит от порядка строк,
+    а хэш объединения равен сумме хэшей частей.
+    """
+    return int(_row_hashes(frame).sum(dtype=np.uint64))
+
+
+def _combine(current: pd.DataFrame | pd.Series, new: pd.DataFrame | pd.Series) -> pd.DataFrame | pd.Series:
+    if not len(current):
+        return new
+    if not len(new):
+        return current
+    return pd.concat([current, new]).groupby(level=list(range(current.index.nlevels))).sum()
+
+
+class AggregateStore:
+    """
+    Предагрегаты по транзакциям: траты и кэшбэк по карте и дню, бонусы по категории и месяцу
+    и куб трат (категория × месяц × карта → сумма платежей, количество операций, кэшбэк).
+    Обновляются за O(новых строк) при добавлении операций, поэтому статистика по картам и анализ кэшбэка
+    не зависят от длины истории. Хранятся в JSON-файле рядом с выпиской вместе с числом и хэшем
+    агрегированных строк и подписью файла выписки (source), по которым проверяется, что они ей соответствуют.
+    """
+
+    def __init__(
+        self,
+        cards: Optional[pd.DataFrame] = None,
+        cashback: Optional[pd.Series] = None,
+        rows: int = 0,
+        spending: Optional[pd.DataFrame] = None,
+        digest: int = 0,
+        source: Optional[tuple[int, int]] = None,
+    ) -> None:
+        empty_cards = pd.MultiIndex.from_arrays([[], pd.DatetimeIndex([])], names=CARD_KEYS)
+        empty_cashback = pd.MultiIndex.from_arrays([[], pd.DatetimeIndex([])], names=CASHBACK_KEYS)
+        empty_spending = pd.MultiIndex.from_arrays([[], pd.DatetimeIndex([]), []], names=CUBE_KEYS)
+        self.cards = cards if cards is not None else pd.DataFrame(columns=CARD_VALUES, index=empty_cards, dtype=float)
+        self.cashback = cashback if cashback is not None else pd.Series(index=empty_cashback, dtype="int64")
+        self.spending = (
+            spending
+            if spending is not None
+            else pd.DataFrame(
+                {name: pd.Series(dtype="int64" if name == CUBE_VALUES[1] else float) for name in CUBE_VALUES},
+                index=empty_spending,
+            )
+        )
+        # сколько строк выписки учтено (метки хранилища меньше rows) и их хэш _rows_digest
+        self.rows = rows
+        self.digest = digest
+        # время изменения и размер файла выписки, по которой построены предагрегаты
+        self.source = source
+
+    @classmethod
+    def build(cls, data: list[dict] | pd.DataFrame | TransactionStore) -> "AggregateStore":
+        """Строит предагрегаты по всем транзакциям"""
+        aggregates = cls()
+        aggregates.update(data)
+        return aggregates
+
+    def update(self, data: list[dict] | pd.DataFrame | TransactionStore) -> None:
+        """Добавляет в предагрегаты только новые транзакции"""
+        frame = as_store(data).frame
+        if not len(frame):
+            return
+        self.cards = _combine(self.cards, _card_days(frame))
+        self.cashback = _combine(self.cashback, _category_months(frame))
+        self.spending = _combine(self.spending, _spending_cells(frame))
+        self.rows += len(frame)
+        self.digest = (self.digest + _rows_digest(frame)) % 2**64
+        logger.debug("Aggregates updated with {} rows, total rows: {}", len(frame), self.rows)
+
+    def sync(self, store: TransactionStore) -> bool:
+        """
+        Учитывает только новые строки хранилища, если выписка лишь пополнена: агрегированные строки — это rows
+        первых по порядку загрузки строк (новые операции дописаны в конец) или rows последних (новые добавлены
+        в начало, как в выгрузке новыми операциями вперёд), что проверяется по хэшу. Возвращает False, если
+        выписка заменена или изменена — тогда предагрегаты нужно строить заново.
+        """
+        frame = store.frame
+        new_rows = len(frame) - self.rows
+        if new_rows < 0:
+            return False
+        hashes = _row_hashes(frame)
+        # место строки в порядке загрузки (метки индекса), а не в порядке дат
+        ranks = np.empty(len(frame), dtype=np.int64)
+        ranks[np.argsort(frame.index.to_numpy(), kind="stable")] = np.arange(len(frame))
+        for known in (ranks < self.rows, ranks >= new_rows):
+            if int(hashes[known].sum(dtype=np.uint64)) == self.digest:
+                self.update(store.subset(frame[~known]))
+                return True
+        return False
+
+    def card_statistics(self, start: datetime, end: datetime, store: TransactionStore) -> list:
+        """
+        Статистика по картам за период [start, end] в формате get_card_statistics.
+        Полные дни берутся из предагрегатов, неполные крайние дни — из хранилища бинарным поиском.
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        first_day, last_day = start.ceil("D"), end.normalize()
+
+        if first_day < last_day:
+            days = self.cards.index.get_level_values(CARD_KEYS[1])
+            parts = [
+                self.cards[(days >= first_day) & (days < last_day)].groupby(level=0).sum(),
+                card_totals(store.between(start, first_day, inclusive="left").frame),
+                card_totals(store.between(last_day, end).frame),
+            ]
+        else:
+            parts = [card_totals(store.between(start, end).frame)]
+
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return []
+        return format_card_statistics(pd.concat(parts).groupby(level=0).sum().rename_axis(CARD_KEYS[0]))
+
+    def cashback_by_category(self, year: int, month: int) -> pd.Series:
+        """Суммы бонусов по категориям за месяц года"""
+        months = self.cashback.index.get_level_values(CASHBACK_KEYS[1])
+        return self.cashback[months == pd.Timestamp(year, month, 1)].droplevel(CASHBACK_KEYS[1])
+
+    def spending_summary(
+        self,
+        start: datetime,
+        end: datetime,
+        store: TransactionStore,
+        categories: Optional[Iterable[str]] = None,
+        cards: Optional[Iterable[str]] = None,
+        by: tuple = ("Категория",),
+    ) -> pd.DataFrame:
+        """
+        Суммы платежей, количество операций и кэшбэк за период [start, end], сгруппированные по уровням куба by
+        (из CUBE_KEYS), с необязательным отбором категорий и карт. Полные месяцы складываются из ячеек куба,
+        неполные крайние месяцы считаются по хранилищу бинарным поиском.
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        month_start = start.to_period("M").to_timestamp()
+        first_month = month_start if start == month_start else month_start + pd.DateOffset(months=1)
+        last_month = end.to_period("M").to_timestamp()
+
+        if first_month < last_month:
+            months = self.spending.index.get_level_values(CUBE_KEYS[1])
+            parts = [
+                self.spending[(months >= first_month) & (months < last_month)],
+                _spending_cells(store.between(start, first_month, inclusive="left").frame),
+                _spending_cells(store.between(last_month, end).frame),
+            ]
+        else:
+            parts = [_spending_cells(store.between(start, end).frame)]
+
+        cells = pd.concat([part for part in parts if len(part)] or [self.spending.iloc[:0]])
+        if categories is not None:
+            cells = cells[cells.index.get_level_values(CUBE_KEYS[0]).isin(list(categories))]
+        if cards is not None:
+            cells = cells[cells.index.get_level_values(CUBE_KEYS[2]).isin(list(cards))]
+        return cells.groupby(level=list(by)).sum().sort_index()
+
+    def rolling_spending(self, months: int = 3, by: str = "Категория", value: str = "Сумма платежа") -> pd.DataFrame:
+        """
+        Скользящие суммы value за последние months календарных месяцев для каждого месяца и значения уровня by:
+        строки — месяцы без пропусков, колонки — категории (или карты).
+        """
+        cells = self.spending[value].groupby(level=[CUBE_KEYS[1], by]).sum().unstack(by, fill_value=0)
+        if not len(cells):
+            return cells
+        calendar = pd.date_range(cells.index.min(), cells.index.max(), freq="MS", name=CUBE_KEYS[1])
+        return cells.reindex(calendar, fill_value=0).rolling(months, min_periods=1).sum()
+
+    def save(self, path: str) -> None:
+        """Сохраняет предагрегаты в JSON-файл (атомарно)"""
+        payload = {
+            "rows": self.rows,
+            "digest": f"{self.digest:016x}",
+            "source": self.source,
+            "cards": [
+                [card, day.strftime("%Y-%m-%d"), *values]
+                for (card, day), values in zip(self.cards.index, self.cards.to_numpy().tolist())
+            ],
+            "cashback": [
+                [category, month.strftime("%Y-%m"), value]
+                for (category, month), value in zip(self.cashback.index, self.cashback.tolist())
+            ],
+            "spending": [
+                [category, month.strftime("%Y-%m"), card, total, int(count), cashback]
+                for (category, month, card), total, count, cashback in self.spending.itertuples(name=None)
+            ],
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        logger.debug("Aggregates saved: {}", path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["AggregateStore"]:
+        """
+        Загружает предагрегаты из JSON-файла; если файла нет, он повреждён или сохранён без куба трат
+        или хэша строк (предыдущей версией), возвращает None
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error("Error loading aggregates {}: {}", path, e)
+            return None
+        if "spending" not in payload or "digest" not in payload:
+            logger.debug("Aggregates {} were saved by a previous version, rebuilding", path)
+            return None
+
+        cards = pd.DataFrame(payload["cards"], columns=[*CARD_KEYS, *CARD_VALUES])
+        cards[CARD_KEYS[1]] = pd.to_datetime(cards[CARD_KEYS[1]], format="%Y-%m-%d")
+        cashback = pd.DataFrame(payload["cashback"], columns=[*CASHBACK_KEYS, CASHBACK_VALUE])
+        cashback[CASHBACK_KEYS[1]] = pd.to_datetime(cashback[CASHBACK_KEYS[1]], format="%Y-%m")
+        spending = pd.DataFrame(payload["spending"], columns=[*CUBE_KEYS, *CUBE_VALUES])
+        spending[CUBE_KEYS[1]] = pd.to_datetime(spending[CUBE_KEYS[1]], format="%Y-%m").astype("datetime64[s]")
+        return cls(
+            cards.set_index(list(CARD_KEYS)).astype(float),
+            cashback.set_index(list(CASHBACK_KEYS))[CASHBACK_VALUE],
+            payload["rows"],
+            spending.set_index(list(CUBE_KEYS)).astype(
+                {CUBE_VALUES[0]: float, CUBE_VALUES[1]: "int64", CUBE_VALUES[2]: float}
+            ),
+            int(payload["digest"], 16),
+            tuple(payload["source"]) if payload["source"] else None,
+        )
+
+
+def get_aggregates_path(filename: str) -> str:
+    """
+    Возвращает путь к файлу предагрегатов выписки (в папке кэша рядом с ней); имя включает расширение,
+    чтобы выписки operations.xlsx и operations.csv в одной папке не делили предагрегаты
+    """
+    return os.path.join(get_cache_dir(filename), f"{os.path.basename(filename)}-aggregates.json")
+
+
+def load_aggregates(
+    filename: str, store: TransactionStore, source: Optional[tuple[int, int]] = None
+) -> AggregateStore:
+    """
+    Возвращает предагрегаты выписки, согласованные с хранилищем. Сохранённые предагрегаты используются как есть,
+    если файл выписки не изменился (source — время изменения и размер, по умолчанию текущие), и дополняются
+    новыми строками, если выписка пополнена в конце или в начале (см. AggregateStore.sync); иначе строятся заново.
+    """
+    path = get_aggregates_path(filename)
+    if source is None:
+        source = file_signature(filename)
+    aggregates = AggregateStore.load(path)
+
+    if aggregates is not None and source is not None and aggregates.source == source and aggregates.rows == len(store):
+        return aggregates
+    if aggregates is None or not aggregates.sync(store):
+        logger.debug("Building aggregates for {}", filename)
+        aggregates = AggregateStore.build(store)
+
+    aggregates.source = source
+    aggregates.save(path)
+    return aggregates
+
+
+def append_transactions(
+    store: TransactionStore,
+    aggregates: AggregateStore,
+    data: list[dict] | pd.DataFrame,
+    path: Optional[str] = None,
+) -> None:
+    """Добавляет новые операции в хранилище и предагрегаты; при указании path сохраняет предагрегаты"""
+    store.append(data)
+    aggregates.update(data)
+    if path is not None:
+        aggregates.save(path)
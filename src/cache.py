@@ -0,0 +1,147 @@
+import hashlib
+import os
+from typing import Callable, Optional
+
+import pandas as pd
+from loguru import logger
+
+CACHE_DIR_NAME = ".cache"
+PICKLE_SUFFIX = ".pkl"
+
+try:
+    import pyarrow
+
+    CACHE_SUFFIX = ".parquet"
+    # Parquet не принимает, например, колонки object со значениями разных типов (число среди строк описания)
+    PARQUET_ERRORS: tuple[type[Exception], ...] = (pyarrow.ArrowException, TypeError, ValueError)
+except ImportError:
+    CACHE_SUFFIX = PICKLE_SUFFIX
+    PARQUET_ERRORS = ()
+
+
+def get_cache_dir(filename: str) -> str:
+    """Возвращает папку кэша, расположенную рядом с исходным файлом"""
+    return os.path.join(os.path.dirname(os.path.abspath(filename)), CACHE_DIR_NAME)
+
+
+def _cache_prefix(filename: str) -> str:
+    """Префикс имени кэша: имя файла и хэш абсолютного пути"""
+    path = os.path.abspath(filename)
+    path_hash = hashlib.sha1(path.encode("utf-8")).hexdigest()[:12]
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{stem}-{path_hash}-"
+
+
+def file_signature(filename: str) -> Optional[tuple[int, int]]:
+    """Время изменения (в наносекундах) и размер файла; None, если файла нет"""
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_cache_path(filename: str) -> str:
+    """Возвращает путь к кэшу файла с ключом (путь, mtime, размер)"""
+    stat = os.stat(filename)
+    name = f"{_cache_prefix(filename)}{stat.st_mtime_ns}-{stat.st_size}{CACHE_SUFFIX}"
+    return os.path.join(get_cache_dir(filename), name)
+
+
+def _cache_files(path: str) -> tuple[str, ...]:
+    """Файлы кэша одного ключа: основной формат и pickle для данных, которые не записываются в Parquet"""
+    if CACHE_SUFFIX == PICKLE_SUFFIX:
+        return (path,)
+    return path, path.removesuffix(CACHE_SUFFIX) + PICKLE_SUFFIX
+
+
+def _write_cache(df: pd.DataFrame, path: str) -> str:
+    """Записывает кэш (при ошибке Parquet — в pickle) и возвращает путь записанного файла"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    target = path
+    if CACHE_SUFFIX == PICKLE_SUFFIX:
+        _write_atomic(path, df.to_pickle)
+    else:
+        try:
+            _write_atomic(path, lambda tmp_path: df.to_parquet(tmp_path, index=False))
+        except PARQUET_ERRORS as e:
+            logger.debug("Data is not representable in Parquet, caching with pickle: {}", e)
+            target = _cache_files(path)[1]
+            _write_atomic(target, df.to_pickle)
+    # кэш того же ключа в другом формате (например, после rebuild) больше не актуален
+    for other in _cache_files(path):
+        if other != target and os.path.exists(other):
+            os.remove(other)
+    return target
+
+
+def _write_atomic(path: str, write: Callable[[str], None]) -> None:
+    tmp_path = f"{path}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _read_cache(path: str) -> pd.DataFrame:
+    if path.endswith(PICKLE_SUFFIX):
+        return pd.read_pickle(path)
+    return pd.read_parquet(path)
+
+
+def load_cached(filename: str, loader: Callable[[str], pd.DataFrame], rebuild: bool = False) -> pd.DataFrame:
+    """
+    Возвращает DataFrame из колоночного кэша, а при его отсутствии — через loader с сохранением в кэш.
+    Кэш привязан к пути, времени изменения и размеру файла; rebuild=True принудительно пересобирает кэш.
+    """
+    path = get_cache_path(filename)
+
+    if not rebuild:
+        for cached in _cache_files(path):
+            if os.path.exists(cached):
+                logger.debug("Loading cached data: {}", cached)
+                return _read_cache(cached)
+
+    logger.debug("Building cache for {}: {}", filename, path)
+    df = loader(filename)
+    _write_cache(df, path)
+    evict_stale(filename)
+    return df
+
+
+def evict_stale(filename: str) -> list[str]:
+    """Удаляет устаревшие кэши файла (или все его кэши, если файла больше нет). Возвращает удалённые пути"""
+    cache_dir = get_cache_dir(filename)
+    if not os.path.isdir(cache_dir):
+        return []
+
+    current = (
+        {os.path.basename(path) for path in _cache_files(get_cache_path(filename))}
+        if os.path.exists(filename)
+        else set()
+    )
+    prefix = _cache_prefix(filename)
+    removed = []
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix) and name not in current:
+            path = os.path.join(cache_dir, name)
+            os.remove(path)
+            removed.append(path)
+
+    logger.debug("Evicted stale cache files: {}", len(removed))
+    return removed
+
+
+def clear_cache(cache_dir: str) -> int:
+    """Удаляет все файлы кэша из указанной папки. Возвращает количество удалённых файлов"""
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    count = 0
+    for name in os.listdir(cache_dir):
+        os.remove(os.path.join(cache_dir, name))
+        count += 1
+    logger.debug("Cache cleared: {}, files: {}", cache_dir, count)
+    return count
@@ -0,0 +1,270 @@
+import argparse
+import os
+import re
+import sys
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    from src.aggregates import AggregateStore
+    from src.store import TransactionStore
+
+# Модули обработки (pandas и т.д.) импортируются внутри команд: разбор аргументов и --help их не загружают,
+# а каждая команда загружает только то, что ей нужно
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INPUT = os.path.join(current_dir, "..", "data", "operations.xlsx")
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Сколько функций с наибольшим накопленным временем печатает --profile
+PROFILE_LIMIT = 30
+
+
+def _load(args: argparse.Namespace) -> "TransactionStore":
+    """Выписка (.xlsx или .csv) через колоночный кэш рядом с файлом, если он не отключён --no-cache"""
+    from src.utils import read_transactions
+
+    return read_transactions(args.input, use_cache=not args.no_cache)
+
+
+def _aggregates(args: argparse.Namespace, store: "TransactionStore") -> Optional["AggregateStore"]:
+    if args.no_aggregates:
+        return None
+    from src.aggregates import load_aggregates
+
+    return load_aggregates(args.input, store)
+
+
+def cmd_main_page(args: argparse.Namespace) -> str:
+    from src.views import get_main_page
+
+    store = _load(args)
+    return get_main_page(store, args.date, _aggregates(args, store))
+
+
+def cmd_search(args: argparse.Namespace) -> str:
+    from src.services import search_transactions
+
+    return search_transactions(_load(args), args.pattern, tuple(args.scope))
+
+
+def cmd_p2p(args: argparse.Namespace) -> str:
+    from src.services import search_transactions_p2p
+
+    return search_transactions_p2p(_load(args))
+
+
+def cmd_phones(args: argparse.Namespace) -> str:
+    from src.services import search_transactions_by_phone
+
+    return search_transactions_by_phone(_load(args))
+
+
+def cmd_cashback(args: argparse.Namespace) -> str:
+    from src.services import analyze_cashback
+
+    store = _load(args)
+    aggregates = _aggregates(args, store)
+    # предагрегаты отвечают за месяц без прохода по транзакциям
+    return analyze_cashback(store if aggregates is None else aggregates, args.year, args.month)
+
+
+def cmd_report(args: argparse.Namespace) -> Optional[str]:
+    from src.reports import spending_by_categories, spending_by_category, write_report
+
+    store = _load(args)
+    if args.category:
+        # без декоратора save_report: отчёт пишется только туда, куда указывает --output
+        df = spending_by_category.__wrapped__(store, args.category, args.date)
+    else:
+        df = spending_by_categories(store, args.date)
+
+    if args.output:
+        write_report(args.output, df, args.format)
+        return None
+    csv: str = df.to_csv(index=False)
+    return csv.rstrip("\n")
+
+
+def cmd_serve(args: argparse.Namespace) -> None:
+    from src.server import TransForgeServer, WarmData
+
+    server = TransForgeServer((args.host, args.port), WarmData(args.input, not args.no_cache), args.watch_interval)
+    print(f"Serving {args.input} on {server.url} (Ctrl+C to stop)", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def cmd_bench(args: argparse.Namespace) -> None:
+    try:
+        from benchmarks.run import main as run_benchmarks
+    except ImportError as e:
+        sys.exit(f"transforge: error: benchmarks are available only in the project checkout: {e}")
+    run_benchmarks(args.bench_args)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="transforge", description="Анализ банковских операций из выписки")
+    subparsers = parser.add_subparsers(dest="command", required=True, metavar="command")
+
+    source = argparse.ArgumentParser(add_help=False)
+    source.add_argument(
+        "-i", "--input", default=DEFAULT_INPUT, help="выписка .xlsx или .csv (по умолчанию %(default)s)"
+    )
+    source.add_argument("--no-cache", action="store_true", help="читать выписку без колоночного кэша")
+    source.add_argument("--log-level", help="уровень логирования (по умолчанию LOG_LEVEL или INFO)")
+
+    common = argparse.ArgumentParser(add_help=False, parents=[source])
+    common.add_argument("-o", "--output", help="файл для результата (по умолчанию stdout)")
+    common.add_argument(
+        "--profile",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="профилировать команду (cProfile): сводка в stderr или статистика в FILE; включает метрики этапов",
+    )
+    common.add_argument("--metrics", nargs="?", const="", metavar="FILE", help="записать метрики этапов (Prometheus)")
+
+    aggregates = argparse.ArgumentParser(add_help=False)
+    aggregates.add_argument("--no-aggregates", action="store_true", help="считать по транзакциям без предагрегатов")
+
+    command = subparsers.add_parser(
+        "main-page", parents=[common, aggregates], help="JSON главной страницы на дату и время"
+    )
+    command.add_argument(
+        "--date",
+        default=datetime.now().strftime(DATETIME_FORMAT),
+        help='дата и время "%%Y-%%m-%%d %%H:%%M:%%S" (по умолчанию текущие)',
+    )
+    command.set_defaults(handler=cmd_main_page)
+
+    command = subparsers.add_parser("search", parents=[common], help="поиск операций по регулярному выражению")
+    command.add_argument("pattern", help="регулярное выражение")
+    command.add_argument("--scope", nargs="+", default=["Описание", "Категория"], help="колонки для поиска")
+    command.set_defaults(handler=cmd_search)
+
+    command = subparsers.add_parser("p2p", parents=[common], help="переводы физическим лицам")
+    command.set_defaults(handler=cmd_p2p)
+
+    command = subparsers.add_parser("phones", parents=[common], help="операции с номерами телефонов в описании")
+    command.set_defaults(handler=cmd_phones)
+
+    command = subparsers.add_parser("cashback", parents=[common, aggregates], help="кэшбэк по категориям за месяц")
+    command.add_argument("year", type=int)
+    command.add_argument("month", type=int)
+    command.set_defaults(handler=cmd_cashback)
+
+    command = subparsers.add_parser(
+        "report", parents=[common], help="траты за 3 месяца по категории или по всем категориям"
+    )
+    command.add_argument("--date", required=True, help='дата окончания окна "%%Y-%%m-%%d"')
+    command.add_argument("--category", help="категория (по умолчанию — сводка по всем категориям)")
+    command.add_argument(
+        "--format",
+        choices=["xlsx", "csv", "parquet", "feather", "ndjson"],
+        help="формат файла --output (по умолчанию по расширению); без --output печатается CSV",
+    )
+    command.set_defaults(handler=cmd_report)
+
+    command = subparsers.add_parser(
+        "serve", parents=[source], help="локальный HTTP-сервис с выпиской в памяти (JSON-эндпоинты)"
+    )
+    # значения по умолчанию совпадают с src.server: модуль сервера не импортируется ради разбора аргументов
+    command.add_argument("--host", default="127.0.0.1")
+    command.add_argument("--port", type=int, default=8000)
+    command.add_argument(
+        "--watch-interval",
+        type=float,
+        default=1.0,
+        help="период проверки изменения выписки, секунды (0 — не перечитывать; по умолчанию %(default)s)",
+    )
+    command.set_defaults(handler=cmd_serve, profile=None, metrics=None, output=None)
+
+    command = subparsers.add_parser(
+        "bench", help="бенчмарки (аргументы передаются benchmarks.run)", add_help=False, prefix_chars="\0"
+    )
+    command.add_argument("bench_args", nargs=argparse.REMAINDER)
+    command.set_defaults(handler=cmd_bench, profile=None, metrics=None, log_level="WARNING", output=None)
+
+    return parser
+
+
+def run(handler: Callable[[argparse.Namespace], Optional[str]], args: argparse.Namespace) -> Optional[str]:
+    """Выполняет команду; при --profile — под cProfile со сводкой в stderr или статистикой в файле"""
+    if args.profile is None:
+        return handler(args)
+
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    result = profiler.runcall(handler, args)
+    if args.profile == "-":
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(PROFILE_LIMIT)
+    else:
+        profiler.dump_stats(args.profile)
+    return result
+
+
+def _print_stages() -> None:
+    from src.metrics import get_metrics
+
+    for name, stage in sorted(get_metrics().items()):
+        print(
+            f"{name:<40} calls={stage['calls']:<4} time={stage['seconds_total']:.4f}s "
+            f"rows_in={stage['rows_in_total']} rows_out={stage['rows_out_total']}",
+            file=sys.stderr,
+        )
+
+
+def _write_result(result: str, output: Optional[str]) -> None:
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(result + "\n")
+        return
+    try:
+        print(result, flush=True)
+    except BrokenPipeError:
+        # вывод обрезан (например, через | head): остаток отбрасывается без трассировки при выходе
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    from dotenv import load_dotenv
+
+    # .env загружается до импорта модулей src: часть настроек (METRICS_ENABLED) читается при импорте
+    load_dotenv()
+
+    from src.logging_config import configure_logging
+    from src.metrics import METRICS_PATH, enable_metrics, metrics_enabled_by_env, write_metrics
+
+    configure_logging(args.log_level)
+    # метрики пишутся в файл по --metrics или при METRICS_ENABLED=1; --profile только печатает их в stderr.
+    # Флаг окружения проверяется заново: src.metrics мог быть импортирован раньше, если main вызвана из кода
+    save_metrics = args.metrics is not None or metrics_enabled_by_env()
+    if save_metrics or args.profile is not None:
+        enable_metrics()
+
+    try:
+        result = run(args.handler, args)
+    except (OSError, ValueError, re.error) as e:
+        print(f"transforge: error: {e}", file=sys.stderr)
+        return 1
+
+    if result is not None:
+        _write_result(result, args.output)
+
+    if args.profile is not None:
+        _print_stages()
+    if save_metrics:
+        write_metrics(args.metrics or METRICS_PATH)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
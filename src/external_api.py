@@ -1,34 +1,64 @@
+import functools
 import os
 
-import requests
-from dotenv import load_dotenv
 from loguru import logger
 
-load_dotenv()
+from src.market_cache import MISS, STALE, get_market_cache
+from src.metrics import timed
 
-# Конфигурация логгера
-current_dir = os.path.dirname(os.path.abspath(__file__))
-log_dir = os.path.join(current_dir, "..", "logs")
-os.makedirs(log_dir, exist_ok=True)
-log_file = os.path.join(log_dir, "external_api.log")
-logger.add(sink=log_file, level="DEBUG")
+CBR_DAILY_URL = "https://www.cbr-xml-daily.ru//daily_json.js"
+MARKETSTACK_EOD_URL = "http://api.marketstack.com/v2/eod"
 
+# Таймаут одного HTTP-запроса, секунды
+REQUEST_TIMEOUT = 5.0
 
-def get_currency_rate(currency_code: str):
-    """Возвращает текущий курс указанной валюты по коду ISO с сайта ЦБ РФ."""
-    url = "https://www.cbr-xml-daily.ru//daily_json.js"
+CBR_CACHE_KEY = "cbr:daily"
+
+
+@functools.cache
+def _load_env() -> None:
+    """Загружает .env при первом обращении к API, а не при импорте модуля"""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
+def _http_get(url: str, timeout: float):
+    # requests и urllib3 импортируются только при первом сетевом запросе
+    from src.http_client import get_http_client
+
+    return get_http_client().get(url, timeout=timeout)
+
+
+def _stock_cache_key(stock_name: str) -> str:
+    return f"eod:{stock_name}"
 
-    logger.debug(f"Sending GET request: {url=}")
-    response = requests.get(url)
+
+@timed("external_api.fetch_cbr_daily")
+def _fetch_cbr_daily(timeout: float) -> dict:
+    """Загружает документ daily_json.js ЦБ РФ и возвращает словарь валют по кодам"""
+    url = CBR_DAILY_URL
+
+    logger.debug("Sending GET request: url={}", url)
+    response = _http_get(url, timeout)
 
     if response.status_code != 200:
         raise ValueError("Failed to get currency rate")
 
-    data = response.json()
-    currency_data = data["Valute"].get(currency_code)
+    return response.json()["Valute"]
+
+
+def _get_cbr_daily(timeout: float) -> dict:
+    """Возвращает словарь валют ЦБ РФ из кэша рыночных данных, загружая его только при промахе"""
+    return get_market_cache().get_or_fetch(CBR_CACHE_KEY, lambda: _fetch_cbr_daily(timeout))
+
+
+def get_currency_rate(currency_code: str, timeout: float = REQUEST_TIMEOUT):
+    """Возвращает текущий курс указанной валюты по коду ISO с сайта ЦБ РФ."""
+    currency_data = _get_cbr_daily(timeout).get(currency_code)
 
     if not currency_data:
-        logger.debug(f"Error getting currency rate: {currency_code}")
+        logger.debug("Error getting currency rate: {}", currency_code)
         raise ValueError(f"No data for currency {currency_code}")
 
     result = {
@@ -36,23 +66,102 @@ def get_currency_rate(currency_code: str):
         "rate": currency_data["Value"],
     }
 
-    logger.debug(f"Getting currency rate: {result=}")
+    logger.debug("Getting currency rate: result={}", result)
     return result
 
 
-def get_stock_prices(stock_names: list) -> list:
+@timed()
+def get_currency_rates(currency_codes: list, timeout: float = REQUEST_TIMEOUT) -> tuple[list, list]:
+    """
+    Возвращает курсы нескольких валют по одному запросу к ЦБ РФ: (список курсов, список отсутствующих кодов).
+    Отсутствующие коды не прерывают обработку остальных.
+    """
+    valute = _get_cbr_daily(timeout)
+
+    rates = []
+    missing = []
+    for currency_code in currency_codes:
+        currency_data = valute.get(currency_code)
+        if not currency_data:
+            logger.debug("Error getting currency rate: {}", currency_code)
+            missing.append(currency_code)
+            continue
+        rates.append({"currency_code": currency_code, "rate": currency_data["Value"]})
+
+    logger.debug("Getting currency rates: rates={}, missing={}", rates, missing)
+    return rates, missing
+
+
+@timed("external_api.fetch_stock_prices")
+def _fetch_stock_prices(stock_names: list, timeout: float) -> list | None:
+    """Загружает цены закрытия тикеров одним запросом к Marketstack; при ошибке HTTP возвращает None"""
+    _load_env()
     api_key = os.getenv("MARKETSTACK_API_KEY")
-    """Получает котировки акций (цены закрытия) для списка тикеров через API Marketstack."""
     stock_name_str = ",".join(stock_names)
-    url = f"http://api.marketstack.com/v2/eod?access_key={api_key}&symbols={stock_name_str}"
+    url = f"{MARKETSTACK_EOD_URL}?access_key={api_key}&symbols={stock_name_str}"
 
-    logger.debug(f"Sending GET request: {url=}")
-    response = requests.get(url)
+    logger.debug("Sending GET request: url={}", url)
+    response = _http_get(url, timeout)
 
     if response.status_code != 200:
-        logger.error(f"Error getting stock prices: {response.status_code} {response.reason}")
-        return []
+        logger.error("Error getting stock prices: {} {}", response.status_code, response.reason)
+        return None
 
     json_data = response.json().get("data", [])
-    logger.debug(f"JSON data len: {url=}")
+    logger.debug("JSON data len: {}", len(json_data))
     return json_data
+
+
+def _cache_stock_prices(stock_names: list, json_data: list) -> dict[str, list]:
+    """Раскладывает ответ Marketstack по тикерам и сохраняет каждый тикер в кэш отдельно"""
+    by_symbol: dict[str, list] = {stock_name: [] for stock_name in stock_names}
+    for item in json_data:
+        by_symbol.setdefault(item.get("symbol"), []).append(item)
+
+    get_market_cache().set_many({_stock_cache_key(stock_name): by_symbol[stock_name] for stock_name in stock_names})
+    return by_symbol
+
+
+@timed()
+def get_stock_prices(stock_names: list, timeout: float = REQUEST_TIMEOUT) -> list:
+    """
+    Получает котировки акций (цены закрытия) для списка тикеров через API Marketstack.
+    Тикеры кэшируются по отдельности: запрашиваются только отсутствующие в кэше,
+    устаревшие отдаются из кэша и обновляются в фоне. Если запрос отсутствующих тикеров не удался,
+    возвращаются цены из кэша без них; ошибка выбрасывается, только если в кэше ничего нет.
+    """
+    cache = get_market_cache()
+    prices: dict[str, list] = {}
+    missing = []
+    stale = []
+    for stock_name in stock_names:
+        state, value = cache.get(_stock_cache_key(stock_name))
+        if state == MISS:
+            missing.append(stock_name)
+            continue
+        prices[stock_name] = value
+        if state == STALE:
+            stale.append(stock_name)
+
+    if missing:
+        try:
+            json_data = _fetch_stock_prices(missing, timeout)
+        except Exception as e:
+            # таймаут, разомкнутый автомат отключения, неверный ответ: цены из кэша не теряются
+            if not prices:
+                raise
+            logger.error("Error getting stock prices {}: {}", missing, e)
+            json_data = None
+        if json_data is not None:
+            prices.update(_cache_stock_prices(missing, json_data))
+
+    if stale:
+
+        def refresh() -> None:
+            json_data = _fetch_stock_prices(stale, timeout)
+            if json_data is not None:
+                _cache_stock_prices(stale, json_data)
+
+        cache.revalidate(tuple(_stock_cache_key(stock_name) for stock_name in stale), refresh)
+
+    return [item for stock_name in stock_names for item in prices.get(stock_name, [])]
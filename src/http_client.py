@@ -0,0 +1,175 @@
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
+
+# Таймаут одного HTTP-запроса по умолчанию, секунды
+DEFAULT_TIMEOUT = 5.0
+# Повторы при ошибках соединения, таймаутах и ответах 5xx; паузы между повторами растут экспоненциально
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF_FACTOR = 0.2
+RETRY_STATUSES = (500, 502, 503, 504)
+# Размер пула соединений на один хост
+DEFAULT_POOL_SIZE = 10
+# Автомат отключения: после FAILURE_THRESHOLD ошибок подряд запросы к хосту не выполняются RESET_TIMEOUT секунд
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+
+class CircuitOpenError(requests.RequestException):
+    """Запрос не выполнен: хост недоступен и автомат отключения разомкнут"""
+
+
+class CircuitBreaker:
+    """
+    Автомат отключения для одного хоста. После failure_threshold ошибок подряд размыкается и сразу отклоняет
+    запросы; через reset_timeout секунд пропускает один пробный запрос и замыкается, если он успешен.
+    """
+
+    def __init__(
+        self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD, reset_timeout: float = DEFAULT_RESET_TIMEOUT
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        """Можно ли выполнить запрос сейчас"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._probing and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def end_probe(self) -> None:
+        """Завершает пробный запрос, прерванный без результата: следующий вызов allow сможет пропустить новый"""
+        with self._lock:
+            self._probing = False
+
+
+class HttpClient:
+    """
+    Общий HTTP-клиент внешних API: пул соединений с keep-alive, таймаут по умолчанию,
+    ограниченные повторы с экспоненциальной паузой при ошибках соединения, таймаутах и ответах 5xx,
+    а также автомат отключения для каждого хоста.
+    """
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+    ) -> None:
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=("GET",),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        """Возвращает автомат отключения для хоста из URL"""
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[host]
+
+    def get(self, url: str, timeout: Optional[float] = None) -> requests.Response:
+        """
+        Выполняет GET-запрос через пул соединений. Ответы 5xx возвращаются после исчерпания повторов.
+        Если автомат отключения хоста разомкнут, сразу выбрасывает CircuitOpenError.
+        """
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {urlparse(url).netloc}")
+
+        try:
+            response = self.session.get(url, timeout=timeout if timeout is not None else self.timeout)
+            if response.status_code in RETRY_STATUSES:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            return response
+        except requests.ConnectionError as e:
+            breaker.record_failure()
+            # исчерпанные повторы по таймауту чтения requests сообщает как ConnectionError
+            reason = getattr(e.args[0], "reason", None) if e.args else None
+            if isinstance(reason, ReadTimeoutError):
+                raise requests.ReadTimeout(e, request=e.request) from e
+            raise
+        except requests.RequestException:
+            breaker.record_failure()
+            raise
+        finally:
+            # прочие исключения (например, KeyboardInterrupt) не должны оставлять автомат в пробном запросе навсегда
+            breaker.end_probe()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_http_client: Optional[HttpClient] = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Возвращает общий для процесса HTTP-клиент"""
+    global _http_client
+    if _http_client is None:
+        # одновременные первые вызовы из потоков котировок и курсов создают один клиент и одни автоматы отключения
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = HttpClient()
+    return _http_client
+
+
+def set_http_client(client: HttpClient) -> None:
+    """Подменяет общий HTTP-клиент (например, с другими таймаутами и числом повторов)"""
+    global _http_client
+    with _http_client_lock:
+        _http_client = client
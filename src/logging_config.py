@@ -0,0 +1,32 @@
+import os
+from typing import Optional, TextIO
+
+from loguru import logger
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+LOG_DIR = os.path.join(current_dir, "..", "logs")
+LOG_FILE = os.path.join(LOG_DIR, "app.log")
+# Уровень и асинхронная запись по умолчанию; переопределяются переменными окружения LOG_LEVEL и LOG_ENQUEUE
+DEFAULT_LEVEL = "INFO"
+DEFAULT_ENQUEUE = False
+LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {name}:{function}:{line} - {message}"
+
+
+def configure_logging(
+    level: Optional[str] = None, enqueue: Optional[bool] = None, sink: Optional[str | TextIO] = None
+) -> int:
+    """
+    Настраивает логирование приложения: один приёмник (по умолчанию файл logs/app.log) вместо приёмников
+    в каждом модуле. При enqueue=True записи уходят в очередь и пишутся фоновым потоком, не блокируя вызов.
+    Повторный вызов заменяет приёмник. Возвращает идентификатор обработчика loguru.
+    """
+    level = (level or os.getenv("LOG_LEVEL") or DEFAULT_LEVEL).upper()
+    if enqueue is None:
+        enqueue = os.getenv("LOG_ENQUEUE", str(DEFAULT_ENQUEUE)).lower() in ("1", "true", "yes")
+    if sink is None:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        sink = LOG_FILE
+
+    # удаляются и стандартный вывод в stderr, и приёмник предыдущей настройки
+    logger.remove()
+    return logger.add(sink, level=level, enqueue=enqueue, format=LOG_FORMAT)
@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from loguru import logger
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_PATH = os.path.join(current_dir, "..", "data", "market_cache.json")
+# Курсы ЦБ РФ и цены закрытия Marketstack обновляются раз в сутки; переопределяется MARKET_CACHE_TTL
+DEFAULT_TTL = 6 * 3600.0
+# Сколько ещё после истечения TTL можно отдавать устаревшее значение, обновляя его в фоне;
+# переопределяется MARKET_CACHE_STALE_TTL
+DEFAULT_STALE_TTL = 24 * 3600.0
+DEFAULT_MAX_ENTRIES = 512
+
+FRESH, STALE, MISS = "fresh", "stale", "miss"
+
+
+class MarketDataCache:
+    """
+    TTL-кэш внешних рыночных данных с сохранением в JSON-файл, вытеснением LRU
+    и режимом stale-while-revalidate: устаревшее значение отдаётся сразу, а обновляется в фоне.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = DEFAULT_PATH,
+        ttl: Optional[float] = None,
+        stale_ttl: Optional[float] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.path = path
+        # переменные окружения читаются при создании кэша, а не при импорте: к этому моменту .env уже загружен
+        if ttl is None:
+            ttl = float(os.getenv("MARKET_CACHE_TTL", DEFAULT_TTL))
+        if stale_ttl is None:
+            stale_ttl = float(os.getenv("MARKET_CACHE_STALE_TTL", DEFAULT_STALE_TTL))
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._refreshing: set[tuple] = set()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error("Error loading market cache {}: {}", self.path, e)
+            return
+        for key, (stored_at, value) in entries.items():
+            self._entries[key] = (stored_at, value)
+        self._evict()
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            key, _ = self._entries.popitem(last=False)
+            logger.debug("Evicted market cache entry: {}", key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> tuple[str, object]:
+        """Возвращает (состояние, значение): состояние FRESH, STALE (можно отдать, но пора обновить) или MISS"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISS, None
+            self._entries.move_to_end(key)
+
+        stored_at, value = entry
+        age = time.time() - stored_at
+        if age < self.ttl:
+            return FRESH, value
+        if age < self.ttl + self.stale_ttl:
+            return STALE, value
+        return MISS, None
+
+    def set(self, key: str, value: object) -> None:
+        """Сохраняет значение, вытесняет давно не использованные записи и записывает кэш на диск"""
+        self.set_many({key: value})
+
+    def set_many(self, items: dict[str, object]) -> None:
+        """Сохраняет несколько значений с одной записью кэша на диск"""
+        stored_at = time.time()
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = (stored_at, value)
+                self._entries.move_to_end(key)
+            self._evict()
+            self._save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def revalidate(self, keys: tuple, refresh: Callable[[], None]) -> None:
+        """Запускает фоновое обновление ключей, если оно ещё не выполняется"""
+        with self._lock:
+            if keys in self._refreshing:
+                return
+            self._refreshing.add(keys)
+
+        def run() -> None:
+            try:
+                refresh()
+            except Exception as e:
+                logger.error("Error refreshing market cache {}: {}", keys, e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(keys)
+
+        threading.Thread(target=run, name="market-cache-refresh", daemon=True).start()
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], object]) -> object:
+        """Возвращает значение из кэша; при промахе загружает его через fetch, устаревшее обновляет в фоне"""
+        state, value = self.get(key)
+        if state == MISS:
+            value = fetch()
+            self.set(key, value)
+        elif state == STALE:
+            self.revalidate((key,), lambda: self.set(key, fetch()))
+        return value
+
+
+_market_cache: Optional[MarketDataCache] = None
+_market_cache_lock = threading.Lock()
+
+
+def get_market_cache() -> MarketDataCache:
+    """Возвращает общий для процесса кэш рыночных данных"""
+    global _market_cache
+    if _market_cache is None:
+        # первый вызов может прийти одновременно из потоков котировок и курсов: кэш создаётся один раз
+        with _market_cache_lock:
+            if _market_cache is None:
+                _market_cache = MarketDataCache()
+    return _market_cache
+
+
+def set_market_cache(cache: MarketDataCache) -> None:
+    """Подменяет общий кэш рыночных данных (например, отдельным файлом или кэшем в памяти для тестов)"""
+    global _market_cache
+    with _market_cache_lock:
+        _market_cache = cache
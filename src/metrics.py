@@ -0,0 +1,253 @@
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Optional, ParamSpec, TypeVar
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+METRICS_PATH = os.path.join(current_dir, "..", "logs", "metrics.prom")
+METRICS_PREFIX = "transforge_stage"
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+def metrics_enabled_by_env() -> bool:
+    """Включены ли метрики переменной окружения METRICS_ENABLED"""
+    return os.getenv("METRICS_ENABLED", "0").lower() in ("1", "true", "yes")
+
+
+# Метрики выключены по умолчанию: выключенный этап стоит одну проверку флага
+_enabled = metrics_enabled_by_env()
+_memory = False
+_started_tracemalloc = False
+_local = threading.local()
+
+
+class Metrics:
+    """Накопленные метрики этапов: число вызовов, время, строки на входе и выходе, пик выделенной памяти"""
+
+    def __init__(self) -> None:
+        self._stages: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        name: str,
+        seconds: float,
+        rows_in: Optional[int] = None,
+        rows_out: Optional[int] = None,
+        peak_bytes: Optional[int] = None,
+    ) -> None:
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = self._stages[name] = {
+                    "calls": 0,
+                    "seconds_total": 0.0,
+                    "seconds_max": 0.0,
+                    "seconds_last": 0.0,
+                    "rows_in_total": 0,
+                    "rows_out_total": 0,
+                    "peak_bytes_max": 0,
+                }
+            stage["calls"] += 1
+            stage["seconds_total"] += seconds
+            stage["seconds_max"] = max(stage["seconds_max"], seconds)
+            stage["seconds_last"] = seconds
+            if rows_in is not None:
+                stage["rows_in_total"] += rows_in
+            if rows_out is not None:
+                stage["rows_out_total"] += rows_out
+            if peak_bytes is not None:
+                stage["peak_bytes_max"] = max(stage["peak_bytes_max"], peak_bytes)
+
+    def snapshot(self) -> dict[str, dict]:
+        """Копия метрик по этапам"""
+        with self._lock:
+            return {name: dict(stage) for name, stage in self._stages.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+    def to_prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus (exposition format)"""
+        stages = self.snapshot()
+        series = [
+            ("calls_total", "counter", "Number of stage calls", "calls"),
+            ("seconds_total", "counter", "Total wall time of the stage, seconds", "seconds_total"),
+            ("seconds_max", "gauge", "Maximum wall time of one stage call, seconds", "seconds_max"),
+            ("rows_in_total", "counter", "Rows passed into the stage", "rows_in_total"),
+            ("rows_out_total", "counter", "Rows returned by the stage", "rows_out_total"),
+            ("peak_bytes", "gauge", "Maximum peak of memory allocated during the stage, bytes", "peak_bytes_max"),
+        ]
+        lines = []
+        for suffix, metric_type, help_text, key in series:
+            metric = f"{METRICS_PREFIX}_{suffix}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {metric_type}")
+            for name, stage in sorted(stages.items()):
+                lines.append(f'{metric}{{stage="{name}"}} {stage[key]}')
+        return "\n".join(lines) + "\n"
+
+
+_metrics = Metrics()
+
+
+class Span:
+    """Замер одного этапа; rows_out можно задать внутри блока with"""
+
+    __slots__ = ("name", "rows_in", "rows_out", "_start", "_memory_start", "_child_peak")
+
+    def __init__(self, name: str, rows_in: Optional[int] = None) -> None:
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out: Optional[int] = None
+        self._child_peak = 0
+
+    def __enter__(self) -> "Span":
+        stack = _span_stack()
+        if _memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # пик до начала этапа принадлежит объемлющему этапу: сохраняем его перед сбросом
+            if stack:
+                stack[-1]._child_peak = max(stack[-1]._child_peak, peak)
+            tracemalloc.reset_peak()
+            self._memory_start = current
+        else:
+            self._memory_start = None
+        stack.append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        seconds = time.perf_counter() - self._start
+        stack = _span_stack()
+        stack.pop()
+
+        peak_bytes = None
+        if self._memory_start is not None and tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], self._child_peak)
+            if stack:
+                stack[-1]._child_peak = max(stack[-1]._child_peak, peak)
+            peak_bytes = max(0, peak - self._memory_start)
+
+        _metrics.record(self.name, seconds, self.rows_in, self.rows_out, peak_bytes)
+
+
+class _NoopSpan:
+    """Этап при выключенных метриках: ничего не замеряет"""
+
+    rows_in = None
+    rows_out = None
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _span_stack() -> list[Span]:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def span(name: str, rows_in: Optional[int] = None) -> Span | _NoopSpan:
+    """
+    Контекстный менеджер замера этапа: время, строки на входе (rows_in) и выходе (span.rows_out)
+    и пик выделенной памяти, если метрики включены с memory=True.
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return Span(name, rows_in)
+
+
+def count_rows(value: Any) -> Optional[int]:
+    """
+    Количество строк в транзакциях или результате этапа (список, словарь, DataFrame, TransactionStore);
+    для строк (JSON), кортежей и прочих значений — None
+    """
+    if isinstance(value, (str, bytes, tuple)) or not hasattr(value, "__len__"):
+        return None
+    return len(value)
+
+
+def timed(name: Optional[str] = None) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """
+    Декоратор замера функции как этапа. Имя по умолчанию — "<модуль>.<функция>";
+    строки на входе считаются по первому аргументу, на выходе — по результату (см. count_rows).
+    Сигнатура функции сохраняется для проверки типов.
+    """
+
+    def decorator(func: Callable[P, R]) -> Callable[P, R]:
+        stage = name or f"{func.__module__.removeprefix('src.')}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(stage, count_rows(args[0]) if args else None) as current:
+                result = func(*args, **kwargs)
+                current.rows_out = count_rows(result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def enable_metrics(memory: bool = False) -> None:
+    """
+    Включает сбор метрик. При memory=True запускается tracemalloc и для этапов записывается пик
+    выделенной памяти (это заметно замедляет выполнение; пик общий для процесса, а не для потока).
+    """
+    global _enabled, _memory, _started_tracemalloc
+    _enabled = True
+    _memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+
+
+def disable_metrics() -> None:
+    """Выключает сбор метрик; накопленные значения сохраняются"""
+    global _enabled, _memory, _started_tracemalloc
+    _enabled = False
+    _memory = False
+    if _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
+
+
+def metrics_enabled() -> bool:
+    return _enabled
+
+
+def get_metrics() -> dict[str, dict]:
+    """Метрики по этапам: {"views.get_main_page": {"calls": ..., "seconds_total": ..., ...}}"""
+    return _metrics.snapshot()
+
+
+def reset_metrics() -> None:
+    _metrics.reset()
+
+
+def write_metrics(path: str = METRICS_PATH) -> str:
+    """Записывает метрики в файл в текстовом формате Prometheus (атомарно) и возвращает путь"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(_metrics.to_prometheus())
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,174 @@
+import copy
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Optional, overload
+
+import numpy as np
+import pandas as pd
+
+from src.search_index import TrigramIndex, to_text
+from src.store import TransactionStore, as_store
+
+# Предикат получает хранилище и позиции строк-кандидатов, возвращает булеву маску по этим позициям
+Predicate = Callable[[TransactionStore, np.ndarray], np.ndarray]
+
+# Стоимость предиката: дешёвые сравнения выполняются раньше регулярных выражений
+CHEAP, REGEX = 0, 1
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(search: str) -> re.Pattern:
+    """Возвращает скомпилированное регулярное выражение (с кэшированием)"""
+    return re.compile(search)
+
+
+def match_column(column: pd.Series, pattern: re.Pattern, index: Optional[TrigramIndex] = None) -> np.ndarray:
+    """
+    Возвращает булеву маску совпадений по колонке; паттерн проверяется только на уникальных значениях.
+    При наличии триграммного индекса проверяются только категории-кандидаты.
+    """
+    candidates = index.candidate_codes(column, pattern) if index is not None else None
+    if candidates is not None:
+        codes = column.cat.codes.to_numpy()
+        return np.isin(codes, candidates[_contains(column.cat.categories[candidates], pattern)])
+
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        codes, uniques = column.cat.codes.to_numpy(), column.cat.categories
+    else:
+        codes, uniques = pd.factorize(column, use_na_sentinel=False)
+
+    matched = _contains(uniques, pattern)
+    # код -1 (пропуск в категориальной колонке) указывает на последний элемент — False
+    return np.append(matched, False)[codes]
+
+
+def _contains(values: pd.Index | np.ndarray, pattern: re.Pattern) -> np.ndarray:
+    """
+    Проверяет паттерн на уникальных значениях через re.search. Series.str.contains не подходит:
+    для строк pyarrow он выполняет RE2, где \\b и \\w распознают только ASCII, и кириллица не совпадает.
+    """
+    texts = [to_text(value) for value in values]
+    return np.fromiter(
+        (text is not None and pattern.search(text) is not None for text in texts), dtype=bool, count=len(texts)
+    )
+
+
+def _candidates(frame: pd.DataFrame, column: str, positions: np.ndarray) -> pd.Series:
+    """Возвращает значения колонки только для строк-кандидатов"""
+    series = frame[column]
+    return series if len(positions) == len(series) else series.iloc[positions]
+
+
+def _isin(column: str, values: tuple) -> Predicate:
+    def predicate(store: TransactionStore, positions: np.ndarray) -> np.ndarray:
+        frame = store.frame
+        if column not in frame.columns:
+            return np.zeros(len(positions), dtype=bool)
+        series = frame[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # сравнение целочисленных кодов категорий вместо строк
+            codes = series.cat.codes.to_numpy()[positions]
+            wanted = series.cat.categories.get_indexer(values)
+            return np.isin(codes, wanted[wanted >= 0])
+        return _candidates(frame, column, positions).isin(values).to_numpy()
+
+    return predicate
+
+
+def _matches(pattern: re.Pattern, scope: tuple) -> Predicate:
+    def predicate(store: TransactionStore, positions: np.ndarray) -> np.ndarray:
+        frame = store.frame
+        mask = np.zeros(len(positions), dtype=bool)
+        for column in scope:
+            if column in frame.columns:
+                mask |= match_column(_candidates(frame, column, positions), pattern, store.index)
+        return mask
+
+    return predicate
+
+
+def _spending(store: TransactionStore, positions: np.ndarray) -> np.ndarray:
+    return (_candidates(store.frame, "Сумма платежа", positions) < 0).to_numpy()
+
+
+class Query:
+    """
+    Построитель запроса к транзакциям: Query().category("Переводы").description_matches(r"...").between(a, b).
+    Каждый метод возвращает новый запрос, поэтому запросы можно хранить и переиспользовать.
+    При выполнении окно дат выбирается бинарным поиском, затем предикаты проверяются по очереди
+    (дешёвые сравнения раньше регулярных выражений) только на строках, прошедших предыдущие условия, —
+    вся цепочка обходится одним проходом по данным вместо N полных поисков.
+    """
+
+    def __init__(self) -> None:
+        self._window: Optional[tuple[datetime, datetime, str]] = None
+        self._predicates: list[tuple[int, Predicate]] = []
+
+    def _extend(self, cost: int, predicate: Predicate) -> "Query":
+        query = copy.copy(self)
+        query._predicates = [*self._predicates, (cost, predicate)]
+        return query
+
+    def between(self, start: datetime, end: datetime) -> "Query":
+        """Операции с датой в диапазоне [start, end]"""
+        query = copy.copy(self)
+        query._window = (start, end, "both")
+        return query
+
+    def month(self, year: int, month: int) -> "Query":
+        """Операции за указанный месяц года"""
+        query = copy.copy(self)
+        query._window = (datetime(year, month, 1), datetime(year + month // 12, month % 12 + 1, 1), "left")
+        return query
+
+    def category(self, *names: str) -> "Query":
+        """Операции с точным совпадением категории"""
+        return self._extend(CHEAP, _isin("Категория", names))
+
+    def card(self, *cards: str) -> "Query":
+        """Операции по указанным картам (например, "*7197")"""
+        return self._extend(CHEAP, _isin("Номер карты", cards))
+
+    def spending(self) -> "Query":
+        """Только списания (отрицательная сумма платежа)"""
+        return self._extend(CHEAP, _spending)
+
+    def matches(self, search: str, scope: tuple = ("Описание", "Категория")) -> "Query":
+        """Операции, у которых паттерн найден хотя бы в одной из колонок scope"""
+        return self._extend(REGEX, _matches(compile_pattern(search), scope))
+
+    def description_matches(self, search: str) -> "Query":
+        """Операции, в описании которых найден паттерн"""
+        return self.matches(search, scope=("Описание",))
+
+    def _select(self, store: TransactionStore) -> TransactionStore:
+        if self._window is not None:
+            start, end, inclusive = self._window
+            store = store.between(start, end, inclusive=inclusive)
+
+        positions = np.arange(len(store))
+        for _, predicate in sorted(self._predicates, key=lambda item: item[0]):
+            if not len(positions):
+                break
+            positions = positions[predicate(store, positions)]
+
+        return store.subset(store.frame.iloc[positions])
+
+    @overload
+    def run(self, data: list[dict]) -> list[dict]: ...
+
+    @overload
+    def run(self, data: pd.DataFrame | TransactionStore) -> TransactionStore: ...
+
+    def run(self, data: list[dict] | pd.DataFrame | TransactionStore) -> list[dict] | TransactionStore:
+        """
+        Выполняет запрос. Для TransactionStore (и DataFrame) возвращает TransactionStore,
+        для списка словарей — список исходных словарей в исходном порядке.
+        """
+        if isinstance(data, list):
+            # без окна дат типизация не нужна: даты остаются в исходном виде
+            store = TransactionStore(pd.DataFrame(data), typed=self._window is None)
+            labels = np.sort(self._select(store).frame.index.to_numpy())
+            return [data[label] for label in labels]
+        return self._select(as_store(data))
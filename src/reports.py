@@ -1,33 +1,139 @@
-import json
+import atexit
+import functools
+import importlib.util
 import os
+import queue
+import threading
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Optional
 
 import pandas as pd
 from dateutil.relativedelta import relativedelta
 from loguru import logger
 
-from src.services import search_transactions
+from src.aggregates import AggregateStore
+from src.metrics import timed
+from src.query import Query
+from src.store import CATEGORICAL_COLUMNS, DATE_COLUMN, TransactionStore, as_store
 
-# Конфигурация логгера
 current_dir = os.path.dirname(os.path.abspath(__file__))
-log_dir = os.path.join(current_dir, "..", "logs")
-os.makedirs(log_dir, exist_ok=True)
-log_file = os.path.join(log_dir, "reports.log")
-logger.add(sink=log_file, level="DEBUG")
 
+# Форматы отчётов по расширению файла
+REPORT_FORMATS = {
+    ".xlsx": "xlsx",
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".feather": "feather",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+}
+REPORT_EXTENSIONS = {"xlsx": ".xlsx", "csv": ".csv", "parquet": ".parquet", "feather": ".feather", "ndjson": ".ndjson"}
+
+# xlsxwriter пишет Excel заметно быстрее openpyxl; используется, если установлен.
+# Наличие проверяется без импорта: pandas загрузит движок только при записи Excel
+EXCEL_ENGINE = "xlsxwriter" if importlib.util.find_spec("xlsxwriter") is not None else "openpyxl"
+
+
+# Сколько отчётов может ожидать фоновой записи; при заполнении очереди вызов ждёт, пока писатель освободит место
+REPORT_QUEUE_SIZE = 8
+
+
+class ReportWriter:
+    """Фоновая запись отчётов: очередь ограниченной длины и один поток-писатель, запускаемый при первом отчёте"""
+
+    def __init__(self, maxsize: int = REPORT_QUEUE_SIZE) -> None:
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._pending = 0
+        self._errors: list[tuple[str, Exception]] = []
+        self._done = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, filename: str, df: pd.DataFrame, format: Optional[str] = None) -> None:
+        """
+        Ставит отчёт в очередь. В очередь кладётся полная копия: при pandas 2 без copy-on-write поверхностная копия
+        делит данные с исходной таблицей, и изменения вызывающего до записи попали бы в отчёт
+        """
+        with self._done:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="report-writer", daemon=True)
+                self._thread.start()
+            self._pending += 1
+        self._queue.put((filename, df.copy(), format))
+
+    def _run(self) -> None:
+        while True:
+            filename, df, format = self._queue.get()
+            try:
+                write_report(filename, df, format)
+                logger.debug("Report written in background: {}", filename)
+            except Exception as e:
+                logger.error("Error writing report {}: {}", filename, e)
+                with self._done:
+                    self._errors.append((filename, e))
+            finally:
+                with self._done:
+                    self._pending -= 1
+                    self._done.notify_all()
+
+    @property
+    def pending(self) -> int:
+        """Количество отчётов, ещё не записанных на диск"""
+        return self._pending
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """
+        Ждёт, пока все поставленные отчёты будут записаны. Выбрасывает TimeoutError, если не успели за timeout,
+        и первую ошибку записи, если она была (ошибки сбрасываются).
+        """
+        with self._done:
+            if not self._done.wait_for(lambda: self._pending == 0, timeout):
+                raise TimeoutError(f"Reports are still being written: {self._pending}")
+            errors, self._errors = self._errors, []
+        if errors:
+            raise errors[0][1]
+
+
+_report_writer = ReportWriter()
+
+
+def flush_reports(timeout: Optional[float] = None) -> None:
+    """Ждёт записи всех отчётов, сохраняемых в фоне (save_report(background=True))"""
+    _report_writer.flush(timeout)
+
+
+@atexit.register
+def _flush_reports_at_exit() -> None:
+    try:
+        _report_writer.flush()
+    except Exception as e:
+        logger.error("Error writing reports at exit: {}", e)
+
+
+def save_report(filename: str = "", background: bool = False, format: Optional[str] = None):
+    """
+    Декоратор: сохраняет результат функции в файл отчёта (по умолчанию Excel).
+    Формат задаётся параметром format или определяется по расширению filename (см. write_report).
+    При background=True запись выполняется в фоновом потоке, и функция возвращает результат сразу;
+    дождаться записи можно через flush_reports().
+    """
+    if format is not None:
+        report_format(filename, format)
 
-def save_report(filename: str = ""):
     def my_decorator(func):
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
             nonlocal filename
             result = func(*args, **kwargs)
-            logger.debug(f"Start saving report with decorator into: {filename}")
+            logger.debug("Start saving report with decorator into: {}", filename)
             if filename == "":
-                name = f"{func.__name__}_{datetime.now().strftime("%Y_%m_%d_%H%M")}_report.xlsx"
+                extension = REPORT_EXTENSIONS[format or "xlsx"]
+                name = f"{func.__name__}_{datetime.now().strftime("%Y_%m_%d_%H%M")}_report{extension}"
                 filename = os.path.join(current_dir, "..", "data", name)
 
-            write_report(filename, result)
+            if background:
+                _report_writer.submit(filename, result, format)
+            else:
+                write_report(filename, result, format)
             return result
 
         return wrapper
@@ -36,29 +142,119 @@ def save_report(filename: str = ""):
 
 
 @save_report()
-def spending_by_category(transactions: pd.DataFrame, category: str, date: Optional[str] = None) -> pd.DataFrame:
-    """Возвращает DataFrame транзакций за последние 3 месяца по заданной категории"""
+@timed("reports.spending_by_category")
+def spending_by_category(
+    transactions: pd.DataFrame | TransactionStore, category: str, date: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Возвращает DataFrame транзакций за последние 3 месяца до date ("%Y-%m-%d", по умолчанию сегодня)
+    по заданной категории. Исходные данные не изменяются: окно дат и категория проверяются по типизированным колонкам,
+    поэтому функцию можно вызывать повторно (например, в цикле по категориям) на одном и том же DataFrame.
+    """
+    found = _category_query(category, date).run(transactions)
+    return _format_spending(found.frame)
+
+
+@timed()
+def spending_by_categories(
+    transactions: pd.DataFrame | TransactionStore,
+    date: str,
+    categories: Optional[Iterable[str]] = None,
+    aggregates: Optional[AggregateStore] = None,
+) -> pd.DataFrame:
+    """
+    Траты за последние 3 месяца по всем категориям (или только по categories) одним проходом groupby:
+    колонки "Категория", "Сумма платежа" (сумма) и "Количество операций", по алфавиту категорий.
+    При наличии предагрегатов полные месяцы окна берутся из куба трат, по транзакциям считаются только крайние.
+    """
+    if aggregates is not None:
+        dt = datetime.strptime(date, "%Y-%m-%d")
+        summary = aggregates.spending_summary(
+            dt - relativedelta(months=3), dt, as_store(transactions), categories=categories
+        )
+        return summary[["Сумма платежа", "Количество операций"]].reset_index()
+
+    query = _window_query(date)
+    if categories is not None:
+        query = query.category(*categories)
+    window = query.run(transactions).frame
+
+    grouped = window.groupby("Категория", observed=True)["Сумма платежа"].agg(["sum", "count"])
+    logger.debug("Spending by categories calculated: {} categories, {} operations", len(grouped), len(window))
+    return (
+        grouped.rename(columns={"sum": "Сумма платежа", "count": "Количество операций"})
+        .sort_index()
+        .reset_index()
+        .astype({"Категория": str})
+    )
+
+
+@save_report()
+def spending_by_category_stream(
+    chunks: Iterable[TransactionStore], category: str, date: Optional[str] = None
+) -> pd.DataFrame:
+    """Траты по категории за последние 3 месяца, собранные по порциям транзакций (см. iter_transactions)"""
+    query = _category_query(category, date)
+    found: list[pd.DataFrame] = []
+    for chunk in chunks:
+        # в памяти остаются только найденные строки каждой порции (и пустая первая — ради набора колонок)
+        frame = query.run(chunk).frame
+        if len(frame) or not found:
+            found.append(frame)
+    return _format_spending(pd.concat(found) if found else pd.DataFrame())
+
+
+def _window_query(date: str) -> Query:
+    """Запрос операций за последние 3 месяца до даты "%Y-%m-%d" включительно"""
     dt = datetime.strptime(date, "%Y-%m-%d")
+    return Query().between(dt - relativedelta(months=3), dt)
+
+
+def _category_query(category: str, date: Optional[str]) -> Query:
+    # Окно дат выбирается бинарным поиском, категория сравнивается по кодам category без разбора строк
+    if date is None:
+        date = datetime.now().strftime("%Y-%m-%d")
+    return _window_query(date).category(category)
 
-    # Преобразуем столбец с датой в datetime
-    transactions["Дата операции"] = pd.to_datetime(transactions["Дата операции"], format="%d.%m.%Y %H:%M:%S")
 
-    # Фильтруем за последние 3 месяца
-    three_months_ago = dt - relativedelta(months=3)
-    df_filtered = transactions[
-        (transactions["Дата операции"] >= three_months_ago) & (transactions["Дата операции"] <= dt)
-    ].copy()
-    df_filtered["Дата операции"] = df_filtered["Дата операции"].dt.strftime("%Y-%m-%d %H:%M:%S")
+def _format_spending(found: pd.DataFrame) -> pd.DataFrame:
+    result = found.sort_index().reset_index(drop=True)
+    # категории только найденных строк: отчёт по хранилищу и по порциям (где concat теряет category) совпадает
+    for col in CATEGORICAL_COLUMNS:
+        if col in result.columns:
+            result[col] = result[col].astype("category").cat.remove_unused_categories()
+    if DATE_COLUMN in result.columns:
+        result[DATE_COLUMN] = result[DATE_COLUMN].dt.strftime("%Y-%m-%d %H:%M:%S")
+    return result
 
-    # Преобразуем в список словарей и в JSON
-    result = df_filtered.to_dict("records")
 
-    # Фильтруем по категории
-    data_json = search_transactions(result, search=category, scope=("Категория",))
-    data_dict = json.loads(data_json)
-    return pd.DataFrame(data_dict)
+def report_format(filename: str, format: Optional[str] = None) -> str:
+    """Возвращает формат отчёта: указанный явно или определённый по расширению файла"""
+    if format is None:
+        extension = os.path.splitext(filename)[1].lower()
+        if extension not in REPORT_FORMATS:
+            raise ValueError(f"Unsupported report format: {extension}")
+        return REPORT_FORMATS[extension]
+    if format not in REPORT_FORMATS.values():
+        raise ValueError(f"Unsupported report format: {format}")
+    return format
 
 
-def write_report(filename: str, df: pd.DataFrame):
-    with pd.ExcelWriter(filename) as writer:
-        df.to_excel(writer, sheet_name="Sheet1")
+@timed()
+def write_report(filename: str, df: pd.DataFrame, format: Optional[str] = None):
+    """
+    Записывает отчёт в файл. Формат задаётся явно или по расширению: xlsx, csv, parquet, feather, ndjson.
+    Parquet и Feather требуют pyarrow; Excel пишется через xlsxwriter, если он установлен.
+    """
+    report_type = report_format(filename, format)
+    if report_type == "xlsx":
+        with pd.ExcelWriter(filename, engine=EXCEL_ENGINE) as writer:
+            df.to_excel(writer, sheet_name="Sheet1")
+    elif report_type == "csv":
+        df.to_csv(filename, index=False, encoding="utf-8")
+    elif report_type == "parquet":
+        df.to_parquet(filename, index=False)
+    elif report_type == "feather":
+        df.reset_index(drop=True).to_feather(filename)
+    else:
+        df.to_json(filename, orient="records", lines=True, force_ascii=False, date_format="iso")
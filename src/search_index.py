@@ -0,0 +1,127 @@
+import re
+from collections import defaultdict
+from datetime import datetime
+from functools import reduce
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.store import DATE_FORMAT, TransactionStore
+
+try:
+    from re import _parser as sre_parse  # type: ignore[attr-defined]
+except ImportError:  # pragma: no cover - Python < 3.11
+    import sre_parse  # type: ignore[no-redef]
+
+NGRAM = 3
+INDEX_COLUMNS = ("Описание", "Категория")
+
+
+def to_text(value: object) -> str | None:
+    """Приводит значение ячейки к строке для поиска; значения других типов не участвуют в поиске"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, bool, float, np.number, np.bool_)):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.strftime(DATE_FORMAT)
+    return None
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i : i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def required_literals(pattern: re.Pattern) -> list[str]:
+    """
+    Возвращает литералы, которые обязаны присутствовать в любой строке, совпадающей с паттерном.
+    Для паттернов с IGNORECASE и конструкций, которые нельзя разобрать, возвращает пустой список.
+    """
+    if pattern.flags & re.IGNORECASE:
+        return []
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except (re.error, TypeError):
+        return []
+
+    literals: list[str] = []
+
+    def walk(items: list) -> None:
+        current: list[str] = []
+        for op, arg in items:
+            if op is sre_parse.LITERAL:
+                current.append(chr(arg))
+                continue
+            literals.append("".join(current))
+            current = []
+            if op is sre_parse.SUBPATTERN and not arg[1] & re.IGNORECASE:
+                walk(arg[-1])
+            elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and arg[0] >= 1:
+                walk(arg[2])
+        literals.append("".join(current))
+
+    walk(list(parsed))
+    return [literal for literal in literals if len(literal) >= NGRAM]
+
+
+class TrigramIndex:
+    """
+    Триграммный индекс по категориям текстовых колонок хранилища (например, "Описание" и "Категория").
+    Индекс хранит для каждой триграммы коды категорий, в которых она встречается, и позволяет
+    проверять регулярное выражение только на категориях-кандидатах. Так как индекс построен по значениям,
+    а не по строкам, он остаётся верным для любых выборок из того же хранилища.
+    """
+
+    def __init__(self, frame: pd.DataFrame, columns: tuple) -> None:
+        self._columns: dict[str, tuple[pd.Index, dict[str, np.ndarray]]] = {}
+        for column in columns:
+            if column in frame.columns and isinstance(frame[column].dtype, pd.CategoricalDtype):
+                categories = frame[column].cat.categories
+                self._columns[column] = (categories, self._build(categories))
+
+    @staticmethod
+    def _build(categories: pd.Index) -> dict[str, np.ndarray]:
+        postings: dict[str, list[int]] = defaultdict(list)
+        for code, value in enumerate(categories):
+            text = to_text(value)
+            if text:
+                for trigram in _trigrams(text):
+                    postings[trigram].append(code)
+        return {trigram: np.array(codes, dtype=np.int64) for trigram, codes in postings.items()}
+
+    @property
+    def columns(self) -> tuple:
+        return tuple(self._columns)
+
+    def candidate_codes(self, column: pd.Series, pattern: re.Pattern) -> Optional[np.ndarray]:
+        """
+        Возвращает отсортированные коды категорий, которые могут совпасть с паттерном,
+        или None, если индекс неприменим (колонка не проиндексирована, изменилась или у паттерна нет литералов).
+        """
+        entry = self._columns.get(str(column.name))
+        if entry is None or not isinstance(column.dtype, pd.CategoricalDtype):
+            return None
+        categories, postings = entry
+        if column.cat.categories is not categories and not column.cat.categories.equals(categories):
+            return None
+
+        trigrams = set().union(*(_trigrams(literal) for literal in required_literals(pattern)))
+        if not trigrams:
+            return None
+
+        empty = np.array([], dtype=np.int64)
+        codes = sorted((postings.get(trigram, empty) for trigram in trigrams), key=len)
+        return reduce(np.intersect1d, codes)
+
+
+def build_index(store: TransactionStore, columns: tuple = INDEX_COLUMNS) -> TrigramIndex:
+    """
+    Строит триграммный индекс по колонкам хранилища и подключает его к хранилищу.
+    Индексируемые колонки переводятся в category. После store.append индекс сбрасывается.
+    """
+    for column in columns:
+        if column in store.frame.columns and not isinstance(store.frame[column].dtype, pd.CategoricalDtype):
+            store.frame[column] = store.frame[column].astype("category")
+    store.index = TrigramIndex(store.frame, columns)
+    return store.index
@@ -0,0 +1,202 @@
+import json
+import re
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, NamedTuple, Optional
+from urllib.parse import parse_qs, urlparse
+
+from loguru import logger
+
+from src.aggregates import AggregateStore, load_aggregates
+from src.cache import file_signature
+from src.reports import spending_by_categories, spending_by_category
+from src.search_index import build_index
+from src.services import analyze_cashback, search_transactions, search_transactions_by_phone, search_transactions_p2p
+from src.store import TransactionStore
+from src.utils import read_transactions
+from src.views import get_main_page
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+# Как часто проверяется, изменился ли файл выписки, секунды; 0 — не следить за файлом
+WATCH_INTERVAL = 1.0
+DEFAULT_SCOPE = ("Описание", "Категория")
+
+
+class Statement(NamedTuple):
+    """Загруженная выписка: хранилище с поисковым индексом, предагрегаты и время загрузки"""
+
+    store: TransactionStore
+    aggregates: AggregateStore
+    loaded_at: datetime
+
+
+class WarmData:
+    """
+    Выписка, которая читается один раз и остаётся в памяти между запросами.
+    При изменении файла (время изменения или размер) выписка перечитывается и заменяет прежнюю целиком:
+    запросы, начатые до замены, дорабатывают на старых данных. Предагрегаты привязываются к той же подписи файла
+    и дополняются новыми строками, если выписка пополнена в конце или в начале, иначе строятся заново.
+    """
+
+    def __init__(self, filename: str, use_cache: bool = True) -> None:
+        self.filename = filename
+        self.use_cache = use_cache
+        self._signature: Optional[tuple[int, int]] = None
+        self._reload_lock = threading.Lock()
+        self.current = self._load(file_signature(filename))
+
+    def _load(self, signature: Optional[tuple[int, int]]) -> Statement:
+        store = read_transactions(self.filename, self.use_cache)
+        # подпись взята до чтения: предагрегаты сохраняются с подписью той версии файла, что прочитана
+        aggregates = load_aggregates(self.filename, store, signature)
+        build_index(store)
+        self._signature = signature
+        logger.info("Statement loaded: {} ({} rows)", self.filename, len(store))
+        return Statement(store, aggregates, datetime.now())
+
+    def refresh(self) -> bool:
+        """Перечитывает выписку, если файл изменился. Возвращает True, если данные заменены"""
+        with self._reload_lock:
+            # подпись берётся до чтения: изменение во время чтения будет замечено следующей проверкой
+            signature = file_signature(self.filename)
+            if signature == self._signature:
+                return False
+            if signature is None:
+                logger.warning("Statement file is missing, serving previously loaded data: {}", self.filename)
+                self._signature = None
+                return False
+            self.current = self._load(signature)
+            return True
+
+
+def _param(params: dict[str, list[str]], name: str, default: Optional[str] = None) -> str:
+    values = params.get(name)
+    if values:
+        return values[0]
+    if default is None:
+        raise ValueError(f"Missing parameter: {name}")
+    return default
+
+
+def _main_page(statement: Statement, params: dict[str, list[str]]) -> str:
+    date = _param(params, "date", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    return get_main_page(statement.store, date, statement.aggregates)
+
+
+def _search(statement: Statement, params: dict[str, list[str]]) -> str:
+    return search_transactions(statement.store, _param(params, "pattern"), tuple(params.get("scope", DEFAULT_SCOPE)))
+
+
+def _search_p2p(statement: Statement, params: dict[str, list[str]]) -> str:
+    return search_transactions_p2p(statement.store)
+
+
+def _search_phones(statement: Statement, params: dict[str, list[str]]) -> str:
+    return search_transactions_by_phone(statement.store)
+
+
+def _cashback(statement: Statement, params: dict[str, list[str]]) -> str:
+    return analyze_cashback(statement.aggregates, int(_param(params, "year")), int(_param(params, "month")))
+
+
+def _spending(statement: Statement, params: dict[str, list[str]]) -> str:
+    date = _param(params, "date")
+    category = params.get("category")
+    if category:
+        # без декоратора save_report: сервер не пишет файлы отчётов
+        df = spending_by_category.__wrapped__(statement.store, category[0], date)
+    else:
+        df = spending_by_categories(statement.store, date)
+    return json.dumps(df.to_dict("records"), ensure_ascii=False, indent=4)
+
+
+def _health(statement: Statement, params: dict[str, list[str]]) -> str:
+    return json.dumps(
+        {"rows": len(statement.store), "loaded_at": statement.loaded_at.isoformat(timespec="seconds")},
+        ensure_ascii=False,
+    )
+
+
+# Обработчики получают выписку, актуальную на момент запроса, и параметры строки запроса
+ROUTES: dict[str, Callable[[Statement, dict[str, list[str]]], str]] = {
+    "/main-page": _main_page,
+    "/search": _search,
+    "/search/p2p": _search_p2p,
+    "/search/phones": _search_phones,
+    "/cashback": _cashback,
+    "/spending": _spending,
+    "/health": _health,
+}
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """GET-запросы к ROUTES; ответы — JSON, ошибки в параметрах — 400 с описанием в поле error"""
+
+    protocol_version = "HTTP/1.1"
+    server: "TransForgeServer"
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        route = ROUTES.get(url.path)
+        if route is None:
+            self._send(404, json.dumps({"error": f"Unknown path: {url.path}"}))
+            return
+
+        try:
+            body = route(self.server.data.current, parse_qs(url.query))
+        except (ValueError, re.error) as e:
+            self._send(400, json.dumps({"error": str(e)}, ensure_ascii=False))
+            return
+        except Exception as e:
+            logger.exception("Error handling {}: {}", self.path, e)
+            self._send(500, json.dumps({"error": "Internal server error"}))
+            return
+        self._send(200, body)
+
+    def _send(self, status: int, body: str) -> None:
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args: object) -> None:
+        logger.debug("{} - {}", self.address_string(), format % args)
+
+
+class TransForgeServer(ThreadingHTTPServer):
+    """
+    Локальный HTTP-сервис поверх выписки, загруженной в память (WarmData): каждый запрос — отдельный поток,
+    фоновый поток раз в watch_interval секунд перечитывает выписку, если файл изменился.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], data: WarmData, watch_interval: float = WATCH_INTERVAL) -> None:
+        super().__init__(address, RequestHandler)
+        self.data = data
+        self._stop_watching = threading.Event()
+        if watch_interval > 0:
+            threading.Thread(target=self._watch, args=(watch_interval,), name="statement-watcher", daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        if isinstance(host, bytes):
+            host = host.decode("ascii")
+        return f"http://{host}:{port}"
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop_watching.wait(interval):
+            try:
+                self.data.refresh()
+            except Exception as e:
+                # файл мог быть записан не полностью: прежние данные остаются, чтение повторится на следующей проверке
+                logger.error("Error reloading statement {}: {}", self.data.filename, e)
+
+    def server_close(self) -> None:
+        self._stop_watching.set()
+        super().server_close()
@@ -1,58 +1,143 @@
 import json
-import os
-import re
+from typing import Iterable, Literal, overload
 
+import numpy as np
 import pandas as pd
 from loguru import logger
 
-# Конфигурация логгера
-current_dir = os.path.dirname(os.path.abspath(__file__))
-log_dir = os.path.join(current_dir, "..", "logs")
-os.makedirs(log_dir, exist_ok=True)
-log_file = os.path.join(log_dir, "services.log")
-logger.add(sink=log_file, level="DEBUG")
+from src.aggregates import AggregateStore
+from src.metrics import timed
+from src.query import Query
+from src.store import TransactionStore, as_store
 
+P2P_PATTERN = r"[А-Я]{1}[а-я]+\s[А-Я]{1}\."
+PHONE_PATTERN = r"\+7\s\d{3}\s\d{2,3}-\d{2}-\d{2}"
 
-def analyze_cashback(data: list[dict], year: int, month: int) -> str:
-    """Возвращает JSON с суммами по категориям кэшбэка в указанном месяце года"""
-    logger.debug(f"start analyzing cashback data for {year}/{month}. Input data len: {len(data)}")
-    df = pd.DataFrame(data)
-    df["Дата операции"] = pd.to_datetime(df["Дата операции"], format="%d.%m.%Y %H:%M:%S")
-    df_filtered = df[(df["Дата операции"].dt.year == year) & (df["Дата операции"].dt.month == month)]
 
-    result = df_filtered.groupby("Категория")["Бонусы (включая кэшбэк)"].sum().sort_values(ascending=False).to_dict()
-    logger.debug(f"Analyzed cashback len: {len(result)}")
+@overload
+def analyze_cashback(
+    data: list[dict] | TransactionStore | AggregateStore, year: int, month: int, as_json: Literal[True] = ...
+) -> str: ...
+
+
+@overload
+def analyze_cashback(
+    data: list[dict] | TransactionStore | AggregateStore, year: int, month: int, as_json: Literal[False]
+) -> dict: ...
+
+
+@timed()
+def analyze_cashback(
+    data: list[dict] | TransactionStore | AggregateStore, year: int, month: int, as_json: bool = True
+) -> str | dict:
+    """
+    Возвращает JSON (или словарь при as_json=False) с суммами по категориям кэшбэка в указанном месяце года.
+    Для AggregateStore ответ берётся из предагрегатов без обращения к транзакциям.
+    """
+    if isinstance(data, AggregateStore):
+        logger.debug("start analyzing cashback aggregates for {}/{}", year, month)
+        return _format_cashback(data.cashback_by_category(year, month), as_json)
+
+    logger.debug("start analyzing cashback data for {}/{}. Input data len: {}", year, month, len(data))
+    return _format_cashback(_cashback_totals(as_store(data), year, month), as_json)
+
+
+def analyze_cashback_stream(
+    chunks: Iterable[TransactionStore], year: int, month: int, as_json: bool = True
+) -> str | dict:
+    """Анализ кэшбэка по категориям, вычисляемый инкрементально по порциям транзакций (см. iter_transactions)"""
+    logger.debug("start analyzing cashback data stream for {}/{}", year, month)
+    totals = [_cashback_totals(chunk, year, month) for chunk in chunks]
+    totals = [total for total in totals if len(total)]
+    combined = pd.concat(totals).groupby(level=0).sum() if totals else pd.Series(dtype="int64")
+    return _format_cashback(combined, as_json)
+
+
+def _cashback_totals(store: TransactionStore, year: int, month: int) -> pd.Series:
+    """Суммы бонусов по категориям за месяц"""
+    df_filtered = store.month(year, month).frame
+    return df_filtered.groupby("Категория", observed=True)["Бонусы (включая кэшбэк)"].sum()
+
+
+def _format_cashback(totals: pd.Series, as_json: bool) -> str | dict:
+    result: dict = totals.sort_values(ascending=False).to_dict()
+    logger.debug("Analyzed cashback len: {}", len(result))
+    if not as_json:
+        return result
     result_json = json.dumps(result, indent=4, ensure_ascii=False)
     return result_json
 
 
-def search_transactions(data: list[dict], search: str, scope: tuple = ("Описание", "Категория")) -> str:
-    """Возвращает JSON со всеми транзакциями, найденными по паттерну в полях описание или категория"""
-    logger.debug(f"Start searching transactions for with pattern: '{search}'. Input data len: {len(data)}")
-    pattern = re.compile(search)
-    result = []
+def to_json(transactions: list[dict] | TransactionStore) -> str:
+    """Сериализует найденные транзакции в JSON; используется только на границе внешнего API"""
+    if isinstance(transactions, TransactionStore):
+        transactions = transactions.to_records()
+    return json.dumps(transactions, ensure_ascii=False, indent=4)
+
 
-    for transaction in data:
-        for transaction_key in transaction.keys():
-            if transaction_key in scope:
-                value = transaction[transaction_key]
+def find_transactions(data: TransactionStore, search: str, scope: tuple = ("Описание", "Категория")) -> np.ndarray:
+    """Возвращает метки индекса транзакций (в исходном порядке), найденных по паттерну в колонках scope"""
+    return np.sort(Query().matches(search, scope).run(data).frame.index.to_numpy())
 
-                if isinstance(value, (int, bool, float)):
-                    value = str(value)
 
-                if isinstance(value, str) and pattern.search(value):
-                    result.append(transaction)
-                    break
-    logger.debug(f"Search result len: {len(result)}")
-    return json.dumps(result, ensure_ascii=False, indent=4)
+@overload
+def search_transactions(
+    data: list[dict] | TransactionStore, search: str, scope: tuple = ..., as_json: Literal[True] = ...
+) -> str: ...
 
 
-def search_transactions_p2p(data: list[dict]) -> str:
+@overload
+def search_transactions(
+    data: list[dict] | TransactionStore, search: str, scope: tuple = ..., *, as_json: bool
+) -> str | list[dict] | TransactionStore: ...
+
+
+@timed()
+def search_transactions(
+    data: list[dict] | TransactionStore, search: str, scope: tuple = ("Описание", "Категория"), as_json: bool = True
+) -> str | list[dict] | TransactionStore:
+    """
+    Возвращает JSON со всеми транзакциями, найденными по паттерну в полях описание или категория.
+    При as_json=False возвращает результат без сериализации: TransactionStore для хранилища
+    или список исходных словарей для списка — его можно сразу передать в следующий фильтр.
+    """
+    logger.debug("Start searching transactions for with pattern: '{}'. Input data len: {}", search, len(data))
+    result = Query().matches(search, scope).run(data)
+    logger.debug("Search result len: {}", len(result))
+    return to_json(result) if as_json else result
+
+
+@overload
+def search_transactions_p2p(data: list[dict] | TransactionStore, as_json: Literal[True] = ...) -> str: ...
+
+
+@overload
+def search_transactions_p2p(
+    data: list[dict] | TransactionStore, as_json: bool
+) -> str | list[dict] | TransactionStore: ...
+
+
+@timed()
+def search_transactions_p2p(
+    data: list[dict] | TransactionStore, as_json: bool = True
+) -> str | list[dict] | TransactionStore:
     """Возвращает JSON со всеми транзакциями, которые относятся к переводам физ.лицам"""
-    filtered_by_category = search_transactions(data, r"Переводы", scope=("Категория",))
-    return search_transactions(json.loads(filtered_by_category), r"[А-Я]{1}[а-я]+\s[А-Я]{1}\.", scope=("Описание", ""))
+    result = Query().category("Переводы").description_matches(P2P_PATTERN).run(data)
+    return to_json(result) if as_json else result
+
+
+@overload
+def search_transactions_by_phone(data: list[dict] | TransactionStore, as_json: Literal[True] = ...) -> str: ...
+
+
+@overload
+def search_transactions_by_phone(
+    data: list[dict] | TransactionStore, as_json: bool
+) -> str | list[dict] | TransactionStore: ...
 
 
-def search_transactions_by_phone(data: list[dict]) -> str:
+def search_transactions_by_phone(
+    data: list[dict] | TransactionStore, as_json: bool = True
+) -> str | list[dict] | TransactionStore:
     """Возвращает JSON со всеми транзакциями, содержащими в описании мобильные номера"""
-    return search_transactions(data, r"\+7\s\d{3}\s\d{2,3}-\d{2}-\d{2}", scope=("Описание",))
+    return search_transactions(data, PHONE_PATTERN, scope=("Описание",), as_json=as_json)
@@ -0,0 +1,119 @@
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from src.search_index import TrigramIndex
+
+DATE_COLUMN = "Дата операции"
+DATE_FORMAT = "%d.%m.%Y %H:%M:%S"
+CATEGORICAL_COLUMNS = ("Категория", "Номер карты")
+AMOUNT_COLUMNS = ("Сумма операции", "Сумма платежа", "Кэшбэк", "Сумма операции с округлением")
+
+
+def prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Возвращает типизированную копию DataFrame транзакций, не изменяя исходный:
+    даты операций — datetime, категория и номер карты — category, суммы — float.
+    Строки упорядочиваются по дате операции, метки индекса сохраняют исходный порядок.
+    """
+    df = df.copy(deep=False)
+
+    if DATE_COLUMN in df.columns:
+        if not pd.api.types.is_datetime64_any_dtype(df[DATE_COLUMN]):
+            df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN], format=DATE_FORMAT)
+        if not df[DATE_COLUMN].is_monotonic_increasing:
+            df = df.sort_values(DATE_COLUMN, kind="stable")
+
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+
+    for col in AMOUNT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("float64")
+
+    return df
+
+
+class TransactionStore:
+    """
+    Колоночное хранилище транзакций с однократно типизированным DataFrame.
+    Строки отсортированы по дате операции, поэтому выборки по диапазону дат выполняются бинарным поиском.
+    """
+
+    def __init__(self, df: pd.DataFrame, typed: bool = False, index: Optional["TrigramIndex"] = None) -> None:
+        self.frame = df if typed else prepare_frame(df)
+        self.index = index
+        self._dates: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_records(cls, records: list[dict]) -> "TransactionStore":
+        """Создаёт хранилище из списка словарей"""
+        return cls(pd.DataFrame(records))
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def subset(self, df: pd.DataFrame) -> "TransactionStore":
+        """Возвращает хранилище для выборки строк этого хранилища; поисковый индекс переиспользуется"""
+        return TransactionStore(df, typed=True, index=self.index)
+
+    def append(self, data: list[dict] | pd.DataFrame) -> None:
+        """Добавляет новые транзакции. Кэш дат и поисковый индекс сбрасываются, так как данные изменились"""
+        new = pd.DataFrame(data) if isinstance(data, list) else data
+        start = self.frame.index.max() + 1 if len(self.frame) else 0
+        new = new.set_axis(pd.RangeIndex(start, start + len(new)))
+        self.frame = prepare_frame(pd.concat([self.frame, prepare_frame(new)]))
+        self.index = None
+        self._dates = None
+
+    @property
+    def dates(self) -> np.ndarray:
+        """Отсортированный массив дат операций (вычисляется один раз)"""
+        if self._dates is None:
+            self._dates = self.frame[DATE_COLUMN].to_numpy()
+        return self._dates
+
+    def between(self, start: datetime, end: datetime, inclusive: str = "both") -> "TransactionStore":
+        """
+        Возвращает транзакции с датой операции в диапазоне [start, end] за O(log n) без копирования строк.
+        inclusive="left" исключает правую границу: [start, end).
+        """
+        dates = self.dates
+        lo = dates.searchsorted(pd.Timestamp(start).to_datetime64(), side="left")
+        hi = dates.searchsorted(pd.Timestamp(end).to_datetime64(), side="right" if inclusive == "both" else "left")
+        return self.subset(self.frame.iloc[lo:hi])
+
+    def month(self, year: int, month: int) -> "TransactionStore":
+        """Возвращает транзакции за указанный месяц года"""
+        start = datetime(year, month, 1)
+        end = datetime(year + month // 12, month % 12 + 1, 1)
+        return self.between(start, end, inclusive="left")
+
+    def take(self, rows: Union[np.ndarray, pd.Series, pd.Index]) -> "TransactionStore":
+        """Возвращает хранилище с подмножеством строк по булевой маске или меткам индекса (порядок сохраняется)"""
+        if getattr(rows, "dtype", None) == bool:
+            return self.subset(self.frame[rows])
+        positions = np.sort(self.frame.index.get_indexer(rows))
+        return self.subset(self.frame.iloc[positions])
+
+    def to_records(self) -> list[dict]:
+        """Возвращает список словарей в исходном формате и порядке загрузки (даты операций — строки)"""
+        df = self.frame.sort_index()
+        if DATE_COLUMN in df.columns:
+            df = df.assign(**{DATE_COLUMN: df[DATE_COLUMN].dt.strftime(DATE_FORMAT)})
+        return df.to_dict("records")
+
+
+def as_store(data: Union[list[dict], pd.DataFrame, TransactionStore]) -> TransactionStore:
+    """Приводит список словарей или DataFrame к TransactionStore; готовое хранилище возвращает как есть"""
+    if isinstance(data, TransactionStore):
+        return data
+    if isinstance(data, pd.DataFrame):
+        return TransactionStore(data)
+    if isinstance(data, list):
+        return TransactionStore.from_records(data)
+    raise TypeError(f"Unsupported transactions type: {type(data)}")
@@ -1,29 +1,162 @@
+import heapq
 import json
 import os
+from typing import Callable, Iterable, Iterator, Optional
 
+import numpy as np
 import pandas as pd
 from loguru import logger
 
-# Конфигурация логгера
-current_dir = os.path.dirname(os.path.abspath(__file__))
-log_dir = os.path.join(current_dir, "..", "logs")
-os.makedirs(log_dir, exist_ok=True)
-log_file = os.path.join(log_dir, "utils.log")
-logger.add(sink=log_file, level="DEBUG")
+from src.cache import load_cached
+from src.store import AMOUNT_COLUMNS, TransactionStore
 
+# Размер порции строк при потоковом чтении выписок
+CHUNK_SIZE = 50_000
+# Колонки выписки, которые всегда числовые, даже если в порции нет ни одного значения
+NUMERIC_COLUMNS = (*AMOUNT_COLUMNS, "MCC", "Бонусы (включая кэшбэк)", "Округление на инвесткопилку")
 
-def read_excel(filename: str) -> list[dict]:
+
+def read_excel(filename: str, use_cache: bool = False, rebuild_cache: bool = False) -> list[dict]:
     """Функция возвращает список словарей с содержимым Excel файла"""
-    data = pd.read_excel(filename)
+    return read_excel_df(filename, use_cache, rebuild_cache).to_dict("records")
+
+
+def read_excel_df(filename: str, use_cache: bool = False, rebuild_cache: bool = False) -> pd.DataFrame:
+    """
+    Функция возвращает DataFrame с содержимым Excel файла.
+    При use_cache=True книга разбирается один раз и далее читается из колоночного кэша рядом с файлом.
+    """
+    if use_cache:
+        return load_cached(filename, _parse_excel, rebuild=rebuild_cache)
+    return _parse_excel(filename)
+
+
+def read_transactions(filename: str, use_cache: bool = True, rebuild_cache: bool = False) -> TransactionStore:
+    """Функция возвращает TransactionStore с типизированными транзакциями из Excel или CSV файла"""
+    if os.path.splitext(filename)[1].lower() != ".csv":
+        return TransactionStore(read_excel_df(filename, use_cache, rebuild_cache))
+    if use_cache:
+        return TransactionStore(load_cached(filename, _parse_csv, rebuild=rebuild_cache))
+    return TransactionStore(_parse_csv(filename))
+
+
+def _parse_excel(filename: str) -> pd.DataFrame:
+    return fill_missing(pd.read_excel(filename))
 
-    # для числовых колонок — 0, для строковых — ""
+
+def _parse_csv(filename: str) -> pd.DataFrame:
+    return fill_missing(pd.read_csv(filename), NUMERIC_COLUMNS)
+
+
+def fill_missing(data: pd.DataFrame, numeric_columns: tuple = ()) -> pd.DataFrame:
+    """Заполняет пропуски: в числовых колонках и колонках из numeric_columns — 0, в остальных — пустая строка"""
     for col in data.columns:
-        if pd.api.types.is_numeric_dtype(data[col]):
+        if col in numeric_columns:
+            data[col] = pd.to_numeric(data[col].fillna(0))
+        elif pd.api.types.is_numeric_dtype(data[col]):
             data[col] = data[col].fillna(0)
         else:
             data[col] = data[col].fillna("")
 
-    return data.to_dict("records")
+    return data
+
+
+def iter_excel_chunks(filename: str, chunk_size: int = CHUNK_SIZE) -> Iterator[TransactionStore]:
+    """
+    Потоково читает первый лист Excel файла (openpyxl в режиме read-only) и выдаёт порции
+    по chunk_size строк в виде TransactionStore. В памяти одновременно находится только одна порция.
+    """
+    # openpyxl нужен только для потокового чтения: импортируется при первом использовании
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(filename, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name) for name in header]
+
+        batch: list[tuple] = []
+        integer_columns: Optional[list[str]] = None
+        start = 0
+        for row in rows:
+            # полностью пустые строки pandas.read_excel тоже пропускает
+            if all(value is None for value in row):
+                continue
+            batch.append(row)
+            if len(batch) == chunk_size:
+                df, integer_columns = _excel_frame(batch, columns, integer_columns)
+                yield _make_chunk(df, start)
+                start += len(batch)
+                batch = []
+        if batch:
+            df, integer_columns = _excel_frame(batch, columns, integer_columns)
+            yield _make_chunk(df, start)
+    finally:
+        workbook.close()
+
+
+def _integer_columns(df: pd.DataFrame) -> list[str]:
+    """
+    Колонки, которые pandas.read_excel прочитал бы как int: целые числа (openpyxl отдаёт их как int или float)
+    без пропусков и дробных значений
+    """
+    return [
+        col
+        for col in df.columns
+        if pd.api.types.is_integer_dtype(df[col])
+        or (pd.api.types.is_float_dtype(df[col]) and df[col].notna().all() and (df[col] % 1 == 0).all())
+    ]
+
+
+def _excel_frame(
+    batch: list[tuple], columns: list[str], integer_columns: Optional[list[str]]
+) -> tuple[pd.DataFrame, list[str]]:
+    """
+    Порция строк листа и целочисленные колонки. Они определяются один раз, по первой порции
+    (integer_columns=None), и приводятся к int в каждой следующей, чтобы типы порций совпадали;
+    пропуски в них заполняются 0, как в fill_missing.
+    """
+    df = pd.DataFrame.from_records(batch, columns=columns)
+    if integer_columns is None:
+        integer_columns = _integer_columns(df)
+    for col in integer_columns:
+        values = pd.to_numeric(df[col])
+        if (values.dropna() % 1 == 0).all():
+            df[col] = values.fillna(0).astype("int64")
+    return df, integer_columns
+
+
+def iter_csv_chunks(filename: str, chunk_size: int = CHUNK_SIZE, **read_csv_kwargs) -> Iterator[TransactionStore]:
+    """Потоково читает CSV выгрузку порциями по chunk_size строк; параметры разбора передаются в pandas.read_csv"""
+    start = 0
+    with pd.read_csv(filename, chunksize=chunk_size, **read_csv_kwargs) as reader:
+        for df in reader:
+            yield _make_chunk(df, start)
+            start += len(df)
+
+
+def iter_transactions(filename: str, chunk_size: int = CHUNK_SIZE, **read_csv_kwargs) -> Iterator[TransactionStore]:
+    """Потоково читает выписку (.xlsx или .csv) порциями TransactionStore"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in (".xlsx", ".xlsm"):
+        return iter_excel_chunks(filename, chunk_size)
+    if extension == ".csv":
+        return iter_csv_chunks(filename, chunk_size, **read_csv_kwargs)
+    raise ValueError(f"Unsupported statement format: {extension}")
+
+
+def _make_chunk(df: pd.DataFrame, start: int) -> TransactionStore:
+    """Типизирует порцию; метки индекса продолжают нумерацию строк файла"""
+    df = df.set_axis(pd.RangeIndex(start, start + len(df)))
+    # полностью пустая в этой порции колонка не должна стать числовой только из-за NaN
+    for col in df.columns:
+        if col not in NUMERIC_COLUMNS and df[col].isna().all():
+            df[col] = df[col].astype(object)
+    df = fill_missing(df, NUMERIC_COLUMNS)
+    logger.debug("Read chunk: rows {}-{}", start, start + len(df) - 1)
+    return TransactionStore(df)
 
 
 def read_json(filename: str) -> dict | list[dict]:
@@ -33,21 +166,33 @@ def read_json(filename: str) -> dict | list[dict]:
     return data
 
 
-def get_card_statistics(data: list[dict]) -> list:
-    """Вычисляет статистику трат и кэшбэка по картам из списка транзакций."""
+def get_card_statistics(data: list[dict] | TransactionStore) -> list:
+    """Вычисляет статистику трат и кэшбэка по картам из списка транзакций или TransactionStore."""
     if not data:
         return []
 
-    logger.debug(f"Start calculating statistics for operation's amount: {len(data)}")
-    df = pd.DataFrame(data)
+    logger.debug("Start calculating statistics for operation's amount: {}", len(data))
+    df = data.frame if isinstance(data, TransactionStore) else pd.DataFrame(data)
+    return format_card_statistics(card_totals(df))
+
+
+def get_card_statistics_stream(chunks: Iterable[TransactionStore]) -> list:
+    """Вычисляет статистику по картам инкрементально по порциям транзакций (см. iter_transactions)"""
+    totals = [card_totals(chunk.frame) for chunk in chunks if len(chunk)]
+    if not totals:
+        return []
+    return format_card_statistics(pd.concat(totals).groupby(level=0).sum())
+
+
+def card_totals(df: pd.DataFrame) -> pd.DataFrame:
+    """Суммы операций и кэшбэка по списаниям, сгруппированные по номеру карты"""
     df_filtered = df[df["Сумма платежа"] < 0]
+    return df_filtered.groupby("Номер карты", observed=True).agg({"Сумма операции": "sum", "Кэшбэк": "sum"})
 
-    df_grouped = (
-        df_filtered.groupby("Номер карты")
-        .agg({"Сумма операции": "sum", "Кэшбэк": "sum"})
-        .reset_index()
-        .to_dict("records")
-    )
+
+def format_card_statistics(totals: pd.DataFrame) -> list:
+    """Формирует статистику по картам из сумм, сгруппированных по номеру карты (см. card_totals)"""
+    df_grouped = totals.rename_axis("Номер карты").reset_index().to_dict("records")
 
     result = []
     for item in df_grouped:
@@ -59,14 +204,111 @@ def get_card_statistics(data: list[dict]) -> list:
             }
         )
 
-    logger.debug(f"Card statistics result len: {len(result)}\n" f"Result: {result}")
+    logger.opt(lazy=True).debug("Card statistics result len: {}\nResult: {}", lambda: len(result), lambda: result)
     return result
 
 
-def filter_top_transactions(data: list[dict]) -> list:
-    logger.debug(f"Start filtering top transactions for operation's amount: {len(data)}")
-    sorted_data = sorted(data, key=lambda x: abs(x.get("Сумма платежа")), reverse=True)
-    top_transactions = sorted_data[:5]
+def filter_top_transactions(
+    data: list[dict] | TransactionStore, n: int = 5, column: str = "Сумма платежа", absolute: bool = True
+) -> list:
+    """
+    Функция возвращает топ-n транзакций по значению колонки column (по умолчанию — топ-5 по абсолютной сумме платежа).
+    Выбор без полной сортировки: heapq.nlargest для списка, частичное упорядочивание для TransactionStore.
+    При равных значениях транзакции идут в порядке следования.
+    """
+    logger.debug("Start filtering top transactions for operation's amount: {}", len(data))
+    if isinstance(data, TransactionStore):
+        df = data.frame
+        # строки хранилища упорядочены по дате: равные значения упорядочиваются по меткам (порядку загрузки)
+        positions = top_n_positions(_top_values(df, column, absolute), n, df.index.to_numpy())
+        top_transactions = df.iloc[positions].to_dict("records")
+    else:
+        top_transactions = heapq.nlargest(n, data, key=_top_key(column, absolute))
+    result = _format_top_transactions(top_transactions)
+    logger.debug("Top transactions result len: {}\n", len(result))
+    return result
+
+
+def filter_top_transactions_stream(
+    chunks: Iterable[TransactionStore | list[dict]], n: int = 5, column: str = "Сумма платежа", absolute: bool = True
+) -> list:
+    """Топ-n транзакций по порциям (см. iter_transactions); в памяти хранится не больше n строк"""
+    top = TopN(n, column, absolute)
+    for chunk in chunks:
+        top.push(chunk)
+    return _format_top_transactions(top.result())
+
+
+def top_n_positions(values: np.ndarray, n: int, order: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Возвращает позиции n наибольших значений по убыванию за O(len(values) + n log n).
+    При равных значениях раньше идёт строка с меньшим ключом order (например, меткой индекса — номером строки
+    в исходном файле); без order — с меньшей позицией, как при стабильной сортировке.
+    """
+    if n <= 0:
+        return np.array([], dtype=np.intp)
+    if n >= len(values):
+        return np.argsort(-values, kind="stable") if order is None else np.lexsort((order, -values))
+
+    kth = len(values) - n
+    threshold = np.partition(values, kth)[kth]
+    above = np.flatnonzero(values > threshold)
+    equal = np.flatnonzero(values == threshold)
+    if order is None:
+        candidates = np.sort(np.concatenate([above, equal[: n - len(above)]]))
+        return candidates[np.argsort(-values[candidates], kind="stable")]
+
+    equal = equal[np.argsort(order[equal], kind="stable")[: n - len(above)]]
+    candidates = np.concatenate([above, equal])
+    return candidates[np.lexsort((order[candidates], -values[candidates]))]
+
+
+class TopN:
+    """Накопитель n наибольших транзакций по порциям данных: хранит не больше n строк"""
+
+    def __init__(self, n: int = 5, column: str = "Сумма платежа", absolute: bool = True) -> None:
+        self.n = n
+        self.column = column
+        self.absolute = absolute
+        # (значение, порядковый номер строки, строка); номер сохраняет порядок при равных значениях
+        self._items: list[tuple[float, int, dict]] = []
+        self._seen = 0
+
+    def push(self, chunk: TransactionStore | list[dict]) -> None:
+        """Добавляет порцию транзакций"""
+        if isinstance(chunk, TransactionStore):
+            df = chunk.frame
+            values = _top_values(df, self.column, self.absolute)
+            labels = df.index.to_numpy()
+            positions = top_n_positions(values, self.n, labels)
+            # метки порций iter_transactions — номера строк файла, они и задают порядок при равных значениях
+            rows = zip(values[positions].tolist(), labels[positions].tolist(), df.iloc[positions].to_dict("records"))
+        else:
+            key = _top_key(self.column, self.absolute)
+            top = heapq.nlargest(self.n, enumerate(chunk), key=lambda item: key(item[1]))
+            rows = ((key(row), self._seen + position, row) for position, row in top)
+
+        items = self._items + list(rows)
+        self._items = heapq.nlargest(self.n, items, key=lambda item: (item[0], -item[1]))
+        self._seen += len(chunk)
+
+    def result(self) -> list[dict]:
+        """Возвращает накопленные транзакции по убыванию значения"""
+        return [row for _, _, row in self._items]
+
+
+def _top_values(df: pd.DataFrame, column: str, absolute: bool) -> np.ndarray:
+    values = df[column].to_numpy(dtype=float)
+    return np.abs(values) if absolute else values
+
+
+def _top_key(column: str, absolute: bool) -> Callable[[dict], float]:
+    if absolute:
+        return lambda row: abs(row.get(column))
+    return lambda row: row.get(column)
+
+
+def _format_top_transactions(top_transactions: list[dict]) -> list:
     result = []
     for item in top_transactions:
         result.append(
@@ -77,18 +319,17 @@ def filter_top_transactions(data: list[dict]) -> list:
                 "description": item.get("Описание", ""),
             }
         )
-    logger.debug(f"Top transactions result len: {len(result)}\n")
     return result
 
 
 def filter_last_stocks(data: list[dict], stock_names: list) -> list:
     """Функция возвращает список последних цен акций"""
-    logger.debug(f"Start filtering last stocks: input data len={len(data)}, {stock_names=}")
+    logger.debug("Start filtering last stocks: input data len={}, stock_names={}", len(data), stock_names)
     result = []
     found_stocks = []
     for item in data:
         if item["symbol"] in stock_names and item["symbol"] not in found_stocks and item["price_currency"] == "USD":
             result.append({"stock": item["symbol"], "price": item["high"]})
             found_stocks.append(item["symbol"])
-    logger.debug(f"End filtering last stocks: output data len={len(found_stocks)}")
+    logger.debug("End filtering last stocks: output data len={}", len(found_stocks))
     return result
@@ -1,74 +1,259 @@
 import json
 import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime
+from typing import Iterable, Optional
 
 import pandas as pd
 from loguru import logger
 
-from src.external_api import get_currency_rate, get_stock_prices
+from src.aggregates import AggregateStore
+from src.external_api import get_currency_rates, get_stock_prices
+from src.metrics import span, timed
+from src.store import TransactionStore, as_store
 from src.utils import filter_last_stocks, filter_top_transactions, get_card_statistics, read_json
 
-# Конфигурация логгера
 current_dir = os.path.dirname(os.path.abspath(__file__))
-log_dir = os.path.join(current_dir, "..", "logs")
-os.makedirs(log_dir, exist_ok=True)
-log_file = os.path.join(log_dir, "views.log")
-logger.add(sink=log_file, level="DEBUG")
 
+# Общий срок ожидания внешних данных (котировки и курсы) для главной страницы, секунды
+MARKET_DATA_DEADLINE = 8.0
 
-def get_main_page(data: list[dict], datetime_str: str) -> str:
-    """Возвращает json для главной страницы"""
+
+@timed()
+def get_main_page(
+    data: list[dict] | TransactionStore, datetime_str: str, aggregates: Optional[AggregateStore] = None
+) -> str:
+    """
+    Возвращает json для главной страницы.
+    При наличии предагрегатов статистика по картам берётся из них, а не пересчитывается по транзакциям месяца.
+    """
     dt = datetime.strptime(datetime_str, "%Y-%m-%d %H:%M:%S")
     settings = read_json(os.path.join(current_dir, "..", "user_settings.json"))
     user_stocks = settings["user_stocks"]
     user_currencies = settings["user_currencies"]
-    logger.debug(f"Start calculating response for main page with args: {user_stocks=}, {user_currencies=}, {dt=}")
+    logger.debug(
+        "Start calculating response for main page with args: user_stocks={}, user_currencies={}, dt={}",
+        user_stocks,
+        user_currencies,
+        dt,
+    )
+
+    # Внешние запросы выполняются параллельно, пока считается статистика по транзакциям
+    deadline_at = time.monotonic() + MARKET_DATA_DEADLINE
+    stocks_future, rates_future = request_market_data(user_stocks, user_currencies)
+
+    result = _local_page_data(as_store(data), dt, aggregates)
+    with span("views.market_data_wait"):
+        result["stock_prices"], result["currency_rates"] = collect_market_data(
+            stocks_future, rates_future, user_stocks, deadline_at
+        )
+
+    # полный ответ форматируется, только если уровень DEBUG действительно пишется
+    logger.opt(lazy=True).debug("Response for main page calculated: result={}", lambda: result)
+    return _dump_page(result)
+
+
+@timed()
+def get_main_pages(
+    data: list[dict] | TransactionStore,
+    page_requests: Iterable[tuple[dict, str]],
+    aggregates: Optional[AggregateStore] = None,
+    max_workers: Optional[int] = None,
+) -> list[str]:
+    """
+    Возвращает json главной страницы для каждой пары (настройки пользователя, дата "%Y-%m-%d %H:%M:%S").
+    Котировки и курсы загружаются один раз для объединения тикеров и валют всех пользователей,
+    страницы считаются в пуле процессов. Транзакции записываются в один файл, который каждый процесс
+    отображает в память (mmap) один раз при запуске; задачи передают только настройки и рыночные данные.
+    При max_workers=1 (или одном доступном процессоре) расчёт выполняется в текущем процессе.
+    """
+    page_requests = list(page_requests)
+    all_stocks = list(dict.fromkeys(stock for settings, _ in page_requests for stock in settings["user_stocks"]))
+    all_currencies = list(
+        dict.fromkeys(currency for settings, _ in page_requests for currency in settings["user_currencies"])
+    )
+    logger.debug(
+        "Start batch main pages: {} requests, all_stocks={}, all_currencies={}",
+        len(page_requests),
+        all_stocks,
+        all_currencies,
+    )
+
+    deadline_at = time.monotonic() + MARKET_DATA_DEADLINE
+    stocks_future, rates_future = request_market_data(all_stocks, all_currencies)
+    store = as_store(data)
+    stocks_data, currency_rates = collect_market_data(stocks_future, rates_future, all_stocks, deadline_at)
+
+    rates_by_code = {rate["currency_code"]: rate for rate in currency_rates}
+    tasks = [
+        (
+            datetime_str,
+            [stock for stock in stocks_data if stock["stock"] in settings["user_stocks"]],
+            [rates_by_code[code] for code in settings["user_currencies"] if code in rates_by_code],
+        )
+        for settings, datetime_str in page_requests
+    ]
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if max_workers <= 1:
+        return [_render_page(store, aggregates, *task) for task in tasks]
 
-    filtered_data = filter_data_by_month(data, dt)
+    # пул процессов нужен только пакетной генерации: multiprocessing не загружается при импорте модуля
+    import multiprocessing
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+
+    with tempfile.TemporaryDirectory(prefix="main-pages-") as shared_dir:
+        path = _write_shared_frame(store.frame, shared_dir)
+        # spawn: процесс уже многопоточный (запросы рыночных данных), fork в нём небезопасен
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_page_worker,
+            initargs=(path, aggregates),
+        ) as pool:
+            chunksize = max(1, len(tasks) // (max_workers * 4))
+            return list(pool.map(_render_page_task, tasks, chunksize=chunksize))
+
+
+def _local_page_data(store: TransactionStore, dt: datetime, aggregates: Optional[AggregateStore]) -> dict:
+    """Часть главной страницы, которая считается по транзакциям: приветствие, карты и топ операций"""
+    filtered_data = filter_data_by_month(store, dt)
 
     greeting_str = get_greetings(dt)
-    cards_data = get_card_statistics(filtered_data)
-    top_transactions = filter_top_transactions(filtered_data)
+    with span("views.card_statistics", rows_in=len(filtered_data)) as stage:
+        if aggregates is not None:
+            cards_data = aggregates.card_statistics(dt.replace(day=1, hour=0, minute=0, second=0), dt, store)
+        else:
+            cards_data = get_card_statistics(filtered_data)
+        stage.rows_out = len(cards_data)
+    with span("views.top_transactions", rows_in=len(filtered_data)) as stage:
+        top_transactions = filter_top_transactions(filtered_data)
+        stage.rows_out = len(top_transactions)
+
+    return {"greeting": greeting_str, "cards": cards_data, "top_transaction": top_transactions}
+
+
+def _render_page(
+    store: TransactionStore,
+    aggregates: Optional[AggregateStore],
+    datetime_str: str,
+    stocks_data: list,
+    currency_rates: list,
+) -> str:
+    result = _local_page_data(store, datetime.strptime(datetime_str, "%Y-%m-%d %H:%M:%S"), aggregates)
+    result["stock_prices"] = stocks_data
+    result["currency_rates"] = currency_rates
+    return _dump_page(result)
+
+
+def _dump_page(result: dict) -> str:
+    return json.dumps(result, ensure_ascii=False, indent=4, default=json_serializer)
+
+
+# Данные процесса пула get_main_pages: загружаются один раз в инициализаторе
+_worker_store: Optional[TransactionStore] = None
+_worker_aggregates: Optional[AggregateStore] = None
+# Колонка с метками индекса в файле для процессов пула: метки хранят порядок загрузки строк (топ операций по нему
+# разрешает равенство сумм), а Feather сохраняет только колонки
+SHARED_INDEX_COLUMN = "__index__"
+
+
+def _write_shared_frame(frame: pd.DataFrame, directory: str) -> str:
+    """
+    Записывает транзакции для процессов пула: несжатый Arrow IPC (Feather), который читается через mmap,
+    или pickle, если pyarrow не установлен или не смог преобразовать данные. Метки индекса пишутся колонкой.
+    """
+    frame = frame.rename_axis(SHARED_INDEX_COLUMN).reset_index()
+    try:
+        path = os.path.join(directory, "transactions.arrow")
+        frame.to_feather(path, compression="uncompressed")
+        return path
+    except Exception as e:
+        logger.debug("Feather is unavailable for shared transactions, using pickle: {}", e)
+    path = os.path.join(directory, "transactions.pkl")
+    frame.to_pickle(path)
+    return path
+
+
+def _read_shared_frame(path: str) -> pd.DataFrame:
+    if path.endswith(".arrow"):
+        import pyarrow as pa
+
+        # числовые колонки без пропусков остаются в отображённых страницах файла без копирования
+        frame = pa.ipc.open_file(pa.memory_map(path)).read_all().to_pandas(split_blocks=True)
+    else:
+        frame = pd.read_pickle(path)
+    return frame.set_index(SHARED_INDEX_COLUMN).rename_axis(None)
+
+
+def _init_page_worker(path: str, aggregates: Optional[AggregateStore]) -> None:
+    global _worker_store, _worker_aggregates
+    _worker_store = TransactionStore(_read_shared_frame(path), typed=True)
+    _worker_aggregates = aggregates
+
+
+def _render_page_task(task: tuple[str, list, list]) -> str:
+    return _render_page(_worker_store, _worker_aggregates, *task)
+
+
+def request_market_data(user_stocks: list, user_currencies: list) -> tuple[Future, Future]:
+    """
+    Запускает параллельные запросы котировок акций и курсов валют, не дожидаясь ответов.
+    Курсы всех валют пользователя загружаются одним запросом к ЦБ РФ.
+    """
+    pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="market-data")
+    stocks_future = pool.submit(get_stock_prices, user_stocks)
+    rates_future = pool.submit(get_currency_rates, user_currencies)
+    # не блокируемся на завершении потоков: зависшие запросы ограничены таймаутом самого запроса
+    pool.shutdown(wait=False)
+    return stocks_future, rates_future
+
+
+def collect_market_data(
+    stocks_future: Future, rates_future: Future, user_stocks: list, deadline_at: float
+) -> tuple[list, list]:
+    """Дожидается ответов до общего срока deadline_at (time.monotonic); неуспевшие и ошибочные запросы пропускаются"""
+    wait([stocks_future, rates_future], timeout=max(0.0, deadline_at - time.monotonic()))
 
     stocks_data = []
     try:
-        stocks_data = filter_last_stocks(get_stock_prices(user_stocks), user_stocks)
+        stocks_data = filter_last_stocks(_future_result(stocks_future), user_stocks)
     except Exception as e:
-        logger.error(f"Error getting stocks data: {e}")
+        logger.error("Error getting stocks data: {}", e)
 
     currency_rates = []
-    for currency_code in user_currencies:
-        try:
-            currency_rate = get_currency_rate(currency_code)
-            currency_rates.append(currency_rate)
-        except Exception as e:
-            logger.error(f"Error getting currency rate {currency_code}: {e}")
-
-    result = {
-        "greeting": greeting_str,
-        "cards": cards_data,
-        "top_transaction": top_transactions,
-        "stock_prices": stocks_data,
-        "currency_rates": currency_rates,
-    }
-
-    logger.debug(f"Response for main page calculated: {result=}")
-    result_json = json.dumps(result, ensure_ascii=False, indent=4, default=json_serializer)
-    return result_json
-
-
-def filter_data_by_month(data: list[dict], dt: datetime) -> list[dict]:
+    try:
+        currency_rates, missing = _future_result(rates_future)
+        for currency_code in missing:
+            logger.error("Error getting currency rate {}: no data", currency_code)
+    except Exception as e:
+        logger.error("Error getting currency rates: {}", e)
+
+    return stocks_data, currency_rates
+
+
+def _future_result(future: Future):
+    if not future.done():
+        raise TimeoutError("deadline exceeded")
+    return future.result()
+
+
+@timed()
+def filter_data_by_month(data: list[dict] | TransactionStore, dt: datetime) -> list[dict] | TransactionStore:
     """
     Оставляет записи только в диапазоне с начала месяца до указанной даты включительно.
     Предполагается, что в данных есть ключ 'Дата операции' в формате '%d.%m.%Y %H:%M:%S'.
+    Для TransactionStore возвращает TransactionStore, для списка словарей — список словарей.
     """
-    df = pd.DataFrame(data)
-    df["Дата операции"] = pd.to_datetime(df["Дата операции"], format="%d.%m.%Y %H:%M:%S")
-
     start_of_month = dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    mask = (df["Дата операции"] >= start_of_month) & (df["Дата операции"] <= dt)
+    filtered = as_store(data).between(start_of_month, dt)
 
-    return df.loc[mask].to_dict("records")
+    if isinstance(data, TransactionStore):
+        return filtered
+    # хранилище упорядочено по дате: записи возвращаются в исходном порядке
+    return filtered.frame.sort_index().to_dict("records")
 
 
 def json_serializer(obj):
@@ -80,7 +265,7 @@ def json_serializer(obj):
 
 def get_greetings(dt: datetime) -> str:
     """Возвращает приветствие пользователя"""
-    logger.debug(f"Calculating user greeting for hour: {dt.hour}")
+    logger.debug("Calculating user greeting for hour: {}", dt.hour)
     if dt.hour < 12:
         return "Доброе утро"
     elif dt.hour < 18:
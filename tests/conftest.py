@@ -1,7 +1,35 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
 import pandas as pd
 import pytest
 
 
+@pytest.fixture(autouse=True)
+def market_cache(monkeypatch):
+    """Каждый тест получает пустой кэш рыночных данных в памяти, без записи на диск"""
+    import src.market_cache as market_cache_module
+
+    cache = market_cache_module.MarketDataCache(path=None)
+    monkeypatch.setattr(market_cache_module, "_market_cache", cache)
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def http_client(monkeypatch):
+    """Каждый тест получает новый HTTP-клиент: пул соединений и автоматы отключения не переходят между тестами"""
+    import src.http_client as http_client_module
+
+    client = http_client_module.HttpClient()
+    monkeypatch.setattr(http_client_module, "_http_client", client)
+    yield client
+    client.close()
+
+
 @pytest.fixture
 def transactions():
     data = [
@@ -20,3 +48,136 @@ def test_dataframe():
         {"Дата операции": "20.08.2025 15:30:00", "Категория": "Еда", "Сумма платежа": -200},
     ]
     return pd.DataFrame(data)
+
+
+STATEMENT_ROWS = [
+    {
+        "Дата операции": "01.08.2025 10:00:00",
+        "Номер карты": "*1111",
+        "Сумма операции": -100.0,
+        "Сумма платежа": -100.0,
+        "Кэшбэк": None,
+        "Категория": "Еда",
+        "Описание": "Кафе",
+        "Бонусы (включая кэшбэк)": 1,
+    },
+    {
+        "Дата операции": "02.08.2025 11:00:00",
+        "Номер карты": None,
+        "Сумма операции": -50.0,
+        "Сумма платежа": -50.0,
+        "Кэшбэк": 2.0,
+        "Категория": "Транспорт",
+        "Описание": "Такси",
+        "Бонусы (включая кэшбэк)": 2,
+    },
+    {
+        "Дата операции": "15.08.2025 12:00:00",
+        "Номер карты": "*2222",
+        "Сумма операции": 500.0,
+        "Сумма платежа": 500.0,
+        "Кэшбэк": None,
+        "Категория": "Пополнения",
+        "Описание": "Пополнение",
+        "Бонусы (включая кэшбэк)": 0,
+    },
+    {
+        "Дата операции": "03.09.2025 09:00:00",
+        "Номер карты": "*1111",
+        "Сумма операции": -200.0,
+        "Сумма платежа": -200.0,
+        "Кэшбэк": 10.0,
+        "Категория": "Еда",
+        "Описание": "Магазин",
+        "Бонусы (включая кэшбэк)": 4,
+    },
+    {
+        "Дата операции": "20.09.2025 18:00:00",
+        "Номер карты": "*2222",
+        "Сумма операции": -30.0,
+        "Сумма платежа": -30.0,
+        "Кэшбэк": None,
+        "Категория": "Еда",
+        "Описание": "Кофе",
+        "Бонусы (включая кэшбэк)": 0,
+    },
+]
+
+
+@pytest.fixture
+def statement_rows():
+    return [dict(row) for row in STATEMENT_ROWS]
+
+
+@pytest.fixture
+def statement_files(tmp_path):
+    """Небольшая выписка в форматах xlsx и csv: (путь к xlsx, путь к csv)"""
+    df = pd.DataFrame(STATEMENT_ROWS)
+    xlsx_path = str(tmp_path / "operations.xlsx")
+    csv_path = str(tmp_path / "operations.csv")
+    df.to_excel(xlsx_path, index=False)
+    df.to_csv(csv_path, index=False)
+    return xlsx_path, csv_path
+
+
+class StubServer:
+    """Локальный HTTP-сервер (keep-alive) для тестов внешних API: задержки, коды ответов и счётчик запросов по путям"""
+
+    def __init__(self) -> None:
+        self.routes: dict[str, list[tuple[int, object, float]]] = {}
+        self.hits: dict[str, int] = defaultdict(int)
+        # адреса клиентов: по ним видно, переиспользуются ли соединения
+        self.clients: set[tuple[str, int]] = set()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    def add(self, path: str, body: object, status: int = 200, delay: float = 0.0) -> None:
+        """Добавляет ответ для пути; ответы отдаются по очереди, последний повторяется"""
+        self.routes.setdefault(path, []).append((status, body, delay))
+
+    def _handler(self) -> type:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                path = urlparse(self.path).path
+                stub.hits[path] += 1
+                stub.clients.add(self.client_address)
+                responses = stub.routes.get(path, [(404, {}, 0.0)])
+                status, body, delay = responses.pop(0) if len(responses) > 1 else responses[0]
+                time.sleep(delay)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        return Handler
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    """Заглушка ЦБ РФ и Marketstack на localhost; URL внешних API перенаправляются на неё"""
+    import src.external_api as external_api
+
+    with StubServer() as server:
+        monkeypatch.setattr(external_api, "CBR_DAILY_URL", f"{server.url}/daily_json.js")
+        monkeypatch.setattr(external_api, "MARKETSTACK_EOD_URL", f"{server.url}/eod")
+        monkeypatch.setenv("MARKETSTACK_API_KEY", "fake_api_key")
+        yield server
@@ -0,0 +1,250 @@
+import json
+from datetime import datetime
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from src.aggregates import AggregateStore, append_transactions, get_aggregates_path, load_aggregates
+from src.cache import file_signature
+from src.services import analyze_cashback
+from src.store import TransactionStore
+from src.utils import get_card_statistics, read_transactions
+
+# ---------- AggregateStore ----------
+
+
+@pytest.mark.parametrize(
+    "start, end",
+    [
+        (datetime(2025, 8, 1), datetime(2025, 8, 31, 23, 59, 59)),
+        (datetime(2025, 8, 1), datetime(2025, 8, 2, 10, 0)),  # неполный последний день
+        (datetime(2025, 8, 1, 10, 30), datetime(2025, 9, 20, 17, 0)),  # неполные крайние дни
+        (datetime(2025, 9, 3), datetime(2025, 9, 3, 12, 0)),  # период внутри одного дня
+    ],
+)
+def test_card_statistics_matches_full_scan(statement_rows, start, end):
+    store = TransactionStore.from_records(statement_rows)
+    aggregates = AggregateStore.build(store)
+
+    assert aggregates.card_statistics(start, end, store) == get_card_statistics(store.between(start, end))
+
+
+def test_card_statistics_empty_period(statement_rows):
+    store = TransactionStore.from_records(statement_rows)
+    aggregates = AggregateStore.build(store)
+    assert aggregates.card_statistics(datetime(2024, 1, 1), datetime(2024, 1, 31), store) == []
+
+
+def test_update_with_new_rows_only(statement_rows):
+    aggregates = AggregateStore.build(statement_rows[:3])
+    aggregates.update(statement_rows[3:])
+    full = AggregateStore.build(statement_rows)
+
+    assert (aggregates.rows, aggregates.digest) == (5, full.digest)
+    assert aggregates.cards.equals(full.cards)
+    assert aggregates.cashback.equals(full.cashback)
+    assert aggregates.spending.equals(full.spending)
+
+
+def test_cashback_by_category(statement_rows):
+    aggregates = AggregateStore.build(statement_rows)
+
+    assert analyze_cashback(aggregates, 2025, 8, as_json=False) == analyze_cashback(statement_rows, 2025, 8, False)
+    assert json.loads(analyze_cashback(aggregates, 2025, 9)) == {"Еда": 4}
+    assert analyze_cashback(aggregates, 2025, 10, as_json=False) == {}
+
+
+def test_save_and_load(tmp_path, statement_rows):
+    path = str(tmp_path / "aggregates.json")
+    aggregates = AggregateStore.build(statement_rows)
+    aggregates.save(path)
+
+    loaded = AggregateStore.load(path)
+    store = TransactionStore.from_records(statement_rows)
+    assert loaded.rows == 5
+    assert loaded.card_statistics(datetime(2025, 8, 1), datetime(2025, 9, 30), store) == aggregates.card_statistics(
+        datetime(2025, 8, 1), datetime(2025, 9, 30), store
+    )
+    assert loaded.cashback_by_category(2025, 8).to_dict() == aggregates.cashback_by_category(2025, 8).to_dict()
+    pd.testing.assert_frame_equal(loaded.spending, aggregates.spending)
+
+
+def test_load_missing_or_corrupted(tmp_path):
+    assert AggregateStore.load(str(tmp_path / "missing.json")) is None
+    path = tmp_path / "broken.json"
+    path.write_text("{", encoding="utf-8")
+    assert AggregateStore.load(str(path)) is None
+
+
+@pytest.mark.parametrize("key", ["spending", "digest"])
+def test_load_previous_version(tmp_path, statement_rows, key):
+    # файл предыдущей версии без куба трат или хэша строк перестраивается
+    path = tmp_path / "aggregates.json"
+    AggregateStore.build(statement_rows).save(str(path))
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    del payload[key]
+    path.write_text(json.dumps(payload), encoding="utf-8")
+
+    assert AggregateStore.load(str(path)) is None
+
+
+# ---------- куб трат ----------
+
+
+def _direct_spending(store, start, end, by=("Категория",)):
+    frame = store.between(start, end).frame
+    grouped = frame.groupby([frame[key].astype(object).fillna("") for key in by])
+    return grouped["Сумма платежа"].sum().to_dict(), grouped.size().to_dict()
+
+
+@pytest.mark.parametrize(
+    "start, end",
+    [
+        (datetime(2025, 8, 1), datetime(2025, 9, 30, 23, 59, 59)),
+        (datetime(2025, 8, 1, 10, 30), datetime(2025, 9, 20, 17, 0)),  # неполные крайние месяцы
+        (datetime(2025, 7, 1), datetime(2025, 10, 1)),  # полный август и сентябрь из куба
+        (datetime(2025, 9, 2), datetime(2025, 9, 10)),  # период внутри одного месяца
+    ],
+)
+def test_spending_summary_matches_full_scan(statement_rows, start, end):
+    store = TransactionStore.from_records(statement_rows)
+    aggregates = AggregateStore.build(store)
+
+    summary = aggregates.spending_summary(start, end, store)
+
+    totals, counts = _direct_spending(store, start, end)
+    assert summary["Сумма платежа"].to_dict() == totals
+    assert summary["Количество операций"].to_dict() == counts
+
+
+def test_spending_summary_slices(statement_rows):
+    store = TransactionStore.from_records(statement_rows)
+    aggregates = AggregateStore.build(store)
+    period = (datetime(2025, 8, 1), datetime(2025, 9, 30))
+
+    by_card = aggregates.spending_summary(*period, store, categories=["Еда"], by=("Категория", "Номер карты"))
+    assert by_card["Сумма платежа"].to_dict() == {("Еда", "*1111"): -300.0, ("Еда", "*2222"): -30.0}
+    assert by_card["Кэшбэк"].to_dict() == {("Еда", "*1111"): 10.0, ("Еда", "*2222"): 0.0}
+
+    by_month = aggregates.spending_summary(*period, store, cards=["*2222"], by=("Месяц",))
+    assert by_month["Количество операций"].tolist() == [1, 1]
+
+    assert aggregates.spending_summary(datetime(2024, 1, 1), datetime(2024, 3, 1), store).empty
+
+
+def test_rolling_spending(statement_rows):
+    aggregates = AggregateStore.build(statement_rows)
+
+    rolling = aggregates.rolling_spending(months=2)
+
+    assert rolling.index.tolist() == [pd.Timestamp(2025, 8, 1), pd.Timestamp(2025, 9, 1)]
+    assert rolling["Еда"].tolist() == [-100.0, -330.0]
+    assert rolling["Транспорт"].tolist() == [-50.0, -50.0]
+    assert AggregateStore().rolling_spending().empty
+
+
+# ---------- load_aggregates / append_transactions ----------
+
+
+def test_load_aggregates_syncs_new_rows(tmp_path, statement_rows):
+    filename = str(tmp_path / "operations.xlsx")
+    store = TransactionStore.from_records(statement_rows[:3])
+    load_aggregates(filename, store)
+
+    store.append(statement_rows[3:])
+    aggregates = load_aggregates(filename, store)
+
+    assert aggregates.rows == 5
+    assert AggregateStore.load(get_aggregates_path(filename)).rows == 5
+    assert aggregates.cards.equals(AggregateStore.build(statement_rows).cards)
+
+
+def test_load_aggregates_rebuilds_for_replaced_statement(tmp_path, statement_rows):
+    filename = str(tmp_path / "operations.xlsx")
+    load_aggregates(filename, TransactionStore.from_records(statement_rows))
+
+    aggregates = load_aggregates(filename, TransactionStore.from_records(statement_rows[:2]))
+    assert aggregates.rows == 2
+
+
+def _assert_same_aggregates(aggregates, expected):
+    assert (aggregates.rows, aggregates.digest) == (expected.rows, expected.digest)
+    assert aggregates.cards.equals(expected.cards)
+    assert aggregates.cashback.equals(expected.cashback)
+    assert aggregates.spending.equals(expected.spending)
+
+
+def test_load_aggregates_newest_first_export(tmp_path, statement_rows):
+    # выгрузка новыми операциями вперёд: новые строки получают первые метки, старые сдвигаются
+    filename = str(tmp_path / "operations.xlsx")
+    load_aggregates(filename, TransactionStore.from_records(statement_rows[2::-1]))
+
+    with patch.object(AggregateStore, "build", wraps=AggregateStore.build) as build:
+        aggregates = load_aggregates(filename, TransactionStore.from_records(statement_rows[::-1]))
+    build.assert_not_called()
+
+    _assert_same_aggregates(aggregates, AggregateStore.build(statement_rows))
+    _assert_same_aggregates(AggregateStore.load(get_aggregates_path(filename)), aggregates)
+
+
+def test_load_aggregates_newest_first_file_updates_incrementally(tmp_path, statement_rows):
+    # выписка в файле, как data/operations.xlsx: новыми операциями вперёд, при перевыгрузке новые строки сверху
+    filename = str(tmp_path / "operations.xlsx")
+    pd.DataFrame(statement_rows[2::-1]).to_excel(filename, index=False)
+    load_aggregates(filename, read_transactions(filename, use_cache=False))
+
+    pd.DataFrame(statement_rows[::-1]).to_excel(filename, index=False)
+    store = read_transactions(filename, use_cache=False)
+    with patch.object(AggregateStore, "update", wraps=AggregateStore.update, autospec=True) as update:
+        aggregates = load_aggregates(filename, store)
+
+    # агрегируются только две новые строки
+    assert [len(call.args[1]) for call in update.call_args_list] == [2]
+    _assert_same_aggregates(aggregates, AggregateStore.build(store))
+
+
+def test_load_aggregates_rebuilds_for_edited_statement(tmp_path, statement_rows):
+    filename = str(tmp_path / "operations.xlsx")
+    load_aggregates(filename, TransactionStore.from_records(statement_rows[:3]))
+
+    edited = [dict(statement_rows[0], **{"Бонусы (включая кэшбэк)": 100})] + statement_rows[1:]
+    aggregates = load_aggregates(filename, TransactionStore.from_records(edited))
+
+    _assert_same_aggregates(aggregates, AggregateStore.build(edited))
+
+
+def test_load_aggregates_unchanged_file(tmp_path, statement_files):
+    xlsx_path, _ = statement_files
+    store = read_transactions(xlsx_path, use_cache=False)
+    load_aggregates(xlsx_path, store)
+    assert AggregateStore.load(get_aggregates_path(xlsx_path)).source == file_signature(xlsx_path)
+
+    # файл не изменился: строки не проверяются заново
+    with patch.object(AggregateStore, "sync") as sync:
+        aggregates = load_aggregates(xlsx_path, store)
+    sync.assert_not_called()
+    assert aggregates.rows == len(store)
+
+
+def test_aggregates_path_per_statement_file(tmp_path, statement_files, statement_rows):
+    xlsx_path, csv_path = statement_files
+    assert get_aggregates_path(xlsx_path) != get_aggregates_path(csv_path)
+
+    load_aggregates(xlsx_path, read_transactions(xlsx_path, use_cache=False))
+    pd.DataFrame(statement_rows[:2]).to_csv(csv_path, index=False)
+    assert load_aggregates(csv_path, read_transactions(csv_path, use_cache=False)).rows == 2
+    assert AggregateStore.load(get_aggregates_path(xlsx_path)).rows == 5
+
+
+def test_append_transactions(tmp_path, statement_rows):
+    path = str(tmp_path / "aggregates.json")
+    store = TransactionStore.from_records(statement_rows[:3])
+    aggregates = AggregateStore.build(store)
+
+    append_transactions(store, aggregates, statement_rows[3:], path)
+
+    assert len(store) == 5
+    assert AggregateStore.load(path).digest == AggregateStore.build(statement_rows).digest
+    period = (datetime(2025, 9, 1), datetime(2025, 9, 30))
+    assert aggregates.card_statistics(*period, store) == get_card_statistics(store.between(*period))
@@ -0,0 +1,47 @@
+import json
+
+from benchmarks.run import build_cases, compare, run_benchmarks
+from benchmarks.synthetic import generate_operations
+from src.store import TransactionStore
+
+# ---------- benchmarks.synthetic ----------
+
+
+def test_generate_operations_deterministic():
+    first = generate_operations(200, seed=1)
+    assert first.equals(generate_operations(200, seed=1))
+    assert not first.equals(generate_operations(200, seed=2))
+    assert first["Описание"].str.contains(r"\+7\s\d{3}\s\d{2,3}-\d{2}-\d{2}").any()
+
+
+# ---------- benchmarks.run ----------
+
+
+def test_run_benchmarks_json():
+    cases = ["get_main_page", "spending_by_category", "get_card_statistics"]
+    report = run_benchmarks([300], repeat=1, cases=cases)
+
+    assert sorted(item["case"] for item in report["results"]) == sorted(cases)
+    assert all(item["rows"] == 300 and item["seconds"] > 0 and item["peak_mib"] >= 0 for item in report["results"])
+    assert json.loads(json.dumps(report))["meta"]["repeat"] == 1
+
+
+def test_build_cases_without_excel():
+    cases = build_cases(TransactionStore(generate_operations(100)), excel_path=None)
+    assert "read_excel" not in cases
+    assert {"get_main_page", "search_transactions", "analyze_cashback"} <= set(cases)
+
+
+def test_compare_regressions():
+    baseline = {"results": [{"case": "a", "rows": 10, "seconds": 1.0}, {"case": "b", "rows": 10, "seconds": 1.0}]}
+    current = {
+        "results": [
+            {"case": "a", "rows": 10, "seconds": 1.1},
+            {"case": "b", "rows": 10, "seconds": 2.0},
+            {"case": "c", "rows": 10, "seconds": 5.0},
+        ]
+    }
+
+    regressions = compare(current, baseline, threshold=1.25)
+
+    assert [(item["case"], item["ratio"]) for item in regressions] == [("b", 2.0)]
@@ -0,0 +1,112 @@
+import os
+from unittest.mock import MagicMock
+
+import pandas as pd
+import pytest
+
+from src import cache
+from src.utils import read_excel, read_excel_df
+
+
+@pytest.fixture
+def excel_file(tmp_path):
+    filename = tmp_path / "operations.xlsx"
+    pd.DataFrame({"Категория": ["Еда", None], "Сумма платежа": [-100.0, 50.0]}).to_excel(filename, index=False)
+    return str(filename)
+
+
+# ---------- load_cached ----------
+
+
+def test_load_cached_builds_cache_once(excel_file):
+    loader = MagicMock(return_value=pd.DataFrame({"a": [1, 2]}))
+
+    first = cache.load_cached(excel_file, loader)
+    second = cache.load_cached(excel_file, loader)
+
+    assert loader.call_count == 1
+    assert os.path.exists(cache.get_cache_path(excel_file))
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_load_cached_rebuild(excel_file):
+    loader = MagicMock(return_value=pd.DataFrame({"a": [1, 2]}))
+
+    cache.load_cached(excel_file, loader)
+    cache.load_cached(excel_file, loader, rebuild=True)
+
+    assert loader.call_count == 2
+
+
+def test_load_cached_invalidated_on_change(excel_file):
+    loader = MagicMock(return_value=pd.DataFrame({"a": [1, 2]}))
+    cache.load_cached(excel_file, loader)
+    old_path = cache.get_cache_path(excel_file)
+
+    stat = os.stat(excel_file)
+    os.utime(excel_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    cache.load_cached(excel_file, loader)
+
+    assert loader.call_count == 2
+    assert not os.path.exists(old_path)  # устаревший кэш удалён
+
+
+def test_load_cached_mixed_types_fall_back_to_pickle(excel_file):
+    # число среди строк описания не записывается в Parquet
+    mixed = pd.DataFrame({"Описание": ["Кафе", 5411, "Такси"], "Сумма платежа": [-100.0, -50.0, -30.0]})
+    loader = MagicMock(return_value=mixed)
+
+    first = cache.load_cached(excel_file, loader)
+    second = cache.load_cached(excel_file, loader)
+
+    assert loader.call_count == 1
+    pd.testing.assert_frame_equal(first, mixed)
+    pd.testing.assert_frame_equal(second, mixed)
+    # в папке кэша только pickle, без недописанных .tmp и Parquet
+    names = os.listdir(cache.get_cache_dir(excel_file))
+    assert len(names) == 1 and names[0].endswith(cache.PICKLE_SUFFIX)
+
+
+def test_read_transactions_mixed_description(tmp_path):
+    from src.utils import read_transactions
+
+    filename = tmp_path / "operations.xlsx"
+    pd.DataFrame(
+        {
+            "Дата операции": ["01.08.2025 10:00:00", "02.08.2025 10:00:00"],
+            "Описание": ["Кафе", 5411],
+            "Сумма платежа": [-100.0, -50.0],
+        }
+    ).to_excel(filename, index=False)
+
+    built = read_transactions(str(filename))
+    cached = read_transactions(str(filename))
+    assert len(built) == 2
+    assert cached.to_records() == built.to_records()
+
+
+# ---------- evict_stale / clear_cache ----------
+
+
+def test_evict_stale_source_removed(excel_file):
+    cache.load_cached(excel_file, lambda _: pd.DataFrame({"a": [1]}))
+    os.remove(excel_file)
+
+    removed = cache.evict_stale(excel_file)
+    assert len(removed) == 1
+
+
+def test_clear_cache(excel_file):
+    cache.load_cached(excel_file, lambda _: pd.DataFrame({"a": [1]}))
+    assert cache.clear_cache(cache.get_cache_dir(excel_file)) == 1
+    assert cache.clear_cache("not_exists_dir") == 0
+
+
+# ---------- read_excel с кэшем ----------
+
+
+def test_read_excel_use_cache(excel_file):
+    expected = read_excel(excel_file)
+    assert read_excel(excel_file, use_cache=True) == expected
+    assert read_excel(excel_file, use_cache=True) == expected
+    assert read_excel_df(excel_file, use_cache=True, rebuild_cache=True)["Категория"].tolist() == ["Еда", ""]
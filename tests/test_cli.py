@@ -0,0 +1,209 @@
+import json
+import sys
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+from loguru import logger
+
+from src import cli, logging_config, metrics
+
+
+@pytest.fixture(autouse=True)
+def isolated_run(tmp_path, monkeypatch):
+    """Лог команды пишется во временную папку; после теста восстанавливаются логгер и выключенные метрики"""
+    monkeypatch.setattr(logging_config, "LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.setattr(logging_config, "LOG_FILE", str(tmp_path / "logs" / "app.log"))
+    yield
+    metrics.disable_metrics()
+    metrics.reset_metrics()
+    logger.remove()
+    logger.add(sys.stderr)
+
+
+@pytest.fixture
+def statement(tmp_path, statement_rows):
+    """Выписка .xlsx с переводом физическому лицу и телефоном в описании"""
+    rows = statement_rows + [
+        {
+            "Дата операции": "25.09.2025 20:00:00",
+            "Номер карты": "*1111",
+            "Сумма операции": -700.0,
+            "Сумма платежа": -700.0,
+            "Кэшбэк": None,
+            "Категория": "Переводы",
+            "Описание": "Иван П.",
+            "Бонусы (включая кэшбэк)": 0,
+        },
+        {
+            "Дата операции": "26.09.2025 08:00:00",
+            "Номер карты": "*2222",
+            "Сумма операции": -300.0,
+            "Сумма платежа": -300.0,
+            "Кэшбэк": None,
+            "Категория": "Мобильная связь",
+            "Описание": "МТС +7 921 111-22-33",
+            "Бонусы (включая кэшбэк)": 0,
+        },
+    ]
+    path = tmp_path / "operations.xlsx"
+    pd.DataFrame(rows).to_excel(path, index=False)
+    return str(path)
+
+
+def run_cli(capsys, *argv: str) -> tuple[int, str, str]:
+    code = cli.main(list(argv))
+    captured = capsys.readouterr()
+    return code, captured.out, captured.err
+
+
+# ---------- search, p2p, phones ----------
+
+
+def test_search_stdout(capsys, statement):
+    code, out, _ = run_cli(capsys, "search", "Каф|Коф", "-i", statement)
+    assert code == 0
+    assert [row["Описание"] for row in json.loads(out)] == ["Кафе", "Кофе"]
+
+
+def test_search_scope(capsys, statement):
+    _, out, _ = run_cli(capsys, "search", "Еда", "--scope", "Описание", "-i", statement)
+    assert json.loads(out) == []
+
+
+def test_p2p_and_phones(capsys, statement):
+    _, out, _ = run_cli(capsys, "p2p", "-i", statement)
+    assert [row["Описание"] for row in json.loads(out)] == ["Иван П."]
+
+    _, out, _ = run_cli(capsys, "phones", "-i", statement)
+    assert [row["Описание"] for row in json.loads(out)] == ["МТС +7 921 111-22-33"]
+
+
+def test_output_file(capsys, tmp_path, statement):
+    output = tmp_path / "found.json"
+    code, out, _ = run_cli(capsys, "p2p", "-i", statement, "-o", str(output))
+    assert code == 0 and out == ""
+    assert len(json.loads(output.read_text(encoding="utf-8"))) == 1
+
+
+def test_csv_input_without_cache(capsys, statement_files):
+    xlsx_path, csv_path = statement_files
+    _, from_xlsx, _ = run_cli(capsys, "search", "Еда", "-i", xlsx_path)
+    _, from_csv, _ = run_cli(capsys, "search", "Еда", "-i", csv_path, "--no-cache")
+    assert json.loads(from_csv) == json.loads(from_xlsx)
+
+
+# ---------- cashback ----------
+
+
+def test_cashback_aggregates_match_transactions(capsys, statement):
+    _, with_aggregates, _ = run_cli(capsys, "cashback", "2025", "8", "-i", statement)
+    _, without, _ = run_cli(capsys, "cashback", "2025", "8", "-i", statement, "--no-aggregates")
+    assert json.loads(with_aggregates) == json.loads(without) == {"Транспорт": 2, "Еда": 1, "Пополнения": 0}
+
+
+# ---------- report ----------
+
+
+def test_report_category_to_file(capsys, tmp_path, statement):
+    output = tmp_path / "report.csv"
+    code, out, _ = run_cli(
+        capsys, "report", "--date", "2025-09-30", "--category", "Еда", "-i", statement, "-o", str(output)
+    )
+    assert code == 0 and out == ""
+    assert pd.read_csv(output)["Описание"].tolist() == ["Кафе", "Магазин", "Кофе"]
+    # файл отчёта пишется только по --output, декоратор save_report не срабатывает
+    assert list(tmp_path.glob("spending_by_category_*")) == []
+
+
+def test_report_all_categories_stdout(capsys, statement):
+    _, out, _ = run_cli(capsys, "report", "--date", "2025-09-30", "-i", statement)
+    lines = out.splitlines()
+    assert lines[0] == "Категория,Сумма платежа,Количество операций"
+    assert "Еда,-330.0,3" in lines
+
+
+# ---------- main-page ----------
+
+
+@patch("src.views.read_json", return_value={"user_stocks": ["AAPL"], "user_currencies": ["USD"]})
+@patch("src.views.get_currency_rates", return_value=([{"currency_code": "USD", "rate": 90.0}], []))
+@patch("src.views.get_stock_prices", return_value=[])
+def test_main_page(mock_stocks, mock_rates, mock_settings, capsys, statement):
+    code, out, _ = run_cli(capsys, "main-page", "--date", "2025-09-20 19:00:00", "-i", statement)
+    page = json.loads(out)
+
+    assert code == 0
+    assert page["greeting"] == "Добрый вечер"
+    assert {card["last_digits"] for card in page["cards"]} == {"1111", "2222"}
+    assert page["currency_rates"] == [{"currency_code": "USD", "rate": 90.0}]
+
+
+# ---------- --profile, --metrics, ошибки ----------
+
+
+def test_profile_to_stderr(capsys, statement):
+    code, out, err = run_cli(capsys, "search", "Еда", "-i", statement, "--profile")
+    assert code == 0 and json.loads(out)
+    assert "cumulative" in err
+    assert "services.search_transactions" in err
+
+
+def test_profile_to_file(capsys, tmp_path, statement):
+    import pstats
+
+    stats_path = tmp_path / "search.prof"
+    run_cli(capsys, "p2p", "-i", statement, "--profile", str(stats_path))
+    assert pstats.Stats(str(stats_path)).total_calls > 0
+
+
+def test_metrics_file(capsys, tmp_path, statement):
+    metrics_path = tmp_path / "metrics.prom"
+    run_cli(capsys, "cashback", "2025", "9", "-i", statement, "--metrics", str(metrics_path))
+    assert 'transforge_stage_calls_total{stage="services.analyze_cashback"} 1' in metrics_path.read_text()
+
+
+def test_metrics_enabled_after_import(capsys, tmp_path, monkeypatch, statement):
+    # переменная из .env появляется в окружении уже после импорта src.metrics
+    metrics_path = tmp_path / "metrics.prom"
+    monkeypatch.setattr(metrics, "METRICS_PATH", str(metrics_path))
+    monkeypatch.setenv("METRICS_ENABLED", "1")
+    run_cli(capsys, "p2p", "-i", statement)
+    assert 'transforge_stage_calls_total{stage="services.search_transactions_p2p"} 1' in metrics_path.read_text()
+
+
+def test_missing_input(capsys, tmp_path):
+    code, out, err = run_cli(capsys, "p2p", "-i", str(tmp_path / "missing.xlsx"))
+    assert code == 1 and out == ""
+    assert err.startswith("transforge: error:")
+
+
+def test_invalid_pattern(capsys, statement):
+    code, out, err = run_cli(capsys, "search", "(", "-i", statement)
+    assert code == 1 and out == ""
+    assert err.startswith("transforge: error: missing ), unterminated subpattern")
+
+
+def test_report_requires_date(capsys):
+    with pytest.raises(SystemExit) as exc_info:
+        cli.main(["report", "--category", "Еда"])
+    assert exc_info.value.code == 2
+
+
+# ---------- serve ----------
+
+
+def test_serve_until_interrupted(capsys, statement):
+    with patch("src.server.TransForgeServer.serve_forever", side_effect=KeyboardInterrupt):
+        code, _, err = run_cli(capsys, "serve", "-i", statement, "--port", "0", "--watch-interval", "0")
+    assert code == 0
+    assert err.startswith(f"Serving {statement} on http://127.0.0.1:")
+
+
+# ---------- bench ----------
+
+
+def test_bench_forwards_arguments(capsys):
+    with patch("benchmarks.run.main") as bench_main:
+        assert cli.main(["bench", "--rows", "1000", "--case", "get_main_page"]) == 0
+    bench_main.assert_called_once_with(["--rows", "1000", "--case", "get_main_page"])
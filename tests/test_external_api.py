@@ -1,6 +1,7 @@
 from unittest.mock import MagicMock, patch
 
 import pytest
+import requests
 
 import src.external_api as external_api
 
@@ -13,7 +14,7 @@ def test_get_currency_rate_success():
     mock_response.status_code = 200
     mock_response.json.return_value = mock_json
 
-    with patch("requests.get", return_value=mock_response):
+    with patch("requests.Session.get", return_value=mock_response):
         result = external_api.get_currency_rate("USD")
         assert result == {"currency_code": "USD", "rate": 92.5}
 
@@ -24,7 +25,7 @@ def test_get_currency_rate_invalid_code():
     mock_response.status_code = 200
     mock_response.json.return_value = mock_json
 
-    with patch("requests.get", return_value=mock_response):
+    with patch("requests.Session.get", return_value=mock_response):
         with pytest.raises(ValueError, match="No data for currency"):
             external_api.get_currency_rate("USD")
 
@@ -35,11 +36,36 @@ def test_get_currency_rate_http_error():
     mock_response.reason = "Server Error"
     mock_response.json.return_value = {}
 
-    with patch("requests.get", return_value=mock_response):
+    with patch("requests.Session.get", return_value=mock_response):
         with pytest.raises(ValueError, match="Failed to get currency rate"):
             external_api.get_currency_rate("USD")
 
 
+# ---------- get_currency_rates ----------
+
+
+def test_get_currency_rates_reports_missing():
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"Valute": {"USD": {"Value": 92.5}, "EUR": {"Value": 100.0}}}
+
+    with patch("requests.Session.get", return_value=mock_response) as mock_get:
+        rates, missing = external_api.get_currency_rates(["USD", "XXX", "EUR", "YYY"])
+
+    mock_get.assert_called_once()
+    assert rates == [{"currency_code": "USD", "rate": 92.5}, {"currency_code": "EUR", "rate": 100.0}]
+    assert missing == ["XXX", "YYY"]
+
+
+def test_get_currency_rates_http_error():
+    mock_response = MagicMock()
+    mock_response.status_code = 500
+
+    with patch("requests.Session.get", return_value=mock_response):
+        with pytest.raises(ValueError, match="Failed to get currency rate"):
+            external_api.get_currency_rates(["USD"])
+
+
 # ---------- get_stock_prices ----------
 
 
@@ -56,7 +82,7 @@ def test_get_stock_prices_success(monkeypatch):
     mock_response.status_code = 200
     mock_response.json.return_value = mock_json
 
-    with patch("requests.get", return_value=mock_response):
+    with patch("requests.Session.get", return_value=mock_response):
         result = external_api.get_stock_prices(["AAPL", "MSFT"])
         assert len(result) == 2
         assert result[0]["symbol"] == "AAPL"
@@ -71,6 +97,25 @@ def test_get_stock_prices_http_error(monkeypatch):
     mock_response.reason = "Forbidden"
     mock_response.json.return_value = {}
 
-    with patch("requests.get", return_value=mock_response):
+    with patch("requests.Session.get", return_value=mock_response):
         result = external_api.get_stock_prices(["AAPL"])
         assert result == []
+
+
+# ---------- таймауты и локальная заглушка ----------
+
+
+def test_get_currency_rate_stub_server(stub_server):
+    stub_server.add("/daily_json.js", {"Valute": {"USD": {"Value": 92.5}}})
+    assert external_api.get_currency_rate("USD") == {"currency_code": "USD", "rate": 92.5}
+
+
+def test_get_currency_rate_timeout(stub_server):
+    stub_server.add("/daily_json.js", {"Valute": {"USD": {"Value": 92.5}}}, delay=0.5)
+    with pytest.raises(requests.Timeout):
+        external_api.get_currency_rate("USD", timeout=0.1)
+
+
+def test_get_stock_prices_stub_server(stub_server):
+    stub_server.add("/eod", {"data": [{"symbol": "AAPL", "close": 150.0}]})
+    assert external_api.get_stock_prices(["AAPL"]) == [{"symbol": "AAPL", "close": 150.0}]
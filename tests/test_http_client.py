@@ -0,0 +1,189 @@
+import json
+import threading
+import time
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+import requests
+
+import src.http_client as http_client_module
+import src.views as views
+from src.http_client import CircuitBreaker, CircuitOpenError, HttpClient
+
+# ---------- CircuitBreaker ----------
+
+
+def test_circuit_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow()
+
+
+def test_circuit_breaker_half_open_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    # пропускается только один пробный запрос
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow()
+
+
+def test_circuit_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert not breaker.allow()
+
+
+def test_client_probe_interrupted(monkeypatch):
+    client = HttpClient(retries=0, failure_threshold=1, reset_timeout=0)
+    breaker = client.breaker("http://example.test/ping")
+    breaker.record_failure()
+
+    def interrupted(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    # пробный запрос прерван не сетевой ошибкой: автомат не остаётся в пробе навсегда
+    monkeypatch.setattr(client.session, "get", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        client.get("http://example.test/ping")
+    assert breaker.allow()
+
+
+# ---------- HttpClient ----------
+
+
+def test_client_reuses_connections(stub_server):
+    stub_server.add("/ping", {"ok": True})
+    client = HttpClient()
+
+    for _ in range(3):
+        assert client.get(f"{stub_server.url}/ping").json() == {"ok": True}
+
+    assert stub_server.hits["/ping"] == 3
+    assert len(stub_server.clients) == 1
+
+
+def test_client_retries_server_errors(stub_server):
+    stub_server.add("/ping", {}, status=503)
+    stub_server.add("/ping", {}, status=502)
+    stub_server.add("/ping", {"ok": True})
+    client = HttpClient(backoff_factor=0.01)
+
+    response = client.get(f"{stub_server.url}/ping")
+
+    assert response.status_code == 200
+    assert stub_server.hits["/ping"] == 3
+
+
+def test_client_returns_last_server_error(stub_server):
+    stub_server.add("/ping", {}, status=500)
+    client = HttpClient(retries=1, backoff_factor=0.01)
+
+    assert client.get(f"{stub_server.url}/ping").status_code == 500
+    assert stub_server.hits["/ping"] == 2
+
+
+def test_client_retries_read_timeout(stub_server):
+    stub_server.add("/ping", {}, delay=0.3)
+    stub_server.add("/ping", {"ok": True})
+    client = HttpClient(backoff_factor=0.01)
+
+    assert client.get(f"{stub_server.url}/ping", timeout=0.1).json() == {"ok": True}
+    time.sleep(0.3)
+
+
+def test_client_read_timeout_after_retries(stub_server):
+    stub_server.add("/ping", {}, delay=0.3)
+    client = HttpClient(retries=1, backoff_factor=0.01)
+
+    with pytest.raises(requests.Timeout):
+        client.get(f"{stub_server.url}/ping", timeout=0.1)
+    time.sleep(0.3)
+
+
+def test_client_circuit_opens(stub_server):
+    stub_server.add("/ping", {}, status=500)
+    client = HttpClient(retries=0, failure_threshold=2)
+
+    client.get(f"{stub_server.url}/ping")
+    client.get(f"{stub_server.url}/ping")
+    with pytest.raises(CircuitOpenError):
+        client.get(f"{stub_server.url}/ping")
+
+    # разомкнутый автомат не обращается к хосту
+    assert stub_server.hits["/ping"] == 2
+
+
+def test_get_http_client_created_once(monkeypatch):
+    created = []
+
+    def slow_client() -> HttpClient:
+        time.sleep(0.05)
+        created.append(HttpClient())
+        return created[-1]
+
+    monkeypatch.setattr(http_client_module, "_http_client", None)
+    monkeypatch.setattr(http_client_module, "HttpClient", slow_client)
+    barrier = threading.Barrier(4)
+    clients = []
+
+    def first_call() -> None:
+        barrier.wait()
+        clients.append(http_client_module.get_http_client())
+
+    threads = [threading.Thread(target=first_call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert all(client is created[0] for client in clients)
+    created[0].close()
+
+
+# ---------- деградация главной страницы ----------
+
+
+@patch("src.views.read_json")
+def test_get_main_page_circuit_open_degrades_instantly(mock_read_json, stub_server, http_client):
+    mock_read_json.return_value = {"user_stocks": ["AAPL"], "user_currencies": ["USD"]}
+    stub_server.add("/daily_json.js", {}, delay=1.0)
+    stub_server.add("/eod", {}, delay=1.0)
+    for url in (f"{stub_server.url}/daily_json.js", f"{stub_server.url}/eod"):
+        breaker = http_client.breaker(url)
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+
+    data = [
+        {
+            "Дата операции": "01.09.2025 10:00:00",
+            "Номер карты": "*1111",
+            "Сумма платежа": -100,
+            "Сумма операции": -100,
+            "Кэшбэк": 1,
+            "Категория": "Еда",
+            "Описание": "Кафе",
+        }
+    ]
+    start = time.monotonic()
+    result = json.loads(views.get_main_page(data, datetime(2025, 9, 1, 12).strftime("%Y-%m-%d %H:%M:%S")))
+
+    assert time.monotonic() - start < 0.5
+    assert result["stock_prices"] == []
+    assert result["currency_rates"] == []
+    assert dict(stub_server.hits) == {}
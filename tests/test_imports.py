@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+# Обязательные зависимости, без которых модули не работают: загружаются до замера
+REQUIRED = "import pandas, numpy, loguru, dateutil.relativedelta"
+# Зависимости, которые нужны только отдельным сценариям и должны загружаться при первом использовании
+LAZY_DEPENDENCIES = ("requests", "urllib3", "dotenv", "openpyxl", "xlsxwriter", "concurrent.futures.process")
+LIBRARY_MODULES = "src.services, src.utils, src.reports, src.views, src.aggregates, src.metrics"
+# Собственное время импорта всех модулей src сверх обязательных зависимостей, секунды
+IMPORT_BUDGET = 0.25
+
+
+def _import_times(code: str) -> list[tuple[int, str, int]]:
+    """Запускает код в новом интерпретаторе с -X importtime: (глубина вложенности, модуль, cumulative мкс)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=PROJECT_DIR, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_time, cumulative, name = line.removeprefix("import time:").split("|")
+        if not self_time.strip().isdigit():
+            continue  # строка заголовка
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((depth, name.strip(), int(cumulative)))
+    return rows
+
+
+# ---------- время импорта ----------
+
+
+def test_optional_dependencies_are_lazy():
+    # зависимость не загружена вместе со всеми модулями, значит не загружается ни одним из них
+    imported = {name for _, name, _ in _import_times(f"import {LIBRARY_MODULES}")}
+    assert not imported & set(LAZY_DEPENDENCIES)
+
+
+def test_cli_parser_is_lean():
+    # разбор аргументов и --help не загружают модули обработки: их импортируют сами команды
+    imported = {name for _, name, _ in _import_times("import src.cli; src.cli.build_parser()")}
+    assert not imported & {"pandas", "numpy", "loguru", "src.services"}
+
+
+def test_import_time_budget():
+    code = f"{REQUIRED}; import {LIBRARY_MODULES}, src.main"
+    # модули src верхнего уровня импортируются после зависимостей, их cumulative — собственная стоимость;
+    # берётся лучший из трёх запусков, чтобы замер не зависел от случайных задержек
+    spent = min(
+        sum(cumulative for depth, name, cumulative in _import_times(code) if depth == 0 and name.startswith("src."))
+        for _ in range(3)
+    )
+    assert spent / 1e6 < IMPORT_BUDGET
@@ -0,0 +1,84 @@
+import io
+import sys
+
+import pytest
+from loguru import logger
+
+from src import logging_config
+from src.logging_config import configure_logging
+
+
+@pytest.fixture(autouse=True)
+def restore_logger():
+    """После теста возвращается стандартный вывод loguru в stderr"""
+    yield
+    logger.remove()
+    logger.add(sys.stderr)
+
+
+# ---------- configure_logging ----------
+
+
+def test_configure_logging_level():
+    sink = io.StringIO()
+    configure_logging("INFO", sink=sink)
+
+    logger.debug("debug message")
+    logger.info("info message: {}", 42)
+
+    output = sink.getvalue()
+    assert "debug message" not in output
+    assert "info message: 42" in output
+    assert "test_logging_config" in output
+
+
+def test_configure_logging_single_sink():
+    first, second = io.StringIO(), io.StringIO()
+    configure_logging("DEBUG", sink=first)
+    configure_logging("DEBUG", sink=second)
+
+    logger.info("message")
+
+    assert first.getvalue() == ""
+    assert second.getvalue().count("message") == 1
+
+
+def test_configure_logging_default_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(logging_config, "LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.setattr(logging_config, "LOG_FILE", str(tmp_path / "logs" / "app.log"))
+    monkeypatch.setenv("LOG_LEVEL", "warning")
+    configure_logging()
+
+    logger.info("skipped")
+    logger.warning("written")
+    logger.remove()
+
+    content = (tmp_path / "logs" / "app.log").read_text(encoding="utf-8")
+    assert "written" in content
+    assert "skipped" not in content
+
+
+def test_configure_logging_enqueue():
+    sink = io.StringIO()
+    configure_logging("INFO", enqueue=True, sink=sink)
+
+    logger.info("queued message")
+    logger.complete()
+
+    assert "queued message" in sink.getvalue()
+
+
+def test_lazy_messages_not_formatted_below_level():
+    configure_logging("INFO", sink=io.StringIO())
+    calls = []
+
+    def expensive():
+        calls.append(1)
+        return "payload"
+
+    logger.opt(lazy=True).debug("Result: {}", expensive)
+    assert calls == []
+
+    configure_logging("DEBUG", sink=io.StringIO())
+    logger.opt(lazy=True).debug("Result: {}", expensive)
+    assert calls == [1]
@@ -0,0 +1,186 @@
+import threading
+import time
+
+import pytest
+import requests
+
+import src.external_api as external_api
+import src.market_cache as market_cache_module
+from src.market_cache import FRESH, MISS, STALE, MarketDataCache
+
+CBR_RESPONSE = {"Valute": {"USD": {"Value": 92.5}}}
+
+# ---------- MarketDataCache ----------
+
+
+def test_get_miss_then_fresh():
+    cache = MarketDataCache(path=None)
+    assert cache.get("cbr:daily") == (MISS, None)
+
+    cache.set("cbr:daily", {"USD": 1})
+    assert cache.get("cbr:daily") == (FRESH, {"USD": 1})
+
+
+def test_get_stale_and_expired(monkeypatch):
+    cache = MarketDataCache(path=None, ttl=10, stale_ttl=20)
+    cache.set("key", "value")
+    now = time.time()
+
+    monkeypatch.setattr(time, "time", lambda: now + 15)
+    assert cache.get("key") == (STALE, "value")
+
+    monkeypatch.setattr(time, "time", lambda: now + 31)
+    assert cache.get("key") == (MISS, None)
+
+
+def test_ttl_from_environment(monkeypatch):
+    # TTL читается при создании кэша: значения из .env, загруженного после импорта модуля, учитываются
+    monkeypatch.setenv("MARKET_CACHE_TTL", "60")
+    monkeypatch.setenv("MARKET_CACHE_STALE_TTL", "120")
+    cache = MarketDataCache(path=None)
+    assert (cache.ttl, cache.stale_ttl) == (60.0, 120.0)
+    assert MarketDataCache(path=None, ttl=1).ttl == 1
+
+
+def test_lru_eviction():
+    cache = MarketDataCache(path=None, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert len(cache) == 2
+    assert cache.get("b") == (MISS, None)
+    assert cache.get("a") == (FRESH, 1)
+
+
+def test_persisted_between_instances(tmp_path):
+    path = str(tmp_path / "market_cache.json")
+    MarketDataCache(path=path).set("eod:AAPL", [{"symbol": "AAPL", "close": 150.0}])
+
+    assert MarketDataCache(path=path).get("eod:AAPL") == (FRESH, [{"symbol": "AAPL", "close": 150.0}])
+
+
+def test_corrupted_file_ignored(tmp_path):
+    path = tmp_path / "market_cache.json"
+    path.write_text("not json", encoding="utf-8")
+
+    assert len(MarketDataCache(path=str(path))) == 0
+
+
+def test_get_or_fetch_revalidates_stale_in_background(monkeypatch):
+    cache = MarketDataCache(path=None, ttl=10, stale_ttl=100)
+    cache.set("key", "old")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 15)
+
+    refreshed = threading.Event()
+
+    def fetch():
+        refreshed.set()
+        return "new"
+
+    # устаревшее значение отдаётся сразу, обновление идёт в фоне
+    assert cache.get_or_fetch("key", fetch) == "old"
+    assert refreshed.wait(1)
+    for _ in range(100):
+        if cache.get("key")[1] == "new":
+            break
+        time.sleep(0.01)
+    assert cache.get("key") == (FRESH, "new")
+
+
+def test_set_many_saves_once(tmp_path, monkeypatch):
+    cache = MarketDataCache(path=str(tmp_path / "market_cache.json"))
+    saves = []
+    save = cache._save
+    monkeypatch.setattr(cache, "_save", lambda: saves.append(save()))
+
+    cache.set_many({"eod:AAPL": [1], "eod:MSFT": [2]})
+
+    assert len(saves) == 1
+    assert MarketDataCache(path=cache.path).get("eod:MSFT") == (FRESH, [2])
+
+
+def test_get_market_cache_created_once(monkeypatch):
+    created = []
+
+    def slow_cache() -> MarketDataCache:
+        time.sleep(0.05)
+        created.append(MarketDataCache(path=None))
+        return created[-1]
+
+    monkeypatch.setattr(market_cache_module, "_market_cache", None)
+    monkeypatch.setattr(market_cache_module, "MarketDataCache", slow_cache)
+    barrier = threading.Barrier(4)
+    caches = []
+
+    def first_call() -> None:
+        barrier.wait()
+        caches.append(market_cache_module.get_market_cache())
+
+    threads = [threading.Thread(target=first_call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert all(cache is created[0] for cache in caches)
+
+
+# ---------- кэширование во внешних API ----------
+
+
+def test_currency_rates_cached(stub_server):
+    stub_server.add("/daily_json.js", CBR_RESPONSE)
+
+    external_api.get_currency_rate("USD")
+    rates, missing = external_api.get_currency_rates(["USD", "EUR"])
+
+    assert stub_server.hits["/daily_json.js"] == 1
+    assert rates == [{"currency_code": "USD", "rate": 92.5}]
+    assert missing == ["EUR"]
+
+
+def test_currency_rate_error_not_cached(stub_server):
+    stub_server.add("/daily_json.js", {}, status=403)
+    stub_server.add("/daily_json.js", CBR_RESPONSE)
+
+    with pytest.raises(ValueError):
+        external_api.get_currency_rate("USD")
+    assert external_api.get_currency_rate("USD") == {"currency_code": "USD", "rate": 92.5}
+    assert stub_server.hits["/daily_json.js"] == 2
+
+
+def test_stock_prices_fetch_only_missing_tickers(stub_server, market_cache):
+    market_cache.set("eod:AAPL", [{"symbol": "AAPL", "close": 150.0}])
+    stub_server.add("/eod", {"data": [{"symbol": "MSFT", "close": 310.0}]})
+
+    result = external_api.get_stock_prices(["AAPL", "MSFT"])
+    assert result == [{"symbol": "AAPL", "close": 150.0}, {"symbol": "MSFT", "close": 310.0}]
+    assert stub_server.hits["/eod"] == 1
+
+    external_api.get_stock_prices(["AAPL", "MSFT"])
+    assert stub_server.hits["/eod"] == 1
+
+
+def test_stock_prices_fetch_error_keeps_cached(stub_server, market_cache):
+    market_cache.set("eod:AAPL", [{"symbol": "AAPL", "close": 150.0}])
+    stub_server.add("/eod", {}, delay=0.5)
+
+    # новый тикер не загрузился за таймаут: цены из кэша отдаются без него
+    assert external_api.get_stock_prices(["AAPL", "MSFT"], timeout=0.1) == [{"symbol": "AAPL", "close": 150.0}]
+    assert market_cache.get("eod:MSFT") == (MISS, None)
+
+    with pytest.raises(requests.Timeout):
+        external_api.get_stock_prices(["MSFT"], timeout=0.1)
+
+
+def test_stock_prices_saved_once_per_fetch(stub_server, market_cache, monkeypatch):
+    stub_server.add("/eod", {"data": [{"symbol": "AAPL", "close": 150.0}, {"symbol": "MSFT", "close": 310.0}]})
+    saves = []
+    monkeypatch.setattr(market_cache, "_save", lambda: saves.append(1))
+
+    external_api.get_stock_prices(["AAPL", "MSFT", "GOOG"])
+    assert len(saves) == 1
@@ -0,0 +1,139 @@
+from unittest.mock import patch
+
+import pytest
+
+from src import metrics, reports, services, views
+from src.store import TransactionStore
+
+
+@pytest.fixture
+def enabled_metrics():
+    """Включает сбор метрик на время теста и очищает накопленные значения"""
+    metrics.reset_metrics()
+    metrics.enable_metrics()
+    yield
+    metrics.disable_metrics()
+    metrics.reset_metrics()
+
+
+# ---------- span / timed ----------
+
+
+def test_span_disabled_is_noop():
+    metrics.reset_metrics()
+    with metrics.span("stage", rows_in=10) as stage:
+        stage.rows_out = 5
+    assert metrics.get_metrics() == {}
+
+
+def test_span_records_stage(enabled_metrics):
+    for rows in (10, 20):
+        with metrics.span("stage", rows_in=rows) as stage:
+            stage.rows_out = rows // 2
+
+    stage = metrics.get_metrics()["stage"]
+    assert stage["calls"] == 2
+    assert stage["rows_in_total"] == 30
+    assert stage["rows_out_total"] == 15
+    assert stage["seconds_total"] >= stage["seconds_max"] >= stage["seconds_last"] >= 0
+    assert stage["peak_bytes_max"] == 0
+
+
+def test_timed_counts_rows(enabled_metrics):
+    @metrics.timed()
+    def double(data: list) -> list:
+        """Тестовый этап"""
+        return data * 2
+
+    assert double([1, 2, 3]) == [1, 2, 3, 1, 2, 3]
+    assert double.__doc__ == "Тестовый этап"
+
+    stage = metrics.get_metrics()[f"{__name__}.double"]
+    assert stage["calls"] == 1
+    assert stage["rows_in_total"] == 3
+    assert stage["rows_out_total"] == 6
+
+
+def test_span_memory_peak_includes_nested_stages():
+    metrics.reset_metrics()
+    metrics.enable_metrics(memory=True)
+    try:
+        with metrics.span("outer"):
+            with metrics.span("inner"):
+                data = bytearray(4 * 2**20)
+                del data
+    finally:
+        metrics.disable_metrics()
+
+    result = metrics.get_metrics()
+    metrics.reset_metrics()
+    assert result["inner"]["peak_bytes_max"] >= 4 * 2**20
+    assert result["outer"]["peak_bytes_max"] >= result["inner"]["peak_bytes_max"]
+
+
+def test_span_records_on_exception(enabled_metrics):
+    with pytest.raises(ValueError):
+        with metrics.span("failing"):
+            raise ValueError("error")
+    assert metrics.get_metrics()["failing"]["calls"] == 1
+
+
+# ---------- Prometheus ----------
+
+
+def test_write_metrics_prometheus(tmp_path, enabled_metrics):
+    with metrics.span("views.get_main_page", rows_in=7) as stage:
+        stage.rows_out = 3
+
+    path = metrics.write_metrics(str(tmp_path / "metrics.prom"))
+    text = open(path, encoding="utf-8").read()
+
+    assert "# TYPE transforge_stage_calls_total counter" in text
+    assert 'transforge_stage_calls_total{stage="views.get_main_page"} 1' in text
+    assert 'transforge_stage_rows_in_total{stage="views.get_main_page"} 7' in text
+    assert 'transforge_stage_rows_out_total{stage="views.get_main_page"} 3' in text
+
+
+# ---------- инструментирование ----------
+
+
+def test_get_main_page_stages(enabled_metrics, statement_rows):
+    store = TransactionStore.from_records(statement_rows)
+    settings = {"user_stocks": ["AAPL"], "user_currencies": ["USD"]}
+    with (
+        patch("src.views.read_json", return_value=settings),
+        patch("src.views.get_stock_prices", return_value=[]),
+        patch("src.views.get_currency_rates", return_value=([], [])),
+    ):
+        views.get_main_page(store, "2025-09-20 20:00:00")
+
+    stages = metrics.get_metrics()
+    assert {
+        "views.get_main_page",
+        "views.filter_data_by_month",
+        "views.card_statistics",
+        "views.top_transactions",
+        "views.market_data_wait",
+    } <= set(stages)
+    assert stages["views.filter_data_by_month"]["rows_in_total"] == 5
+    assert stages["views.filter_data_by_month"]["rows_out_total"] == 2
+    assert stages["views.top_transactions"]["rows_out_total"] == 2
+
+
+def test_services_and_reports_stages(enabled_metrics, statement_rows, test_dataframe):
+    store = TransactionStore.from_records(statement_rows)
+    services.search_transactions(store, "Кафе", as_json=False)
+    services.analyze_cashback(store, 2025, 8)
+    reports.spending_by_category.__wrapped__(test_dataframe, "Еда", "2025-08-30")
+
+    stages = metrics.get_metrics()
+    assert stages["services.search_transactions"]["rows_in_total"] == 5
+    assert stages["services.analyze_cashback"]["calls"] == 1
+    assert stages["reports.spending_by_category"]["rows_out_total"] == 2
+
+
+def test_metrics_disabled_by_default_in_code_paths(statement_rows):
+    metrics.reset_metrics()
+    services.search_transactions(TransactionStore.from_records(statement_rows), "Кафе", as_json=False)
+    assert metrics.get_metrics() == {}
+    assert not metrics.metrics_enabled()
@@ -0,0 +1,99 @@
+import re
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from src.query import Query, match_column
+from src.store import TransactionStore
+
+
+@pytest.fixture
+def store():
+    data = [
+        {
+            "Дата операции": "03.08.2025 12:00:00",
+            "Номер карты": "*1111",
+            "Категория": "Переводы",
+            "Описание": "Иван П.",
+            "Сумма платежа": -500,
+        },
+        {
+            "Дата операции": "01.08.2025 12:00:00",
+            "Номер карты": "*2222",
+            "Категория": "Переводы",
+            "Описание": "Перевод между счетами",
+            "Сумма платежа": 300,
+        },
+        {
+            "Дата операции": "15.07.2025 09:00:00",
+            "Номер карты": "*1111",
+            "Категория": "Такси",
+            "Описание": "Яндекс Такси",
+            "Сумма платежа": -200,
+        },
+    ]
+    return TransactionStore.from_records(data)
+
+
+# ---------- match_column ----------
+
+
+def test_match_column_object_and_categorical():
+    values = pd.Series(["кафе", "Такси", None, "кафе"])
+    assert match_column(values, re.compile("кафе")).tolist() == [True, False, False, True]
+    assert match_column(values.astype("category"), re.compile("Такси")).tolist() == [False, True, False, False]
+
+
+def test_match_column_numeric():
+    assert match_column(pd.Series([5411.0, 4121.0]), re.compile("^54")).tolist() == [True, False]
+
+
+@pytest.mark.parametrize("dtype", [object, "string[pyarrow]", "category"])
+def test_match_column_unicode_word_boundaries(dtype):
+    # \b и \w по правилам re (Unicode), а не RE2, даже для строк pyarrow
+    values = pd.Series(["Яндекс Такси", "Яндекс.Еда", "ЯндексGo", "Такси"], dtype=dtype)
+    assert match_column(values, re.compile(r"Яндекс\b")).tolist() == [True, True, False, False]
+    assert match_column(values, re.compile(r"\bТакси")).tolist() == [True, False, False, True]
+    assert match_column(values, re.compile(r"^\w+\s")).tolist() == [True, False, False, False]
+
+
+# ---------- Query ----------
+
+
+def test_query_category(store):
+    assert len(Query().category("Переводы").run(store)) == 2
+    assert len(Query().category("Переводы", "Такси").run(store)) == 3
+    assert len(Query().category("Нет такой").run(store)) == 0
+
+
+def test_query_chain(store):
+    query = Query().category("Переводы").description_matches(r"[А-Я][а-я]+\s[А-Я]\.")
+    result = query.run(store)
+    assert result.frame["Описание"].tolist() == ["Иван П."]
+
+
+def test_query_between_and_card(store):
+    result = Query().between(datetime(2025, 7, 1), datetime(2025, 8, 1, 12)).card("*1111").run(store)
+    assert result.frame["Описание"].tolist() == ["Яндекс Такси"]
+
+
+def test_query_month_and_spending(store):
+    assert Query().month(2025, 8).spending().run(store).frame["Сумма платежа"].tolist() == [-500]
+
+
+def test_query_is_immutable(store):
+    base = Query().category("Переводы")
+    base.spending()
+    assert len(base.run(store)) == 2
+
+
+def test_query_records_return_original_dicts():
+    data = [{"Описание": "Оплата кафе", "Категория": "Еда"}, {"Описание": "Такси", "Категория": "Транспорт"}]
+    result = Query().category("Еда").matches("кафе").run(data)
+    assert result == [data[0]]
+    assert result[0] is data[0]
+
+
+def test_query_missing_column(store):
+    assert len(Query().matches("Иван", scope=("Нет колонки",)).run(store)) == 0
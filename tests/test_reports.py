@@ -1,11 +1,15 @@
-import json
 import os
-from unittest.mock import patch
+import threading
+import time
+from datetime import datetime
 
 import pandas as pd
 import pytest
 
 from src import reports
+from src.aggregates import AggregateStore
+from src.store import TransactionStore
+from src.utils import iter_transactions, read_transactions
 
 # ---------- write_report ----------
 
@@ -16,6 +20,46 @@ def test_write_report_success(tmp_path, test_dataframe):
     assert os.path.exists(filename)
 
 
+@pytest.mark.parametrize(
+    "name, read",
+    [
+        ("report.csv", pd.read_csv),
+        ("report.ndjson", lambda path: pd.read_json(path, lines=True)),
+        ("report.jsonl", lambda path: pd.read_json(path, lines=True)),
+        ("report.parquet", pd.read_parquet),
+        ("report.feather", pd.read_feather),
+    ],
+)
+def test_write_report_formats(tmp_path, test_dataframe, name, read):
+    if name.endswith((".parquet", ".feather")):
+        pytest.importorskip("pyarrow")
+    filename = str(tmp_path / name)
+    reports.write_report(filename, test_dataframe)
+
+    result = read(filename)
+    assert result["Категория"].tolist() == test_dataframe["Категория"].tolist()
+    assert result["Сумма платежа"].tolist() == test_dataframe["Сумма платежа"].tolist()
+
+
+def test_write_report_excel_roundtrip(tmp_path, test_dataframe):
+    filename = str(tmp_path / "report.xlsx")
+    reports.write_report(filename, test_dataframe)
+    assert pd.read_excel(filename, index_col=0).equals(test_dataframe)
+
+
+def test_write_report_explicit_format(tmp_path, test_dataframe):
+    filename = str(tmp_path / "report.txt")
+    reports.write_report(filename, test_dataframe, format="csv")
+    assert pd.read_csv(filename)["Категория"].tolist() == ["Еда", "Транспорт", "Еда"]
+
+
+def test_write_report_unsupported_format(tmp_path, test_dataframe):
+    with pytest.raises(ValueError, match="Unsupported report format"):
+        reports.write_report(str(tmp_path / "report.txt"), test_dataframe)
+    with pytest.raises(ValueError, match="Unsupported report format"):
+        reports.write_report(str(tmp_path / "report.csv"), test_dataframe, format="pdf")
+
+
 # def test_write_report_failure(tmp_path, test_dataframe):
 #     bad_filename = tmp_path / "nonexistent_dir" / "test.xlsx"
 #
@@ -26,41 +70,142 @@ def test_write_report_success(tmp_path, test_dataframe):
 # ---------- spending_by_category ----------
 
 
-@patch("src.reports.search_transactions")
-def test_spending_by_category_success(mock_search, test_dataframe):
-    mock_search.return_value = json.dumps(
-        [
-            {"Дата операции": "2025-06-01 10:00:00", "Категория": "Еда", "Сумма платежа": -100},
-            {"Дата операции": "2025-08-20 15:30:00", "Категория": "Еда", "Сумма платежа": -200},
-        ]
-    )
-
+def test_spending_by_category_success(test_dataframe):
     result = reports.spending_by_category(test_dataframe, category="Еда", date="2025-08-30")
 
     assert isinstance(result, pd.DataFrame)
     assert not result.empty
     assert all(result["Категория"] == "Еда")
     assert len(result) == 2
+    assert result["Дата операции"].tolist() == ["2025-06-01 10:00:00", "2025-08-20 15:30:00"]
+
 
+def test_spending_by_category_window(test_dataframe):
+    # 01.06.2025 не попадает в окно трёх месяцев до 2025-09-15
+    result = reports.spending_by_category(test_dataframe, category="Еда", date="2025-09-15")
+    assert result["Сумма платежа"].tolist() == [-200]
 
-@patch("src.reports.search_transactions")
-def test_spending_by_category_empty(mock_search, test_dataframe):
-    mock_search.return_value = json.dumps([])
+
+def test_spending_by_category_empty(test_dataframe):
     result = reports.spending_by_category(test_dataframe, category="Развлечения", date="2025-08-30")
     assert result.empty
 
 
-@patch("src.reports.search_transactions")
 def test_spending_by_category_invalid_date(test_dataframe):
     with pytest.raises(ValueError):
         reports.spending_by_category(test_dataframe, category="Еда", date="invalid-date")
 
 
-@patch("src.reports.search_transactions")
-def test_spending_by_category_search_raises(mock_search, test_dataframe):
-    mock_search.side_effect = Exception("API error")
-    with pytest.raises(Exception, match="API error"):
-        reports.spending_by_category(test_dataframe, category="Еда", date="2025-08-30")
+def test_spending_by_category_default_date(test_dataframe):
+    # без даты окно заканчивается сегодня
+    today = datetime.now().strftime("%Y-%m-%d")
+    result = reports.spending_by_category.__wrapped__(test_dataframe, category="Еда")
+    expected = reports.spending_by_category.__wrapped__(test_dataframe, category="Еда", date=today)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_spending_by_category_store(test_dataframe):
+    result = reports.spending_by_category(TransactionStore(test_dataframe), category="Транспорт", date="2025-08-30")
+    assert result["Сумма платежа"].tolist() == [-50]
+
+
+def test_spending_by_category_reentrant(test_dataframe):
+    original = test_dataframe.copy()
+
+    first = reports.spending_by_category(test_dataframe, category="Еда", date="2025-08-30")
+    second = reports.spending_by_category(test_dataframe, category="Еда", date="2025-08-30")
+
+    assert first.equals(second)
+    assert test_dataframe.equals(original)
+
+
+def test_spending_by_category_loop_over_categories(test_dataframe):
+    results = {
+        category: reports.spending_by_category(test_dataframe, category=category, date="2025-08-30")
+        for category in ("Еда", "Транспорт", "Еда")
+    }
+    assert results["Еда"]["Сумма платежа"].tolist() == [-100, -200]
+    assert results["Транспорт"]["Сумма платежа"].tolist() == [-50]
+
+
+def test_spending_by_category_exact_match(test_dataframe):
+    # категория сравнивается целиком, а не как подстрока
+    result = reports.spending_by_category(test_dataframe, category="Ед", date="2025-08-30")
+    assert result.empty
+
+
+# ---------- spending_by_categories ----------
+
+
+def test_spending_by_categories(test_dataframe):
+    result = reports.spending_by_categories(test_dataframe, date="2025-08-30")
+
+    assert result.columns.tolist() == ["Категория", "Сумма платежа", "Количество операций"]
+    assert result["Категория"].tolist() == ["Еда", "Транспорт"]
+    assert result["Сумма платежа"].tolist() == [-300, -50]
+    assert result["Количество операций"].tolist() == [2, 1]
+
+
+def test_spending_by_categories_matches_single(test_dataframe):
+    store = TransactionStore(test_dataframe)
+    result = reports.spending_by_categories(store, date="2025-09-15").set_index("Категория")
+
+    for category in result.index:
+        single = reports.spending_by_category(store, category=category, date="2025-09-15")
+        assert result.loc[category, "Сумма платежа"] == single["Сумма платежа"].sum()
+        assert result.loc[category, "Количество операций"] == len(single)
+
+
+@pytest.mark.parametrize("date", ["2025-08-30", "2025-09-15", "2025-10-01"])
+def test_spending_by_categories_from_aggregates(test_dataframe, date):
+    columns = {"Номер карты": "*1111", "Сумма операции": 0.0, "Кэшбэк": 0.0, "Бонусы (включая кэшбэк)": 0}
+    store = TransactionStore(test_dataframe.assign(**columns))
+    aggregates = AggregateStore.build(store)
+
+    result = reports.spending_by_categories(store, date=date, aggregates=aggregates)
+
+    pd.testing.assert_frame_equal(result, reports.spending_by_categories(store, date=date), check_dtype=False)
+
+
+def test_spending_by_categories_filter(test_dataframe):
+    result = reports.spending_by_categories(test_dataframe, date="2025-08-30", categories=["Транспорт", "Развлечения"])
+    assert result["Категория"].tolist() == ["Транспорт"]
+
+
+def test_spending_by_categories_empty(test_dataframe):
+    result = reports.spending_by_categories(test_dataframe, date="2020-01-01")
+    assert result.empty
+    assert result.columns.tolist() == ["Категория", "Сумма платежа", "Количество операций"]
+
+
+def test_spending_by_category_stream(statement_files):
+    xlsx_path, _ = statement_files
+    expected = reports.spending_by_category(pd.read_excel(xlsx_path), category="Еда", date="2025-09-30")
+
+    result = reports.spending_by_category_stream(iter_transactions(xlsx_path, chunk_size=2), "Еда", "2025-09-30")
+
+    assert result["Описание"].tolist() == ["Кафе", "Магазин", "Кофе"]
+    assert result["Дата операции"].tolist() == expected["Дата операции"].tolist()
+    assert result["Сумма платежа"].tolist() == expected["Сумма платежа"].tolist()
+
+
+def test_spending_by_category_stream_matches_store(statement_files):
+    # порции с разными наборами категорий: номер карты и категория остаются category, как в отчёте по хранилищу
+    xlsx_path, _ = statement_files
+    expected = reports.spending_by_category.__wrapped__(read_transactions(xlsx_path), "Еда", "2025-09-30")
+
+    result = reports.spending_by_category_stream.__wrapped__(
+        iter_transactions(xlsx_path, chunk_size=1), "Еда", "2025-09-30"
+    )
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_spending_by_category_stream_empty(statement_files):
+    xlsx_path, _ = statement_files
+    result = reports.spending_by_category_stream(iter_transactions(xlsx_path), "Развлечения", "2025-09-30")
+    assert result.empty
+    assert "Категория" in result.columns
 
 
 # ---------- save_report (декоратор) ----------
@@ -77,3 +222,125 @@ def test_save_report_decorator(tmp_path, test_dataframe):
     # Проверяем, что файл реально создался
     files = list(tmp_path.iterdir())
     assert any(file.suffix == ".xlsx" for file in files)
+
+
+def test_save_report_format(tmp_path, test_dataframe):
+    @reports.save_report(str(tmp_path / "report.out"), format="ndjson")
+    def dummy_func():
+        """Тестовый отчёт"""
+        return test_dataframe
+
+    dummy_func()
+    assert dummy_func.__name__ == "dummy_func"
+    assert dummy_func.__doc__ == "Тестовый отчёт"
+    assert len(pd.read_json(tmp_path / "report.out", lines=True)) == 3
+
+
+def test_save_report_invalid_format():
+    with pytest.raises(ValueError, match="Unsupported report format"):
+        reports.save_report(format="pdf")
+
+
+# ---------- фоновая запись отчётов ----------
+
+
+def test_save_report_background_returns_before_write(tmp_path, test_dataframe, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    written = []
+
+    def slow_write(filename, df, format=None):
+        started.set()
+        release.wait(5)
+        written.append(filename)
+
+    monkeypatch.setattr(reports, "write_report", slow_write)
+
+    @reports.save_report(str(tmp_path / "background.xlsx"), background=True)
+    def dummy_func():
+        return test_dataframe
+
+    assert dummy_func() is test_dataframe
+    assert started.wait(5)
+    assert written == []
+
+    release.set()
+    reports.flush_reports(timeout=5)
+    assert written == [str(tmp_path / "background.xlsx")]
+
+
+def test_save_report_background_writes_file(tmp_path, test_dataframe):
+    @reports.save_report(str(tmp_path / "background.xlsx"), background=True)
+    def dummy_func():
+        return test_dataframe
+
+    dummy_func()
+    reports.flush_reports(timeout=10)
+    assert pd.read_excel(tmp_path / "background.xlsx", index_col=0).equals(test_dataframe)
+
+
+def test_report_writer_bounded_queue(test_dataframe, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(reports, "write_report", lambda filename, df, format=None: release.wait(5))
+    writer = reports.ReportWriter(maxsize=1)
+
+    writer.submit("first.xlsx", test_dataframe)
+    # первый отчёт пишется, второй ждёт в очереди, третий блокирует вызывающего
+    for _ in range(100):
+        if writer._queue.empty():
+            break
+        time.sleep(0.01)
+    writer.submit("second.xlsx", test_dataframe)
+    third = threading.Thread(target=writer.submit, args=("third.xlsx", test_dataframe))
+    third.start()
+    third.join(0.1)
+    assert third.is_alive()
+
+    release.set()
+    third.join(5)
+    writer.flush(timeout=5)
+    assert writer.pending == 0
+
+
+def test_report_writer_keeps_submitted_data(test_dataframe, monkeypatch):
+    release = threading.Event()
+    written = []
+
+    def slow_write(filename, df, format=None):
+        release.wait(5)
+        written.append(df)
+
+    monkeypatch.setattr(reports, "write_report", slow_write)
+    writer = reports.ReportWriter()
+    df = test_dataframe.copy()
+    writer.submit("report.xlsx", df)
+    # вызывающий меняет таблицу на месте, пока отчёт ждёт записи
+    df.iloc[0, 0] = "changed"
+    release.set()
+    writer.flush(timeout=5)
+    assert written[0].equals(test_dataframe)
+
+
+def test_report_writer_flush_raises_write_error(test_dataframe, monkeypatch):
+    def broken_write(filename, df, format=None):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(reports, "write_report", broken_write)
+    writer = reports.ReportWriter()
+    writer.submit("broken.xlsx", test_dataframe)
+
+    with pytest.raises(OSError, match="disk full"):
+        writer.flush(timeout=5)
+    # ошибка сообщается один раз
+    writer.flush(timeout=5)
+
+
+def test_report_writer_flush_timeout(test_dataframe, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(reports, "write_report", lambda filename, df, format=None: release.wait(5))
+    writer = reports.ReportWriter()
+    writer.submit("slow.xlsx", test_dataframe)
+
+    with pytest.raises(TimeoutError):
+        writer.flush(timeout=0.05)
+    release.set()
+    writer.flush(timeout=5)
@@ -0,0 +1,83 @@
+import re
+from unittest.mock import patch
+
+import pytest
+
+from src.search_index import TrigramIndex, build_index, required_literals
+from src.services import find_transactions, search_transactions_by_phone
+from src.store import TransactionStore
+
+
+@pytest.fixture
+def store():
+    data = [
+        {"Дата операции": "01.08.2025 12:00:00", "Категория": "Переводы", "Описание": "Перевод через СБП"},
+        {"Дата операции": "02.08.2025 12:00:00", "Категория": "Связь", "Описание": "Я МТС +7 921 111-22-33"},
+        {"Дата операции": "03.08.2025 12:00:00", "Категория": "Супермаркеты", "Описание": "Магнит"},
+        {"Дата операции": "04.08.2025 12:00:00", "Категория": "Супермаркеты", "Описание": "Колхоз"},
+    ]
+    return TransactionStore.from_records(data)
+
+
+# ---------- required_literals ----------
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        (r"Магнит", ["Магнит"]),
+        (r"\s(через)+\s", ["через"]),
+        (r"Я МТС \+7", ["Я МТС +7"]),
+        (r"ab", []),
+        (r"Магнит|Колхоз", []),
+        (r"(?i)магнит", []),
+        (r"(через)?\sСБП", ["СБП"]),
+        (r"[А-Я][а-я]+\s[А-Я]\.", []),
+    ],
+)
+def test_required_literals(pattern, expected):
+    assert required_literals(re.compile(pattern)) == expected
+
+
+# ---------- TrigramIndex ----------
+
+
+def test_index_candidate_codes(store):
+    index = build_index(store)
+    column = store.frame["Описание"]
+    codes = index.candidate_codes(column, re.compile("Магнит"))
+    assert column.cat.categories[codes].tolist() == ["Магнит"]
+    assert index.candidate_codes(column, re.compile("Маг|Кол")) is None
+    assert index.columns == ("Описание", "Категория")
+
+
+def test_index_not_applicable_to_other_data(store):
+    index = TrigramIndex(store.frame, ("Описание",))
+    other = TransactionStore.from_records([{"Описание": "Магнит"}]).frame["Описание"].astype("category")
+    assert index.candidate_codes(other, re.compile("Магнит")) is None
+
+
+@pytest.mark.parametrize("pattern", [r"Магнит", r"\s(через)+\s", r"СБП", r"нет такого", r"\+7\s\d{3}", r"Супер"])
+def test_index_results_match_full_scan(store, pattern):
+    expected = find_transactions(store, pattern).tolist()
+    indexed = TransactionStore(store.frame.copy())
+    build_index(indexed)
+    assert find_transactions(indexed, pattern).tolist() == expected
+    # индекс переиспользуется выборками из хранилища
+    assert indexed.month(2025, 8).index is indexed.index
+
+
+def test_services_use_index(store):
+    build_index(store)
+    with patch.object(TrigramIndex, "candidate_codes", wraps=store.index.candidate_codes) as mock_candidates:
+        result = search_transactions_by_phone(store, as_json=False)
+    assert mock_candidates.called
+    assert len(result) == 1
+
+
+def test_append_invalidates_index(store):
+    build_index(store)
+    store.append([{"Дата операции": "05.08.2025 12:00:00", "Категория": "Супермаркеты", "Описание": "Магнит у дома"}])
+    assert store.index is None
+    assert len(store) == 5
+    assert find_transactions(store, "Магнит").tolist() == [2, 4]
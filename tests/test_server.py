@@ -0,0 +1,149 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+from urllib.parse import urlencode
+
+import pandas as pd
+import pytest
+
+from src.server import TransForgeServer, WarmData
+from src.services import analyze_cashback
+from src.utils import read_transactions
+
+CBR_RESPONSE = {"Valute": {"USD": {"Value": 92.5}}}
+EOD_RESPONSE = {"data": [{"symbol": "AAPL", "price_currency": "USD", "high": 200.0}]}
+
+
+@pytest.fixture
+def statement(tmp_path, statement_rows):
+    path = tmp_path / "operations.xlsx"
+    pd.DataFrame(statement_rows).to_excel(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def server(statement):
+    """Сервис на свободном порту localhost с частой проверкой изменений выписки"""
+    server = TransForgeServer(("127.0.0.1", 0), WarmData(statement), watch_interval=0.05)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server: TransForgeServer, path: str, **params: object) -> tuple[int, object]:
+    url = f"{server.url}{path}?{urlencode(params, doseq=True)}"
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def wait_for_rows(server: TransForgeServer, rows: int, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        _, health = get(server, "/health")
+        if health["rows"] == rows or time.monotonic() > deadline:
+            return health
+        time.sleep(0.05)
+
+
+# ---------- эндпоинты ----------
+
+
+def test_search(server):
+    status, found = get(server, "/search", pattern="Каф|Коф")
+    assert status == 200
+    assert [row["Описание"] for row in found] == ["Кафе", "Кофе"]
+
+    _, found = get(server, "/search", pattern="Еда", scope="Описание")
+    assert found == []
+
+
+def test_search_p2p_and_phones(server):
+    assert get(server, "/search/p2p") == (200, [])
+    assert get(server, "/search/phones") == (200, [])
+
+
+def test_cashback_matches_transactions(server, statement):
+    status, cashback = get(server, "/cashback", year=2025, month=8)
+    assert status == 200
+    assert cashback == analyze_cashback(read_transactions(statement, use_cache=False), 2025, 8, as_json=False)
+
+
+def test_spending(server, tmp_path):
+    _, found = get(server, "/spending", date="2025-09-30", category="Еда")
+    assert [row["Описание"] for row in found] == ["Кафе", "Магазин", "Кофе"]
+
+    _, summary = get(server, "/spending", date="2025-09-30")
+    assert {"Категория": "Еда", "Сумма платежа": -330.0, "Количество операций": 3} in summary
+    # сервер не пишет файлы отчётов
+    assert list(tmp_path.glob("spending_by_category_*")) == []
+
+
+@patch("src.views.read_json", return_value={"user_stocks": ["AAPL"], "user_currencies": ["USD"]})
+def test_main_page_with_stub_market_data(mock_read_json, server, stub_server):
+    stub_server.add("/daily_json.js", CBR_RESPONSE)
+    stub_server.add("/eod", EOD_RESPONSE)
+
+    status, page = get(server, "/main-page", date="2025-09-20 19:00:00")
+
+    assert status == 200
+    assert page["greeting"] == "Добрый вечер"
+    assert {card["last_digits"] for card in page["cards"]} == {"1111", "2222"}
+    assert page["stock_prices"] == [{"stock": "AAPL", "price": 200.0}]
+    assert page["currency_rates"] == [{"currency_code": "USD", "rate": 92.5}]
+
+
+def test_bad_requests(server):
+    assert get(server, "/search") == (400, {"error": "Missing parameter: pattern"})
+    assert get(server, "/cashback", year="x", month=1)[0] == 400
+    assert get(server, "/search", pattern="(")[0] == 400
+    assert get(server, "/main-page", date="yesterday")[0] == 400
+    assert get(server, "/unknown") == (404, {"error": "Unknown path: /unknown"})
+
+
+# ---------- перезагрузка выписки ----------
+
+
+def test_reload_on_file_change(server, statement, statement_rows):
+    extra = dict(statement_rows[0], **{"Дата операции": "28.09.2025 10:00:00", "Описание": "Кафе у дома"})
+    pd.DataFrame(statement_rows + [extra]).to_excel(statement, index=False)
+
+    assert wait_for_rows(server, len(statement_rows) + 1)["rows"] == len(statement_rows) + 1
+    _, found = get(server, "/search", pattern="Кафе")
+    assert [row["Описание"] for row in found] == ["Кафе", "Кафе у дома"]
+
+
+def test_reload_updates_aggregates_for_newest_first_export(server, statement, statement_rows):
+    # новая выгрузка новыми операциями вперёд: метки уже агрегированных строк указывают на другие операции
+    extra = dict(statement_rows[1], **{"Дата операции": "03.08.2025 09:00:00", "Бонусы (включая кэшбэк)": 7})
+    pd.DataFrame([extra] + statement_rows[::-1]).to_excel(statement, index=False)
+    wait_for_rows(server, len(statement_rows) + 1)
+
+    _, cashback = get(server, "/cashback", year=2025, month=8)
+    assert cashback == analyze_cashback(read_transactions(statement, use_cache=False), 2025, 8, as_json=False)
+    assert cashback["Транспорт"] == 9
+
+
+def test_reload_keeps_data_on_broken_file(server, statement, statement_rows):
+    with open(statement, "wb") as f:
+        f.write(b"not an excel file")
+    time.sleep(0.3)
+    assert get(server, "/health")[1]["rows"] == len(statement_rows)
+
+    # исправленный файл читается при следующей проверке
+    pd.DataFrame(statement_rows[:2]).to_excel(statement, index=False)
+    assert wait_for_rows(server, 2)["rows"] == 2
+
+
+def test_refresh_without_changes(statement):
+    data = WarmData(statement)
+    current = data.current
+    assert not data.refresh()
+    assert data.current is current
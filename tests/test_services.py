@@ -1,9 +1,22 @@
 import json
+import re
+import zipfile
 from unittest.mock import patch
 
+import pandas as pd
 import pytest
 
-from src.services import analyze_cashback, search_transactions, search_transactions_by_phone, search_transactions_p2p
+from src.query import compile_pattern
+from src.services import (
+    analyze_cashback,
+    analyze_cashback_stream,
+    find_transactions,
+    search_transactions,
+    search_transactions_by_phone,
+    search_transactions_p2p,
+)
+from src.store import TransactionStore
+from src.utils import iter_transactions, read_transactions
 
 # ----------------------
 # Тесты analyze_cashback
@@ -28,11 +41,56 @@ def test_analyze_cashback_no_data_for_month():
     assert result == {}
 
 
+def test_analyze_cashback_store():
+    data = [
+        {"Дата операции": "01.08.2025 12:00:00", "Категория": "Еда", "Бонусы (включая кэшбэк)": 50},
+        {"Дата операции": "03.09.2025 14:00:00", "Категория": "Еда", "Бонусы (включая кэшбэк)": 20},
+    ]
+    result = json.loads(analyze_cashback(TransactionStore.from_records(data), 2025, 8))
+    assert result == {"Еда": 50}
+
+
+def test_analyze_cashback_as_dict():
+    data = [{"Дата операции": "01.08.2025 12:00:00", "Категория": "Еда", "Бонусы (включая кэшбэк)": 50}]
+    assert analyze_cashback(data, 2025, 8, as_json=False) == {"Еда": 50}
+
+
 def test_analyze_cashback_invalid_date_format(transactions):
     with pytest.raises(Exception):
         analyze_cashback(transactions, 2025, 8)
 
 
+def test_analyze_cashback_stream(statement_files):
+    xlsx_path, _ = statement_files
+    result = analyze_cashback_stream(iter_transactions(xlsx_path, chunk_size=2), 2025, 8, as_json=False)
+    assert result == {"Транспорт": 2, "Еда": 1, "Пополнения": 0}
+
+    result = json.loads(analyze_cashback_stream(iter_transactions(xlsx_path, chunk_size=2), 2025, 10))
+    assert result == {}
+
+
+def _write_float_cells_xlsx(df: pd.DataFrame, path: str) -> None:
+    """Пишет xlsx, в котором целые числа хранятся как "3.0" — так выгружена data/operations.xlsx"""
+    df.to_excel(path, index=False, engine="openpyxl")
+    with zipfile.ZipFile(path) as source:
+        entries = {name: source.read(name) for name in source.namelist()}
+    sheet = entries["xl/worksheets/sheet1.xml"].decode()
+    entries["xl/worksheets/sheet1.xml"] = re.sub(r't="n"><v>(-?\d+)</v>', r't="n"><v>\1.0</v>', sheet).encode()
+    with zipfile.ZipFile(path, "w") as target:
+        for name, content in entries.items():
+            target.writestr(name, content)
+
+
+def test_analyze_cashback_stream_json_matches_full(tmp_path, statement_rows):
+    # openpyxl отдаёт такие ячейки как float: JSON порций должен совпадать с полным чтением (2, а не 2.0)
+    path = str(tmp_path / "operations.xlsx")
+    _write_float_cells_xlsx(pd.DataFrame(statement_rows), path)
+
+    expected = analyze_cashback(read_transactions(path, use_cache=False), 2025, 8)
+    assert analyze_cashback_stream(iter_transactions(path, chunk_size=2), 2025, 8) == expected
+    assert '"Транспорт": 2,' in expected
+
+
 # ----------------------
 # Тесты search_transactions
 # ----------------------
@@ -57,38 +115,71 @@ def test_search_transactions_invalid_data():
         search_transactions(data, "кафе")
 
 
+def test_search_transactions_numeric_scope():
+    data = [{"Описание": "Такси", "MCC": 4121}, {"Описание": "Кафе", "MCC": 5814.0}]
+    result = json.loads(search_transactions(data, r"^5814", scope=("MCC",)))
+    assert result == [{"Описание": "Кафе", "MCC": 5814.0}]
+
+
+def test_search_transactions_store_keeps_load_order():
+    data = [
+        {"Дата операции": "02.08.2025 12:00:00", "Категория": "Еда", "Описание": "Кафе у дома"},
+        {"Дата операции": "01.08.2025 12:00:00", "Категория": "Транспорт", "Описание": "Такси"},
+        {"Дата операции": "03.08.2025 12:00:00", "Категория": "Еда", "Описание": "Кафе"},
+    ]
+    result = json.loads(search_transactions(TransactionStore.from_records(data), "Кафе"))
+    assert result == [data[0], data[2]]
+
+
+def test_find_transactions_returns_labels(transactions):
+    store = TransactionStore.from_records(transactions)
+    assert find_transactions(store, "Такси|книги").tolist() == [1, 2]
+    assert find_transactions(store, "Еда", scope=("Описание",)).tolist() == []
+
+
+def test_compile_pattern_cached():
+    assert compile_pattern(r"\d+") is compile_pattern(r"\d+")
+
+
 # ----------------------
 # Тесты search_transactions_p2p
 # ----------------------
 
 
-@patch("src.services.search_transactions")
-def test_search_transactions_p2p_success(mock_search):
-    # Подменяем два вызова search_transactions
-    # Первый вызов (фильтр по категории "Переводы")
-    mock_search.side_effect = [
-        json.dumps(
-            [{"Описание": "Иван П.", "Категория": "Переводы"}, {"Описание": "Мария С.", "Категория": "Переводы"}]
-        ),
-        json.dumps([{"Описание": "Иван П.", "Категория": "Переводы"}]),
+def test_search_transactions_p2p_success():
+    data = [
+        {"Описание": "Иван П.", "Категория": "Переводы"},
+        {"Описание": "Перевод между счетами", "Категория": "Переводы"},
+        {"Описание": "Мария С.", "Категория": "Такси"},
     ]
-    data = [{"Описание": "dummy", "Категория": "dummy"}]
-    result_json = search_transactions_p2p(data)
-    result = json.loads(result_json)
-    assert len(result) == 1
-    assert result[0]["Описание"] == "Иван П."
-    assert mock_search.call_count == 2
+    result = json.loads(search_transactions_p2p(data))
+    assert result == [{"Описание": "Иван П.", "Категория": "Переводы"}]
 
 
-@patch("src.services.search_transactions")
-def test_search_transactions_p2p_no_matches(mock_search):
-    mock_search.side_effect = [json.dumps([]), json.dumps([])]
+def test_search_transactions_p2p_no_matches():
     data = [{"Описание": "dummy", "Категория": "dummy"}]
     result_json = search_transactions_p2p(data)
     result = json.loads(result_json)
     assert result == []
 
 
+def test_search_transactions_p2p_store():
+    data = [
+        {"Дата операции": "01.08.2025 12:00:00", "Категория": "Переводы", "Описание": "Иван П."},
+        {"Дата операции": "02.08.2025 12:00:00", "Категория": "Переводы", "Описание": "Перевод с карты"},
+        {"Дата операции": "03.08.2025 12:00:00", "Категория": "Такси", "Описание": "Мария С."},
+    ]
+    result = search_transactions_p2p(TransactionStore.from_records(data), as_json=False)
+    assert isinstance(result, TransactionStore)
+    assert result.frame["Описание"].tolist() == ["Иван П."]
+
+
+def test_search_transactions_structured(transactions):
+    result = search_transactions(transactions, "кафе|Такси", as_json=False)
+    assert result == transactions[:2]
+    assert result[0] is transactions[0]
+
+
 # ----------------------
 # Тесты search_transactions_by_phone
 # ----------------------
@@ -112,3 +203,9 @@ def test_search_transactions_by_phone_no_matches(mock_search):
     result_json = search_transactions_by_phone(data)
     result = json.loads(result_json)
     assert result == []
+
+
+def test_search_transactions_by_phone_store():
+    data = [{"Описание": "Я МТС +7 921 11-22-33", "Категория": "Связь"}, {"Описание": "Такси", "Категория": "Такси"}]
+    result = search_transactions_by_phone(TransactionStore.from_records(data), as_json=False)
+    assert result.frame["Описание"].tolist() == ["Я МТС +7 921 11-22-33"]
@@ -0,0 +1,102 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from src.store import TransactionStore, as_store, prepare_frame
+
+
+@pytest.fixture
+def records():
+    return [
+        {"Дата операции": "01.06.2025 10:00:00", "Номер карты": "*1111", "Категория": "Еда", "Сумма платежа": -100},
+        {"Дата операции": "15.07.2025 12:00:00", "Номер карты": "*2222", "Категория": "Такси", "Сумма платежа": 50},
+    ]
+
+
+# ---------- prepare_frame ----------
+
+
+def test_prepare_frame_types(records):
+    df = pd.DataFrame(records)
+    typed = prepare_frame(df)
+
+    assert pd.api.types.is_datetime64_any_dtype(typed["Дата операции"])
+    assert isinstance(typed["Категория"].dtype, pd.CategoricalDtype)
+    assert isinstance(typed["Номер карты"].dtype, pd.CategoricalDtype)
+    assert typed["Сумма платежа"].dtype == "float64"
+    # исходный DataFrame не изменяется
+    assert df["Дата операции"].tolist() == ["01.06.2025 10:00:00", "15.07.2025 12:00:00"]
+
+
+def test_prepare_frame_already_typed(records):
+    typed = prepare_frame(pd.DataFrame(records))
+    pd.testing.assert_frame_equal(prepare_frame(typed), typed)
+
+
+def test_prepare_frame_invalid_date():
+    with pytest.raises(ValueError):
+        prepare_frame(pd.DataFrame([{"Дата операции": "2025-06-01"}]))
+
+
+# ---------- TransactionStore ----------
+
+
+def test_store_to_records_roundtrip(records):
+    store = TransactionStore.from_records(records)
+    assert len(store) == 2
+    assert store.to_records()[0]["Дата операции"] == "01.06.2025 10:00:00"
+    assert store.to_records()[0]["Сумма платежа"] == -100.0
+
+
+def test_store_take(records):
+    store = TransactionStore.from_records(records)
+    subset = store.take(store.frame["Сумма платежа"] < 0)
+    assert len(subset) == 1
+    assert len(store.take(pd.Index([1]))) == 1
+
+
+def test_store_sorted_by_date_keeps_labels():
+    records = [
+        {"Дата операции": "15.07.2025 12:00:00", "Категория": "Такси"},
+        {"Дата операции": "01.06.2025 10:00:00", "Категория": "Еда"},
+    ]
+    store = TransactionStore.from_records(records)
+    assert store.frame.index.tolist() == [1, 0]
+    assert [r["Категория"] for r in store.to_records()] == ["Такси", "Еда"]
+
+
+@pytest.mark.parametrize(
+    "start, end, inclusive, expected",
+    [
+        (datetime(2025, 6, 1, 10), datetime(2025, 7, 15, 12), "both", 2),
+        (datetime(2025, 6, 1, 10), datetime(2025, 7, 15, 12), "left", 1),
+        (datetime(2025, 6, 2), datetime(2025, 7, 1), "both", 0),
+        (datetime(2025, 1, 1), datetime(2026, 1, 1), "both", 2),
+    ],
+)
+def test_store_between(records, start, end, inclusive, expected):
+    store = TransactionStore.from_records(records)
+    assert len(store.between(start, end, inclusive=inclusive)) == expected
+
+
+def test_store_month(records):
+    store = TransactionStore.from_records(records + [{"Дата операции": "31.12.2025 23:59:59"}])
+    assert store.month(2025, 6).frame["Категория"].tolist() == ["Еда"]
+    assert len(store.month(2025, 12)) == 1
+    assert len(store.month(2025, 8)) == 0
+
+
+# ---------- as_store ----------
+
+
+def test_as_store(records):
+    store = as_store(records)
+    assert as_store(store) is store
+    assert len(as_store(pd.DataFrame(records))) == 2
+    assert len(as_store([])) == 0
+
+
+def test_as_store_invalid_type():
+    with pytest.raises(TypeError):
+        as_store("not_a_list")
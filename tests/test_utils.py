@@ -1,9 +1,24 @@
 from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pandas as pd
 import pytest
 
-from src.utils import filter_last_stocks, filter_top_transactions, get_card_statistics, read_excel, read_json
+from src.store import TransactionStore
+from src.utils import (
+    filter_last_stocks,
+    filter_top_transactions,
+    filter_top_transactions_stream,
+    get_card_statistics,
+    get_card_statistics_stream,
+    iter_csv_chunks,
+    iter_excel_chunks,
+    iter_transactions,
+    read_excel,
+    read_json,
+    read_transactions,
+    top_n_positions,
+)
 
 # -------------------- read_excel --------------------
 
@@ -27,6 +42,14 @@ def test_read_excel_file_not_found(mock_read_excel):
         read_excel("not_exists.xlsx")
 
 
+def test_read_transactions_csv_matches_excel(statement_files):
+    xlsx_path, csv_path = statement_files
+    expected = read_transactions(xlsx_path, use_cache=False).to_records()
+    assert read_transactions(csv_path).to_records() == expected
+    # повторное чтение идёт из колоночного кэша
+    assert read_transactions(csv_path).to_records() == expected
+
+
 # -------------------- read_json --------------------
 
 
@@ -84,6 +107,80 @@ def test_filter_top_transactions_empty():
     assert result == []
 
 
+def test_filter_top_transactions_matches_full_sort():
+    rng = np.random.default_rng(0)
+    # много равных сумм: порядок при равенстве должен совпадать с устойчивой сортировкой
+    data = [
+        {"Дата операции": f"{i}", "Сумма платежа": int(v), "Категория": "", "Описание": str(i)}
+        for i, v in enumerate(rng.integers(-20, 20, 500))
+    ]
+    expected = sorted(data, key=lambda x: abs(x["Сумма платежа"]), reverse=True)[:7]
+
+    result = filter_top_transactions(data, n=7)
+    assert [r["description"] for r in result] == [x["Описание"] for x in expected]
+
+
+def test_filter_top_transactions_custom_key():
+    data = [
+        {"Дата операции": "01.01.2024 10:00:00", "Сумма платежа": -500, "Кэшбэк": 1},
+        {"Дата операции": "02.01.2024 10:00:00", "Сумма платежа": 100, "Кэшбэк": 5},
+        {"Дата операции": "03.01.2024 10:00:00", "Сумма платежа": -10, "Кэшбэк": 3},
+    ]
+    assert [r["amount"] for r in filter_top_transactions(data, n=2, column="Кэшбэк")] == [100, -10]
+    # без модуля наибольшие — поступления
+    assert [r["amount"] for r in filter_top_transactions(data, n=1, absolute=False)] == [100]
+    store = TransactionStore.from_records(data)
+    assert [r["amount"] for r in filter_top_transactions(store, n=2, column="Кэшбэк")] == [100, -10]
+
+
+def test_top_n_positions_matches_stable_sort():
+    rng = np.random.default_rng(1)
+    values = rng.integers(0, 10, 1000).astype(float)
+    for n in (0, 1, 5, 50, 999, 1000, 2000):
+        assert top_n_positions(values, n).tolist() == np.argsort(-values, kind="stable")[:n].tolist()
+
+
+def test_top_n_positions_order_breaks_ties():
+    rng = np.random.default_rng(2)
+    values = rng.integers(0, 5, 300).astype(float)
+    order = rng.permutation(300)
+    for n in (1, 7, 299, 300):
+        expected = sorted(range(300), key=lambda i: (-values[i], order[i]))[:n]
+        assert top_n_positions(values, n, order).tolist() == expected
+
+
+def test_filter_top_transactions_store_ties_in_load_order():
+    # выписка от новых операций к старым: при равных суммах порядок как в файле, а не по дате
+    data = [
+        {"Дата операции": "03.01.2024 10:00:00", "Сумма платежа": 100.0, "Описание": "c"},
+        {"Дата операции": "02.01.2024 10:00:00", "Сумма платежа": -100.0, "Описание": "b"},
+        {"Дата операции": "01.01.2024 10:00:00", "Сумма платежа": 100.0, "Описание": "a"},
+        {"Дата операции": "01.01.2024 09:00:00", "Сумма платежа": -5.0, "Описание": "d"},
+    ]
+    expected = [r["description"] for r in filter_top_transactions(data, n=3)]
+    assert expected == ["c", "b", "a"]
+    assert [r["description"] for r in filter_top_transactions(TransactionStore.from_records(data), n=3)] == expected
+    # метки порций — номера строк файла, как у iter_transactions
+    chunks = [TransactionStore(pd.DataFrame(data[:2])), TransactionStore(pd.DataFrame(data[2:], index=[2, 3]))]
+    assert [r["description"] for r in filter_top_transactions_stream(chunks, n=3)] == expected
+
+
+def test_filter_top_transactions_stream(statement_files):
+    xlsx_path, _ = statement_files
+    expected = filter_top_transactions(read_transactions(xlsx_path, use_cache=False), n=3)
+
+    assert filter_top_transactions_stream(iter_transactions(xlsx_path, chunk_size=2), n=3) == expected
+
+
+def test_filter_top_transactions_stream_lists():
+    chunks = [
+        [{"Сумма платежа": -5, "Описание": "a"}, {"Сумма платежа": 7, "Описание": "b"}],
+        [{"Сумма платежа": -7, "Описание": "c"}, {"Сумма платежа": 1, "Описание": "d"}],
+    ]
+    result = filter_top_transactions_stream(chunks, n=3)
+    assert [r["description"] for r in result] == ["b", "c", "a"]
+
+
 # -------------------- filter_last_stocks --------------------
 
 
@@ -104,3 +201,86 @@ def test_filter_last_stocks_not_found():
     data = [{"symbol": "TSLA", "price_currency": "USD", "high": 1000}]
     result = filter_last_stocks(data, ["AAPL"])
     assert result == []
+
+
+# -------------------- TransactionStore --------------------
+
+
+def test_get_card_statistics_store():
+    data = [
+        {"Номер карты": "*1111", "Сумма платежа": -100, "Сумма операции": -100, "Кэшбэк": 5},
+        {"Номер карты": "*2222", "Сумма платежа": 300, "Сумма операции": 300, "Кэшбэк": 0},
+    ]
+    result = get_card_statistics(TransactionStore.from_records(data))
+    assert result == [{"last_digits": "1111", "total_spent": 100, "cashback": 5}]
+
+
+def test_filter_top_transactions_store():
+    data = [
+        {"Дата операции": "01.01.2024 10:00:00", "Сумма платежа": -10, "Категория": "Food", "Описание": "Shop"},
+        {"Дата операции": "02.01.2024 10:00:00", "Сумма платежа": -50, "Категория": "Tech", "Описание": "Store"},
+    ]
+    result = filter_top_transactions(TransactionStore.from_records(data))
+    assert [r["amount"] for r in result] == [-50, -10]
+    assert result[0]["category"] == "Tech"
+
+
+# -------------------- потоковое чтение --------------------
+
+
+def test_iter_excel_chunks(statement_files):
+    xlsx_path, _ = statement_files
+    chunks = list(iter_excel_chunks(xlsx_path, chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    # метки продолжают нумерацию строк файла
+    assert chunks[2].frame.index.tolist() == [4]
+    assert chunks[0].frame["Дата операции"].dtype.kind == "M"
+    # пустые значения заполнены так же, как в read_excel
+    assert chunks[0].frame["Кэшбэк"].tolist() == [0.0, 2.0]
+    assert chunks[0].frame["Номер карты"].tolist() == ["*1111", ""]
+
+
+def test_iter_excel_chunks_skips_blank_rows(tmp_path):
+    path = str(tmp_path / "blank.xlsx")
+    pd.DataFrame({"Описание": ["a", None, "b"], "Сумма платежа": [1, None, 2]}).to_excel(path, index=False)
+
+    chunks = list(iter_excel_chunks(path))
+    assert chunks[0].frame["Описание"].tolist() == ["a", "b"]
+
+
+def test_iter_excel_chunks_consistent_integer_dtypes(tmp_path):
+    # пропуск MCC только во второй порции: тип колонки выбирается по первой порции и одинаков во всех
+    path = str(tmp_path / "mcc.xlsx")
+    pd.DataFrame({"MCC": [5411, 5812, None, 4121], "Описание": ["a", "b", "c", "d"]}).to_excel(path, index=False)
+
+    chunks = list(iter_excel_chunks(path, chunk_size=2))
+    assert [str(chunk.frame["MCC"].dtype) for chunk in chunks] == ["int64", "int64"]
+    assert chunks[1].frame["MCC"].tolist() == [0, 4121]
+
+
+def test_iter_csv_chunks_all_empty_text_column(statement_files):
+    _, csv_path = statement_files
+    chunks = list(iter_csv_chunks(csv_path, chunk_size=1))
+
+    assert len(chunks) == 5
+    # в порции без номера карты колонка остаётся текстовой
+    assert chunks[1].frame["Номер карты"].tolist() == [""]
+    assert chunks[1].frame["Кэшбэк"].tolist() == [2.0]
+
+
+def test_iter_transactions_unsupported_format():
+    with pytest.raises(ValueError, match="Unsupported statement format"):
+        iter_transactions("operations.json")
+
+
+def test_get_card_statistics_stream_matches_full(statement_files):
+    xlsx_path, csv_path = statement_files
+    expected = get_card_statistics(read_transactions(xlsx_path, use_cache=False))
+
+    assert get_card_statistics_stream(iter_transactions(xlsx_path, chunk_size=2)) == expected
+    assert get_card_statistics_stream(iter_transactions(csv_path, chunk_size=3)) == expected
+
+
+def test_get_card_statistics_stream_empty():
+    assert get_card_statistics_stream(iter([])) == []
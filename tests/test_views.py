@@ -1,4 +1,5 @@
 import json
+import time
 import pytest
 from datetime import datetime
 from unittest.mock import patch
@@ -6,6 +7,8 @@ from unittest.mock import patch
 import pandas as pd
 
 import src.views as views
+from src.aggregates import AggregateStore
+from src.store import TransactionStore
 
 
 def test_get_greetings_morning() -> None:
@@ -40,6 +43,16 @@ def test_filter_data_by_month_filters_correctly() -> None:
     assert all(isinstance(r, dict) for r in result)
 
 
+def test_filter_data_by_month_keeps_file_order() -> None:
+    dt = datetime(2025, 5, 31, 23, 0, 0)
+    data = [
+        {"Дата операции": "20.05.2025 12:00:00", "amount": 200},
+        {"Дата операции": "01.05.2025 10:00:00", "amount": 100},
+        {"Дата операции": "10.05.2025 10:00:00", "amount": 300},
+    ]
+    assert [row["amount"] for row in views.filter_data_by_month(data, dt)] == [200, 100, 300]
+
+
 def test_filter_data_by_month_empty_result() -> None:
     dt = datetime(2025, 5, 1, 12, 0, 0)
     data = [
@@ -69,10 +82,9 @@ def test_json_serializer_raises_type_error():
 @patch("src.views.get_card_statistics")
 @patch("src.views.filter_last_stocks")
 @patch("src.views.get_stock_prices")
-@patch("src.views.get_currency_rate")
+@patch("src.views.get_currency_rates")
 def test_get_main_page_success(
-        mock_currency, mock_stock_prices, mock_filter_stocks,
-        mock_cards, mock_top, mock_read_json
+    mock_currency, mock_stock_prices, mock_filter_stocks, mock_cards, mock_top, mock_read_json
 ) -> None:
     mock_read_json.return_value = {
         "user_stocks": ["AAPL"],
@@ -82,7 +94,7 @@ def test_get_main_page_success(
     mock_top.return_value = [{"id": 1, "amount": 500}]
     mock_stock_prices.return_value = [{"ticker": "AAPL", "price": 200}]
     mock_filter_stocks.return_value = [{"ticker": "AAPL", "price": 200}]
-    mock_currency.return_value = {"code": "USD", "rate": 90}
+    mock_currency.return_value = ([{"code": "USD", "rate": 90}], [])
 
     data = [{"Дата операции": "01.09.2025 10:00:00", "amount": 100}]
     result_json = views.get_main_page(data, "2025-09-01 12:00:00")
@@ -94,3 +106,194 @@ def test_get_main_page_success(
     assert "stock_prices" in result
     assert "currency_rates" in result
     assert result["cards"][0]["total_spent"] == 1000
+
+
+def test_filter_data_by_month_store() -> None:
+    dt = datetime(2025, 5, 15, 12, 0, 0)
+    data = [
+        {"Дата операции": "01.05.2025 10:00:00", "amount": 100},
+        {"Дата операции": "20.05.2025 12:00:00", "amount": 200},
+    ]
+    result = views.filter_data_by_month(TransactionStore.from_records(data), dt)
+    assert isinstance(result, TransactionStore)
+    assert result.frame["amount"].tolist() == [100]
+
+
+# ---------- параллельная загрузка внешних данных ----------
+
+MAIN_PAGE_DATA = [
+    {
+        "Дата операции": "01.09.2025 10:00:00",
+        "Номер карты": "*1111",
+        "Сумма платежа": -100,
+        "Сумма операции": -100,
+        "Кэшбэк": 1,
+        "Категория": "Еда",
+        "Описание": "Кафе",
+    },
+]
+CBR_RESPONSE = {"Valute": {"USD": {"Value": 92.5}, "EUR": {"Value": 100.1}}}
+EOD_RESPONSE = {"data": [{"symbol": "AAPL", "price_currency": "USD", "high": 200.0}]}
+
+
+@patch("src.views.read_json")
+def test_get_main_page_fetches_concurrently(mock_read_json, stub_server) -> None:
+    mock_read_json.return_value = {"user_stocks": ["AAPL"], "user_currencies": ["USD", "EUR"]}
+    stub_server.add("/daily_json.js", CBR_RESPONSE, delay=0.4)
+    stub_server.add("/eod", EOD_RESPONSE, delay=0.4)
+
+    start = time.monotonic()
+    result = json.loads(views.get_main_page(MAIN_PAGE_DATA, "2025-09-01 12:00:00"))
+    elapsed = time.monotonic() - start
+
+    # последовательно два запроса заняли бы не меньше 0.8 секунды
+    assert elapsed < 0.7
+    assert result["stock_prices"] == [{"stock": "AAPL", "price": 200.0}]
+    assert result["currency_rates"] == [
+        {"currency_code": "USD", "rate": 92.5},
+        {"currency_code": "EUR", "rate": 100.1},
+    ]
+
+
+@patch("src.views.read_json")
+def test_get_main_page_deadline(mock_read_json, stub_server, monkeypatch) -> None:
+    mock_read_json.return_value = {"user_stocks": ["AAPL"], "user_currencies": ["USD"]}
+    monkeypatch.setattr(views, "MARKET_DATA_DEADLINE", 0.2)
+    stub_server.add("/daily_json.js", CBR_RESPONSE, delay=0.6)
+    stub_server.add("/eod", EOD_RESPONSE, delay=0.6)
+
+    start = time.monotonic()
+    result = json.loads(views.get_main_page(MAIN_PAGE_DATA, "2025-09-01 12:00:00"))
+
+    assert time.monotonic() - start < 0.5
+    assert result["stock_prices"] == []
+    assert result["currency_rates"] == []
+    # даём брошенным запросам завершиться до остановки заглушки
+    time.sleep(0.6)
+
+
+@patch("src.views.read_json")
+def test_get_main_page_single_cbr_request(mock_read_json, stub_server) -> None:
+    mock_read_json.return_value = {"user_stocks": ["AAPL"], "user_currencies": ["USD", "EUR", "XXX"]}
+    stub_server.add("/daily_json.js", CBR_RESPONSE)
+    stub_server.add("/eod", EOD_RESPONSE)
+
+    result = json.loads(views.get_main_page(MAIN_PAGE_DATA, "2025-09-01 12:00:00"))
+
+    assert stub_server.hits["/daily_json.js"] == 1
+    # отсутствующая валюта не мешает получить остальные
+    assert [rate["currency_code"] for rate in result["currency_rates"]] == ["USD", "EUR"]
+
+
+@patch("src.views.read_json")
+def test_get_main_page_repeated_render_uses_cache(mock_read_json, stub_server) -> None:
+    mock_read_json.return_value = {"user_stocks": ["AAPL"], "user_currencies": ["USD"]}
+    stub_server.add("/daily_json.js", CBR_RESPONSE)
+    stub_server.add("/eod", EOD_RESPONSE)
+
+    first = json.loads(views.get_main_page(MAIN_PAGE_DATA, "2025-09-01 12:00:00"))
+    second = json.loads(views.get_main_page(MAIN_PAGE_DATA, "2025-09-01 12:00:00"))
+
+    # повторная отрисовка не обращается к сети
+    assert stub_server.hits == {"/daily_json.js": 1, "/eod": 1}
+    assert second["stock_prices"] == first["stock_prices"]
+    assert second["currency_rates"] == first["currency_rates"]
+
+
+@patch("src.views.read_json")
+@patch("src.views.get_stock_prices", return_value=[])
+@patch("src.views.get_currency_rates", return_value=([], []))
+def test_get_main_page_uses_aggregates(mock_currency, mock_stocks, mock_read_json, statement_rows) -> None:
+    mock_read_json.return_value = {"user_stocks": [], "user_currencies": []}
+    store = TransactionStore.from_records(statement_rows)
+    aggregates = AggregateStore.build(store)
+
+    with patch("src.views.get_card_statistics") as mock_cards:
+        result = json.loads(views.get_main_page(store, "2025-09-10 12:00:00", aggregates))
+    mock_cards.assert_not_called()
+
+    expected = json.loads(views.get_main_page(store, "2025-09-10 12:00:00"))
+    assert result["cards"] == expected["cards"] == [{"last_digits": "1111", "total_spent": 200.0, "cashback": 10.0}]
+
+
+# ---------- пакетная генерация главных страниц ----------
+
+BATCH_SETTINGS = [
+    {"user_stocks": ["AAPL"], "user_currencies": ["USD"]},
+    {"user_stocks": ["MSFT", "AAPL"], "user_currencies": ["EUR", "USD", "XXX"]},
+]
+BATCH_EOD = [
+    {"symbol": "AAPL", "price_currency": "USD", "high": 200.0},
+    {"symbol": "MSFT", "price_currency": "USD", "high": 300.0},
+]
+
+
+def _batch_rates(codes: list) -> tuple[list, list]:
+    rates = {"USD": 92.5, "EUR": 100.1}
+    return [{"currency_code": code, "rate": rates[code]} for code in codes if code in rates], [
+        code for code in codes if code not in rates
+    ]
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+@patch("src.views.get_currency_rates", side_effect=_batch_rates)
+@patch("src.views.get_stock_prices", return_value=BATCH_EOD)
+def test_get_main_pages_matches_single_pages(mock_stocks, mock_rates, statement_rows, max_workers) -> None:
+    store = TransactionStore.from_records(statement_rows)
+    page_requests = [(BATCH_SETTINGS[0], "2025-08-20 12:00:00"), (BATCH_SETTINGS[1], "2025-09-25 08:00:00")]
+
+    pages = views.get_main_pages(store, page_requests, max_workers=max_workers)
+
+    # рыночные данные загружаются один раз для всех пользователей
+    mock_stocks.assert_called_once_with(["AAPL", "MSFT"])
+    mock_rates.assert_called_once_with(["USD", "EUR", "XXX"])
+    for (settings, datetime_str), page in zip(page_requests, pages):
+        with patch("src.views.read_json", return_value=settings):
+            assert page == views.get_main_page(store, datetime_str)
+
+
+@patch("src.views.get_currency_rates", side_effect=_batch_rates)
+@patch("src.views.get_stock_prices", return_value=BATCH_EOD)
+def test_get_main_pages_with_aggregates(mock_stocks, mock_rates, statement_rows) -> None:
+    store = TransactionStore.from_records(statement_rows)
+    aggregates = AggregateStore.build(store)
+    page_requests = [(BATCH_SETTINGS[1], "2025-09-25 08:00:00")] * 2
+
+    pages = views.get_main_pages(store, page_requests, aggregates=aggregates, max_workers=2)
+    assert pages == views.get_main_pages(store, page_requests, max_workers=1)
+
+
+@patch("src.views.get_currency_rates", side_effect=_batch_rates)
+@patch("src.views.get_stock_prices", return_value=BATCH_EOD)
+def test_get_main_pages_pool_keeps_tie_order(mock_stocks, mock_rates, statement_rows) -> None:
+    # равные суммы, выписка новыми операциями вперёд: топ берёт первые по порядку загрузки, а не по дате
+    rows = [
+        dict(statement_rows[0], **{"Дата операции": f"{20 - i:02d}.08.2025 10:00:00", "Описание": f"shop{i}"})
+        for i in range(10)
+    ]
+    store = TransactionStore.from_records(rows)
+    page_requests = [(BATCH_SETTINGS[0], "2025-08-25 12:00:00")] * 2
+
+    pages = views.get_main_pages(store, page_requests, max_workers=2)
+
+    assert pages == views.get_main_pages(store, page_requests, max_workers=1)
+    top = json.loads(pages[0])["top_transaction"]
+    assert [row["description"] for row in top] == [f"shop{i}" for i in range(5)]
+
+
+def test_shared_frame_roundtrip(tmp_path, statement_rows, monkeypatch) -> None:
+    # метки индекса (порядок загрузки) не совпадают с позициями отсортированных по дате строк
+    frame = TransactionStore.from_records(statement_rows[::-1]).frame
+    assert frame.index.tolist() == [4, 3, 2, 1, 0]
+
+    path = views._write_shared_frame(frame, str(tmp_path))
+    pd.testing.assert_frame_equal(views._read_shared_frame(path), frame)
+
+    # без pyarrow данные передаются через pickle
+    def no_feather(*args, **kwargs):
+        raise ImportError("pyarrow")
+
+    monkeypatch.setattr(pd.DataFrame, "to_feather", no_feather)
+    path = views._write_shared_frame(frame, str(tmp_path))
+    assert path.endswith(".pkl")
+    pd.testing.assert_frame_equal(views._read_shared_frame(path), frame)